@@ -14,11 +14,43 @@ def _find_by_name(v, name):
     return None
 
 
+class _InfoYamlLoader(yaml.SafeLoader):
+    pass
+
+
+def _construct_npy_ref(loader, node):
+    return {"$array": loader.construct_scalar(node)}
+
+
+_InfoYamlLoader.add_constructor("!npy", _construct_npy_ref)
+
+
+def _namedarray_base_dtype(namedarray_dtype):
+    base = None
+    for f_dtype, _ in namedarray_dtype.fields.values():
+        if f_dtype.fields is not None:
+            f_base = _namedarray_base_dtype(f_dtype)
+        elif f_dtype.subdtype is not None:
+            f_base = f_dtype.subdtype[0]
+        else:
+            f_base = f_dtype
+        if f_base is None or (base is not None and f_base != base):
+            return None
+        base = f_base
+    return base
+
+
 class InfoParser(object):
     """
     Class to load YAML info files into Robot Raconteur device info structures. This wil
     typically be called from InfoFileLoader instead of being called directly.
 
+    Multidimensional arrays of any rank are loaded from nested YAML lists. Large numeric arrays, multidimensional
+    arrays, and namedarray arrays such as mesh vertices can instead be stored in a ``.npy`` file referenced using
+    ``!npy file.npy`` or ``{$array: file.npy}``. The file is memory mapped and checked against the field type.
+    Namedarray arrays may be stored either with the namedarray dtype, or as a 2D array with one row per element.
+    Relative paths are resolved against the directory of the info file.
+
     :param node: (optional) The Robot Raconteur node to use for parsing. Defaults to RobotRaconteurNode.s
     :type node: RobotRaconteur.RobotRaconteurNode
     :param client_obj: (optional) The client object to use for finding types. Defaults to None
@@ -32,6 +64,7 @@ class InfoParser(object):
         else:
             self.node = node
         self.client_obj = client_obj
+        self._base_path = None
 
     def _find_namedarray(self, n):
         try:
@@ -105,19 +138,45 @@ class InfoParser(object):
                     return int(d)
         elif type_def.ArrayType == RR.DataTypes_ArrayTypes_array:
             f_dtype = self._rr_type_to_dtype(type_def.Type)
-            arr = np.array(d, dtype=f_dtype)
+            arr = self._load_array_ref(d)
+            if arr is not None:
+                assert arr.dtype == f_dtype and arr.ndim == 1, "Invalid array file dtype or shape"
+            else:
+                arr = np.array(d, dtype=f_dtype)
             assert self._check_array_len(arr, type_def)
             return arr
         elif type_def.ArrayType == RR.DataTypes_ArrayTypes_multidimarray:
-            # TODO: handle more than fixed 2D multidim arrays
-            if len(type_def.ArrayLength) != 2:
-                return None
-            f_dtype = self._rr_type_to_dtype(type_def.Type)
-            arr = np.array(d, dtype=f_dtype)
-            return arr.reshape(type_def.ArrayLength, order="F")
+            return self._parse_multidimarray(d, type_def)
         else:
             return None
 
+    def _load_array_ref(self, d):
+        # Large arrays can be stored in a sidecar .npy file using !npy file.npy or {$array: file.npy}
+        if not isinstance(d, dict) or "$array" not in d:
+            return None
+        array_path = Path(str(d["$array"]))
+        if not array_path.is_absolute() and self._base_path is not None:
+            array_path = Path(self._base_path) / array_path
+        return np.load(array_path, mmap_mode="r", allow_pickle=False)
+
+    def _parse_multidimarray(self, d, type_def):
+        f_dtype = self._rr_type_to_dtype(type_def.Type)
+        arr = self._load_array_ref(d)
+        if arr is not None:
+            if arr.dtype != f_dtype:
+                raise RR.InvalidArgumentException("Invalid array file dtype")
+        else:
+            arr = np.array(d, dtype=f_dtype)
+        if type_def.ArrayVarLength and len(type_def.ArrayLength) == 0:
+            return arr
+        dims = list(type_def.ArrayLength)
+        if list(arr.shape) == dims:
+            return arr
+        # Flat lists are stored in column-major order. Nested lists must match the array shape.
+        if arr.ndim != 1 or arr.size != int(np.prod(dims)):
+            raise RR.InvalidArgumentException(f"Invalid multidimarray shape {list(arr.shape)}, expected {dims}")
+        return arr.reshape(dims, order="F")
+
     def _parse_structure(self, d, struct_type, struct_def):
         service_def = struct_def.GetServiceDefinition()
         struct_type_name = service_def.Name + "." + struct_def.Name
@@ -163,15 +222,15 @@ class InfoParser(object):
                 return True, ret
             if f_type.ContainerType == RR.DataTypes_ContainerTypes_map_int32:
                 ret = {}
-                for k, v in d:
-                    e_res, e_val = self._parse_field_value(e, f_type_e, struct_def, service_def)
+                for k, v in d.items():
+                    e_res, e_val = self._parse_field_value(v, f_type_e, struct_def, service_def)
                     assert e_res
-                    ret[int(k, 0)] = e_val
+                    ret[int(k, 0) if isinstance(k, str) else int(k)] = e_val
                 return True, ret
             if f_type.ContainerType == RR.DataTypes_ContainerTypes_map_string:
                 ret = {}
-                for k, v in d:
-                    e_res, e_val = self._parse_field_value(e, f_type_e, struct_def, service_def)
+                for k, v in d.items():
+                    e_res, e_val = self._parse_field_value(v, f_type_e, struct_def, service_def)
                     assert e_res
                     ret[str(k)] = e_val
                 return True, ret
@@ -219,6 +278,9 @@ class InfoParser(object):
             self._parse_namedarray_el(d, arr, 0, namedarray_dtype)
             return arr
         if f_type.ArrayType == RR.DataTypes_ArrayTypes_array:
+            arr = self._load_array_ref(d)
+            if arr is not None:
+                return self._namedarray_from_array_ref(arr, f_type, namedarray_dtype)
             n = len(d)
             arr = np.zeros((n,), dtype=namedarray_dtype)
             for i in range(n):
@@ -226,6 +288,19 @@ class InfoParser(object):
             return arr
         return None
 
+    def _namedarray_from_array_ref(self, arr, f_type, namedarray_dtype):
+        if arr.dtype == namedarray_dtype:
+            ret = arr.reshape(-1)
+        else:
+            # Plain numeric arrays with one row per element are viewed as the namedarray type
+            base_dtype = _namedarray_base_dtype(namedarray_dtype)
+            assert base_dtype is not None and arr.dtype == base_dtype, "Invalid array file dtype"
+            el_count = namedarray_dtype.itemsize // base_dtype.itemsize
+            assert arr.ndim == 2 and arr.shape[1] == el_count, "Invalid array file shape"
+            ret = np.ascontiguousarray(arr).view(namedarray_dtype).reshape(-1)
+        assert self._check_array_len(ret, f_type)
+        return ret
+
     def ParseInfoFile(self, filename, type_name):
         """
         Load and parse a YAML file containing contents of a device info structure. The type_name
@@ -242,15 +317,17 @@ class InfoParser(object):
         """
 
         struct_type = self._find_structure(type_name)
+        base_path = None
         if isinstance(filename, str) or isinstance(filename, Path):
             with open(filename, 'r') as f:
                 file_text = f.read()
+            base_path = Path(filename).parent
         else:
             file_text = filename.read()
-        info_dict = yaml.safe_load(file_text)
-        return self.ParseInfoDict(info_dict, type_name)
+        info_dict = yaml.load(file_text, Loader=_InfoYamlLoader)
+        return self.ParseInfoDict(info_dict, type_name, base_path)
 
-    def ParseInfoString(self, info_string, type_name):
+    def ParseInfoString(self, info_string, type_name, base_path=None):
         """
         Parse a YAML string containing contents of a device info structure. The type_name
         must be the fully qualified name of the structure type. The structure type must be defined
@@ -261,14 +338,16 @@ class InfoParser(object):
         :param type_name: The fully qualified name of the structure type. Examples include
             ``com.robotraconteur.robotics.robot.DeviceInfo`` and ``com.robotraconteur.robotics.robot.RobotInfo``
         :type type_name: str
+        :param base_path: (optional) The directory used to resolve relative array file references
+        :type base_path: str
         :return: The parsed structure
         """
         struct_type = self._find_structure(type_name)
 
-        info_dict = yaml.safe_load(info_string)
-        return self.ParseInfoDict(info_dict, type_name)
+        info_dict = yaml.load(info_string, Loader=_InfoYamlLoader)
+        return self.ParseInfoDict(info_dict, type_name, base_path)
 
-    def ParseInfoDict(self, info_dict, type_name):
+    def ParseInfoDict(self, info_dict, type_name, base_path=None):
         """
         Use a parsed YAML string containing contents of a device info structure. The type_name
         must be the fully qualified name of the structure type. The structure type must be defined
@@ -279,6 +358,8 @@ class InfoParser(object):
         :param type_name: The fully qualified name of the structure type. Examples include
             ``com.robotraconteur.robotics.robot.DeviceInfo`` and ``com.robotraconteur.robotics.robot.RobotInfo``
         :type type_name: str
+        :param base_path: (optional) The directory used to resolve relative array file references
+        :type base_path: str
         :return: The parsed structure
         """
 
@@ -286,9 +367,70 @@ class InfoParser(object):
         if struct_type is None:
             raise RR.InvalidArgumentException("Invalid structure type specified")
 
-        ret = self._parse_structure(info_dict, struct_type, struct_def)
+        self._base_path = base_path
+        try:
+            ret = self._parse_structure(info_dict, struct_type, struct_def)
+        finally:
+            self._base_path = None
         return ret
 
+    def IterParseInfoDocuments(self, info_stream, type_name=None, base_path=None):
+        """
+        Iterate over a multi-document YAML stream containing device info structures. Each document
+        is composed, converted, and parsed as it is read from the stream, so only one document
+        is held in memory at a time.
+
+        The type of each document is declared using a local tag on the document root, for example
+        ``--- !com.robotraconteur.robotics.robot.RobotInfo``. Documents without a tag use ``type_name``.
+        Empty documents are skipped.
+
+        :param info_stream: The YAML string or file object to parse
+        :type info_stream: str | file
+        :param type_name: (optional) The fully qualified name of the structure type for documents
+            that do not declare a type
+        :type type_name: str
+        :param base_path: (optional) The directory used to resolve relative array file references
+        :type base_path: str
+        :return: An iterator of tuples containing the type name and the parsed structure
+        :rtype: Iterator[tuple]
+        """
+        loader = _InfoYamlLoader(info_stream)
+        try:
+            while loader.check_node():
+                doc_node = loader.get_node()
+                if doc_node is None or (isinstance(doc_node, yaml.ScalarNode)
+                                        and doc_node.tag == "tag:yaml.org,2002:null"):
+                    continue
+                doc_type_name = type_name
+                if doc_node.tag.startswith("!") and not doc_node.tag.startswith("!!") and doc_node.tag != "!npy":
+                    doc_type_name = doc_node.tag[1:]
+                    doc_node.tag = yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG
+                if doc_type_name is None:
+                    raise RR.InvalidArgumentException("YAML document does not declare a structure type")
+                info_dict = loader.construct_document(doc_node)
+                yield doc_type_name, self.ParseInfoDict(info_dict, doc_type_name, base_path)
+        finally:
+            loader.dispose()
+
+    def IterParseInfoFile(self, filename, type_name=None):
+        """
+        Iterate over a multi-document YAML file containing device info structures. See
+        ``IterParseInfoDocuments`` for details.
+
+        :param filename: The filename of the YAML file to load
+        :type filename: str
+        :param type_name: (optional) The fully qualified name of the structure type for documents
+            that do not declare a type
+        :type type_name: str
+        :return: An iterator of tuples containing the type name and the parsed structure
+        :rtype: Iterator[tuple]
+        """
+        if isinstance(filename, str) or isinstance(filename, Path):
+            with open(filename, 'r') as f:
+                yield from self.IterParseInfoDocuments(f, type_name, Path(filename).parent)
+        else:
+            yield from self.IterParseInfoDocuments(filename, type_name)
+
     # Overrides for standard types
 
     def _override_field_com__robotraconteur__robotics__robot__RobotInfo__robot_capabilities(self, d, f_type, service_def):
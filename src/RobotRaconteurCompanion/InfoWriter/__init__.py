@@ -0,0 +1,298 @@
+import yaml
+import RobotRaconteur as RR
+from RobotRaconteur.RobotRaconteurPythonUtil import SplitQualifiedName
+import numpy as np
+import uuid
+from pathlib import Path
+
+from ..InfoParser import _find_by_name
+
+_YamlDumperBase = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+class _InfoYamlDumper(_YamlDumperBase):
+    pass
+
+
+def _represent_info_list(dumper, data):
+    # Numeric arrays and lists of scalars are written as compact flow sequences
+    flow = all(not isinstance(e, (dict, list)) for e in data) or \
+        all(isinstance(e, list) and all(not isinstance(e2, (dict, list)) for e2 in e) for e in data)
+    return dumper.represent_sequence("tag:yaml.org,2002:seq", data, flow_style=flow and len(data) > 0)
+
+
+class _FlowDict(dict):
+    pass
+
+
+def _represent_flow_dict(dumper, data):
+    return dumper.represent_mapping("tag:yaml.org,2002:map", data.items(), flow_style=True)
+
+
+_InfoYamlDumper.add_representer(list, _represent_info_list)
+_InfoYamlDumper.add_representer(_FlowDict, _represent_flow_dict)
+
+
+def _namedarray_el_to_dict(el, na_dtype):
+    # Namedarray elements are written as flow mappings
+    ret = _FlowDict()
+    for (k, (f_dtype, _)), v in zip(na_dtype.fields.items(), el):
+        if f_dtype.fields is not None:
+            ret[k] = _namedarray_el_to_dict(v, f_dtype)
+        elif f_dtype.subdtype is not None:
+            ret[k] = np.asarray(v).tolist()
+        else:
+            ret[k] = v
+    return ret
+
+
+class InfoWriter(object):
+    """
+    Class to write Robot Raconteur device info structures to YAML info files. This is the reverse of
+    InfoParser, and the output can be loaded using InfoParser or InfoFileLoader.
+
+    The service definition of the structure is used to determine how each field is written. The same
+    special cases as InfoParser are used for capability flags, UUIDs, and identifiers. Numeric arrays
+    are written as compact YAML flow sequences.
+
+    :param node: (optional) The Robot Raconteur node to use for finding types. Defaults to RobotRaconteurNode.s
+    :type node: RobotRaconteur.RobotRaconteurNode
+    :param client_obj: (optional) The client object to use for finding types. Defaults to None
+    :type client_obj: RobotRaconteur.ClientObject
+
+    """
+
+    def __init__(self, node=None, client_obj=None):
+        if node is None:
+            self.node = RR.RobotRaconteurNode.s
+        else:
+            self.node = node
+        self.client_obj = client_obj
+        self._named_types = {}
+        self._struct_plans = {}
+
+    def _find_named_type(self, typename):
+        ret = self._named_types.get(typename, None)
+        if ret is not None:
+            return ret
+        service_name, n1 = SplitQualifiedName(typename)
+        service_def = self.node.GetServiceType(service_name)
+        s_def = _find_by_name(service_def.Structures, n1)
+        if s_def is not None:
+            ret = ("structure", s_def, None)
+        else:
+            n_def = _find_by_name(service_def.NamedArrays, n1)
+            if n_def is not None:
+                ret = ("namedarray", n_def, self.node.GetNamedArrayDType(typename, self.client_obj))
+            else:
+                e_def = _find_by_name(service_def.Enums, n1)
+                if e_def is not None:
+                    ret = ("enum", e_def, {int(v.Value): v.Name for v in e_def.Values})
+                else:
+                    ret = ("unknown", None, None)
+        self._named_types[typename] = ret
+        return ret
+
+    def _struct_plan(self, struct_def):
+        # Cache the per-member handlers of each structure type so repeated writes only walk the members
+        service_def = struct_def.GetServiceDefinition()
+        struct_type_name = service_def.Name + "." + struct_def.Name
+        plan = self._struct_plans.get(struct_type_name, None)
+        if plan is not None:
+            return plan
+        s_override = getattr(self, "_override_structure_" + struct_type_name.replace(".", "__"), None)
+        s_extra = getattr(self, "_extra_structure_" + struct_type_name.replace(".", "__"), None)
+        members = []
+        for i in range(len(struct_def.Members)):
+            f_def = struct_def.Members[i]
+            f_override = getattr(self, "_override_field_" + (struct_type_name + "." +
+                                                              f_def.Name).replace(".", "__"), None)
+            members.append((f_def.Name, f_def.Type, f_override))
+        plan = (service_def, s_override, s_extra, members)
+        self._struct_plans[struct_type_name] = plan
+        return plan
+
+    def _write_number(self, v, type_def):
+        if type_def.ArrayType == RR.DataTypes_ArrayTypes_none:
+            if type_def.Type == RR.DataTypes_bool_t:
+                return bool(v)
+            if type_def.Type == RR.DataTypes_double_t or type_def.Type == RR.DataTypes_single_t:
+                return float(v)
+            return int(v)
+        return np.asarray(v).tolist()
+
+    def _write_structure(self, s, struct_def):
+        service_def, s_override, s_extra, members = self._struct_plan(struct_def)
+        if s_override is not None:
+            ov_res, ov_val = s_override(s, struct_def)
+            if ov_res:
+                return ov_val
+        ret = {}
+        for f_name, f_type, f_override in members:
+            v = getattr(s, f_name, None)
+            if v is None:
+                continue
+            if f_override is not None:
+                ret[f_name] = f_override(v, f_type, service_def)
+                continue
+            f_res, f_val = self._write_field_value(v, f_type, struct_def, service_def)
+            if f_res:
+                ret[f_name] = f_val
+
+        if s_extra is not None:
+            s_extra(ret, s, struct_def)
+
+        return ret
+
+    def _write_field_value(self, v, f_type, struct_def, service_def):
+
+        if f_type.ContainerType != RR.DataTypes_ContainerTypes_none:
+            f_type_e = f_type.Clone()
+            f_type_e.RemoveContainers()
+            if f_type.ContainerType == RR.DataTypes_ContainerTypes_list:
+                ret = []
+                for e in v:
+                    e_res, e_val = self._write_field_value(e, f_type_e, struct_def, service_def)
+                    assert e_res
+                    ret.append(e_val)
+                return True, ret
+            if f_type.ContainerType == RR.DataTypes_ContainerTypes_map_int32 \
+                    or f_type.ContainerType == RR.DataTypes_ContainerTypes_map_string:
+                ret = {}
+                for k, e in v.items():
+                    e_res, e_val = self._write_field_value(e, f_type_e, struct_def, service_def)
+                    if e_res:
+                        ret[k] = e_val
+                if not ret and f_type_e.Type == RR.DataTypes_varvalue_t:
+                    # Omit varvalue maps such as extended when none of the values could be written
+                    return False, None
+                return True, ret
+        if RR.IsTypeNumeric(f_type.Type):
+            return True, self._write_number(v, f_type)
+
+        if f_type.Type == RR.DataTypes_string_t:
+            return True, str(v)
+
+        if f_type.Type == RR.DataTypes_namedtype_t:
+            typename = f_type.TypeString
+            if "." not in typename:
+                typename = service_def.Name + "." + typename
+            kind, t_def, t_extra = self._find_named_type(typename)
+            if kind == "structure":
+                return True, self._write_structure(v, t_def)
+            if kind == "namedarray":
+                return True, self._write_namedarray(v, f_type, t_extra, t_def)
+            if kind == "enum":
+                enum_name = t_extra.get(int(v), None)
+                assert enum_name is not None, "Invalid enum value"
+                return True, enum_name
+        return False, None
+
+    def _write_namedarray(self, v, f_type, namedarray_dtype, namedarray_def):
+        service_def = namedarray_def.GetServiceDefinition()
+        namedarray_type_name = service_def.Name + "." + namedarray_def.Name
+        n_override = "_override_namedarray_" + namedarray_type_name.replace(".", "__")
+        if hasattr(self, n_override):
+            return getattr(self, n_override)(v, f_type, namedarray_dtype, namedarray_def)
+        els = np.asarray(v).reshape(-1).tolist()
+        if f_type.ArrayType == RR.DataTypes_ArrayTypes_none:
+            return _namedarray_el_to_dict(els[0], namedarray_dtype)
+        return [_namedarray_el_to_dict(el, namedarray_dtype) for el in els]
+
+    def WriteInfoDict(self, info, type_name):
+        """
+        Convert a device info structure to a dictionary that can be written as YAML. The type_name
+        must be the fully qualified name of the structure type.
+
+        :param info: The structure to convert
+        :param type_name: The fully qualified name of the structure type. Examples include
+            ``com.robotraconteur.robotics.robot.DeviceInfo`` and ``com.robotraconteur.robotics.robot.RobotInfo``
+        :type type_name: str
+        :return: The structure converted to a dictionary
+        :rtype: dict
+        """
+        kind, struct_def, _ = self._find_named_type(type_name)
+        if kind != "structure":
+            raise RR.InvalidArgumentException("Invalid structure type specified")
+        return self._write_structure(info, struct_def)
+
+    def WriteInfoString(self, info, type_name):
+        """
+        Convert a device info structure to a YAML string. The type_name
+        must be the fully qualified name of the structure type.
+
+        :param info: The structure to convert
+        :param type_name: The fully qualified name of the structure type. Examples include
+            ``com.robotraconteur.robotics.robot.DeviceInfo`` and ``com.robotraconteur.robotics.robot.RobotInfo``
+        :type type_name: str
+        :return: The YAML string
+        :rtype: str
+        """
+        info_dict = self.WriteInfoDict(info, type_name)
+        return yaml.dump(info_dict, Dumper=_InfoYamlDumper, sort_keys=False, default_flow_style=False, width=120)
+
+    def WriteInfoFile(self, info, filename, type_name):
+        """
+        Write a device info structure to a YAML file. The type_name
+        must be the fully qualified name of the structure type.
+
+        :param info: The structure to write
+        :param filename: The filename or file object to write
+        :type filename: str
+        :param type_name: The fully qualified name of the structure type. Examples include
+            ``com.robotraconteur.robotics.robot.DeviceInfo`` and ``com.robotraconteur.robotics.robot.RobotInfo``
+        :type type_name: str
+        """
+        info_text = self.WriteInfoString(info, type_name)
+        if isinstance(filename, str) or isinstance(filename, Path):
+            with open(filename, 'w') as f:
+                f.write(info_text)
+        else:
+            filename.write(info_text)
+
+    # Overrides for standard types
+
+    def _override_field_com__robotraconteur__robotics__robot__RobotInfo__robot_capabilities(self, v, f_type, service_def):
+        enum_def = _find_by_name(service_def.Enums, "RobotCapabilities")
+        return self._flags_override(v, enum_def)
+
+    def _override_field_com__robotraconteur__robotics__tool__ToolInfo__tool_capabilities(self, v, f_type, service_def):
+        enum_def = _find_by_name(service_def.Enums, "ToolCapabilities")
+        return self._flags_override(v, enum_def)
+
+    def _override_field_com__robotraconteur__servo__ServoInfo__capabilities(self, v, f_type, service_def):
+        enum_def = _find_by_name(service_def.Enums, "ServoCapabilities")
+        return self._flags_override(v, enum_def)
+
+    def _flags_override(self, v, enum_def):
+        ret = []
+        v = int(v)
+        for e in enum_def.Values:
+            e_val = int(e.Value)
+            if e_val != 0 and (v & e_val) == e_val:
+                ret.append(e.Name)
+        return ret
+
+    def _override_namedarray_com__robotraconteur__uuid__UUID(self, v, f_type, namedarray_dtype, namedarray_def):
+        return str(uuid.UUID(bytes=np.asarray(v).reshape(-1)[0]["uuid_bytes"].tobytes()))
+
+    def _override_structure_com__robotraconteur__identifier__Identifier(self, s, struct_def):
+        if s.uuid is None or not np.any(np.asarray(s.uuid).reshape(-1)[0]["uuid_bytes"]):
+            return True, s.name or ""
+        return False, None
+
+    def _override_field_com__robotraconteur__imaging__camerainfo__CameraCalibration__distortion_info(self, v, f_type, service_def):
+        kind, s_def, _ = self._find_named_type('com.robotraconteur.imaging.camerainfo.PlumbBobDistortionInfo')
+        assert kind == "structure"
+        return self._write_structure(v.data, s_def)
+
+    def _extra_structure_com__robotraconteur__device__DeviceInfo(self, d, s, struct_def):
+        if s.extended is None:
+            return
+        tags = s.extended.get("tags", None)
+        if tags is None:
+            return
+        if isinstance(tags, RR.VarValue):
+            tags = tags.data
+        kind, s_def, _ = self._find_named_type("com.robotraconteur.identifier.Identifier")
+        d["tags"] = [self._write_structure(t.data if isinstance(t, RR.VarValue) else t, s_def) for t in tags]
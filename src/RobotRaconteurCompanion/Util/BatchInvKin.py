@@ -0,0 +1,206 @@
+import RobotRaconteur as RR
+import numpy as np
+import collections
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from .BatchKinematics import BatchKinematics
+
+
+def _rotation_error(R_err):
+    # Rotation vector of R_err using the matrix logarithm
+    c = np.clip((np.trace(R_err) - 1) / 2, -1, 1)
+    theta = np.arccos(c)
+    v = np.array([R_err[2, 1] - R_err[1, 2], R_err[0, 2] - R_err[2, 0], R_err[1, 0] - R_err[0, 1]])
+    if theta < 1e-6:
+        return 0.5 * v
+    if np.pi - theta < 1e-6:
+        # Axis from the diagonal when the rotation is close to pi
+        k = np.sqrt(np.maximum((np.diag(R_err) + 1) / 2, 0))
+        i = np.argmax(k)
+        k = (R_err[i] + R_err[:, i]) / (4 * k[i])
+        k[i] = np.sqrt(np.maximum((R_err[i, i] + 1) / 2, 0))
+        return theta * k / np.linalg.norm(k)
+    return theta / (2 * np.sin(theta)) * v
+
+
+def _invkin_segment(rox_robot, options, T_path, q_seed):
+    ik = BatchInvKin(rox_robot, cache_size=0, **options)
+    return ik.invkin_path(T_path, q_seed)
+
+
+class BatchInvKin:
+    """
+    Warm-started inverse kinematics for dense Cartesian paths
+
+    The solver uses damped least squares iterations on the vectorized kinematics from BatchKinematics.
+    When solving a path, each waypoint is seeded with the solution of the previous waypoint, so nearby
+    waypoints converge in a few iterations and the solution stays on the same branch. Revolute joints
+    are wrapped to the solution closest to the seed, and solutions outside the joint limits are reported
+    as not converged.
+
+    Recent solutions are kept in a cache indexed by the target pose quantized to ``cache_resolution``.
+    A cached solution is used as the seed when it is within ``cache_seed_tolerance`` of the requested
+    seed, so repeated targets only need one forward kinematics evaluation. Only targets that quantize to
+    exactly the same key are reused; there is no nearest neighbor search between nearby targets.
+
+    Use ``RobotUtil.robot_info_to_rox_robot_cached`` to get the robot from a RobotInfo. Pose arrays
+    can be converted to transforms using ``GeometryUtil.poses_to_transforms``.
+
+    :param rox_robot: The robot to solve
+    :type rox_robot: general_robotics_toolbox.Robot
+    :param tol: (optional) The position (m) and rotation (rad) convergence tolerance. Defaults to 1e-6
+    :type tol: float
+    :param max_iterations: (optional) The maximum number of iterations per waypoint. Defaults to 100
+    :type max_iterations: int
+    :param damping: (optional) The damping factor of the least squares step. Defaults to 1e-3
+    :type damping: float
+    :param cache_size: (optional) The maximum number of cached solutions. Defaults to 10000. 0 disables the cache
+    :type cache_size: int
+    :param cache_resolution: (optional) The quantization of the target pose for the cache. Defaults to 1e-6
+    :type cache_resolution: float
+    :param cache_seed_tolerance: (optional) The maximum joint distance between a cached solution and the
+        seed for the cached solution to be used. Defaults to 0.5
+    :type cache_seed_tolerance: float
+    """
+
+    def __init__(self, rox_robot, tol=1e-6, max_iterations=100, damping=1e-3, cache_size=10000,
+                 cache_resolution=1e-6, cache_seed_tolerance=0.5):
+        self._robot = rox_robot
+        self._kin = BatchKinematics(rox_robot)
+        self._revolute = np.asarray(rox_robot.joint_type) == 0
+        self._lower = None if rox_robot.joint_lower_limit is None else np.asarray(rox_robot.joint_lower_limit)
+        self._upper = None if rox_robot.joint_upper_limit is None else np.asarray(rox_robot.joint_upper_limit)
+        self._options = {"tol": tol, "max_iterations": max_iterations, "damping": damping}
+        self._tol = tol
+        self._max_iterations = max_iterations
+        self._damping2 = damping * damping
+
+        self._cache = collections.OrderedDict()
+        self._cache_size = cache_size
+        self._cache_resolution = cache_resolution
+        self._cache_seed_tolerance = cache_seed_tolerance
+        self._cache_lock = threading.Lock()
+
+    def _cache_key(self, T_desired):
+        return np.round(T_desired[0:3, :] / self._cache_resolution).astype(np.int64).tobytes()
+
+    def _solve(self, T_desired, q_seed):
+        q = np.array(q_seed, dtype=np.float64)
+        R_d = T_desired[0:3, 0:3]
+        p_d = T_desired[0:3, 3]
+        eye6 = np.eye(6)
+        for _ in range(self._max_iterations + 1):
+            T, J = self._kin._fwdkin_jacobian(q.reshape((1, -1)))
+            T = T[0]
+            J = J[0]
+            e = np.concatenate((_rotation_error(R_d @ T[0:3, 0:3].T), p_d - T[0:3, 3]))
+            if np.linalg.norm(e[0:3]) < self._tol and np.linalg.norm(e[3:6]) < self._tol:
+                return True, q
+            q = q + J.T @ np.linalg.solve(J @ J.T + self._damping2 * eye6, e)
+        return False, q
+
+    def _wrap_and_check(self, q, q_seed):
+        q = q.copy()
+        two_pi = 2 * np.pi
+        q[self._revolute] -= two_pi * np.round((q[self._revolute] - q_seed[self._revolute]) / two_pi)
+        if self._lower is not None and self._upper is not None:
+            if np.any(q < self._lower) or np.any(q > self._upper):
+                return False, q
+        return True, q
+
+    def invkin(self, T_desired, q_seed):
+        """
+        Solve the inverse kinematics for one target pose
+
+        :param T_desired: The 4x4 homogeneous transform of the target tool pose
+        :type T_desired: numpy.ndarray
+        :param q_seed: The seed joint positions
+        :type q_seed: numpy.ndarray
+        :return: True if a solution within the joint limits was found, and the joint positions
+        :rtype: tuple[bool, numpy.ndarray]
+        """
+        T_desired = np.asarray(T_desired, dtype=np.float64)
+        q_seed = np.asarray(q_seed, dtype=np.float64)
+        if T_desired.shape != (4, 4) or q_seed.shape != (self._kin.joint_count,):
+            raise RR.InvalidArgumentException("Invalid target pose or seed shape")
+
+        key = None
+        q_start = q_seed
+        if self._cache_size > 0:
+            key = self._cache_key(T_desired)
+            with self._cache_lock:
+                q_cached = self._cache.get(key, None)
+                if q_cached is not None:
+                    self._cache.move_to_end(key)
+            if q_cached is not None and np.max(np.abs(q_cached - q_seed)) <= self._cache_seed_tolerance:
+                q_start = q_cached
+
+        converged, q = self._solve(T_desired, q_start)
+        if not converged:
+            return False, q
+        converged, q = self._wrap_and_check(q, q_seed)
+        if converged and key is not None:
+            with self._cache_lock:
+                self._cache[key] = q.copy()
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return converged, q
+
+    def invkin_path(self, T_path, q_seed, processes=None, segment_size=1000):
+        """
+        Solve the inverse kinematics for a path of target poses
+
+        Each waypoint is seeded with the solution of the previous converged waypoint. If ``processes``
+        is set, the path is split into segments of ``segment_size`` waypoints. The first waypoint of each
+        segment is solved in order in this process, and the segments are then solved in a process pool.
+        ``segment_size`` should be small enough that the segment start waypoints are close together.
+
+        :param T_path: The (N, 4, 4) array of target tool poses
+        :type T_path: numpy.ndarray
+        :param q_seed: The seed joint positions for the first waypoint
+        :type q_seed: numpy.ndarray
+        :param processes: (optional) The number of worker processes. Defaults to None to solve in this process
+        :type processes: int
+        :param segment_size: (optional) The number of waypoints per segment when using worker processes
+        :type segment_size: int
+        :return: The (N,) array of convergence flags and the (N, n_joints) array of joint positions
+        :rtype: tuple[numpy.ndarray, numpy.ndarray]
+        """
+        T_path = np.asarray(T_path, dtype=np.float64)
+        count = T_path.shape[0]
+        q_seed = np.asarray(q_seed, dtype=np.float64)
+
+        if processes is not None and count > segment_size:
+            starts = list(range(0, count, segment_size))
+            seeds = []
+            q = q_seed
+            for s in starts:
+                res, q1 = self.invkin(T_path[s], q)
+                if res:
+                    q = q1
+                seeds.append(q)
+            mp_context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=processes, mp_context=mp_context) as executor:
+                res = list(executor.map(_invkin_segment, [self._robot] * len(starts), [self._options] * len(starts),
+                                        [T_path[s:s + segment_size] for s in starts], seeds))
+            return np.concatenate([r[0] for r in res]), np.concatenate([r[1] for r in res])
+
+        converged = np.zeros((count,), dtype=bool)
+        q_path = np.zeros((count, self._kin.joint_count), dtype=np.float64)
+        q = q_seed
+        for i in range(count):
+            res, q1 = self.invkin(T_path[i], q)
+            converged[i] = res
+            q_path[i] = q1
+            if res:
+                q = q1
+        return converged, q_path
+
+    def clear_cache(self):
+        """
+        Clear the solution cache
+        """
+        with self._cache_lock:
+            self._cache.clear()
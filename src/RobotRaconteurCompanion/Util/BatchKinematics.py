@@ -0,0 +1,258 @@
+import general_robotics_toolbox as rox
+import RobotRaconteur as RR
+import numpy as np
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _transform_to_array(T):
+    ret = np.eye(4)
+    if T is not None:
+        ret[0:3, 0:3] = T.R
+        ret[0:3, 3] = T.p
+    return ret
+
+
+def _chunk_jacobian_metrics(kin, q):
+    return kin.jacobian_metrics(q)
+
+
+class BatchKinematics:
+    """
+    Vectorized kinematics for a general_robotics_toolbox.Robot
+
+    The robot geometry is copied into contiguous arrays when the object is created. Kinematics are
+    then evaluated for a (T, n_joints) array of joint positions in one pass, with the loop over the
+    joints and the rotations computed for all samples at once. The results match
+    ``general_robotics_toolbox.fwdkin``, including the flange, tool, and base transforms. Joint limits
+    are not checked.
+
+    Only revolute and prismatic joints are supported. Use ``RobotUtil.robot_info_to_batch_kinematics``
+    to create from a RobotInfo structure.
+
+    :param rox_robot: The robot to evaluate
+    :type rox_robot: general_robotics_toolbox.Robot
+    :param joint_numbers: (optional) The joint numbers of the chain in the robot joint arrays. Used to
+        select the chain joints from RobotState structures. Defaults to the first n_joints joints.
+    :type joint_numbers: list[int]
+    """
+
+    def __init__(self, rox_robot, joint_numbers=None):
+        self._robot = rox_robot
+        joint_type = np.asarray(rox_robot.joint_type)
+        if not np.all((joint_type == 0) | (joint_type == 1)):
+            raise RR.InvalidArgumentException("BatchKinematics only supports revolute and prismatic joints")
+        self._joint_count = len(joint_type)
+        self._revolute = joint_type == 0
+        self._H = np.ascontiguousarray(np.asarray(rox_robot.H, dtype=np.float64).T)
+        self._P = np.ascontiguousarray(np.asarray(rox_robot.P, dtype=np.float64).T)
+        self._K = np.array([rox.hat(h) for h in self._H]).reshape((self._joint_count, 3, 3))
+        self._K2 = np.matmul(self._K, self._K)
+
+        T_tip = _transform_to_array(rox_robot.T_flange)
+        if rox_robot.R_tool is not None and rox_robot.p_tool is not None:
+            T_tip = T_tip @ _transform_to_array(rox.Transform(rox_robot.R_tool, rox_robot.p_tool))
+        self._T_tip = T_tip
+        self._p_tip = T_tip[0:3, 3].copy()
+        self._T_base = _transform_to_array(rox_robot.T_base)
+        self._has_base = rox_robot.T_base is not None
+
+        if joint_numbers is None:
+            joint_numbers = np.arange(self._joint_count)
+        self._joint_numbers = np.asarray(joint_numbers, dtype=np.int64)
+        assert len(self._joint_numbers) == self._joint_count, "Invalid joint_numbers length"
+
+    @property
+    def robot(self):
+        """
+        The robot used to create the object
+
+        :rtype: general_robotics_toolbox.Robot
+        """
+        return self._robot
+
+    @property
+    def joint_count(self):
+        """
+        The number of joints in the chain
+
+        :rtype: int
+        """
+        return self._joint_count
+
+    def _check_q(self, q):
+        q = np.asarray(q, dtype=np.float64)
+        if q.ndim == 1:
+            q = q.reshape((1, -1))
+        if q.ndim != 2 or q.shape[1] != self._joint_count:
+            raise RR.InvalidArgumentException(f"Joint positions must have shape (T, {self._joint_count})")
+        return q
+
+    def _joint_rotations(self, q, i):
+        s = np.sin(q[:, i])[:, None, None]
+        c = np.cos(q[:, i])[:, None, None]
+        return np.eye(3) + s * self._K[i] + (1 - c) * self._K2[i]
+
+    def _chain_frames(self, q, store_frames=False):
+        # Propagate the chain for all samples. Returns the final R and p, and optionally
+        # the joint axes and joint origins in the base frame for each joint
+        count = q.shape[0]
+        R = np.broadcast_to(np.eye(3), (count, 3, 3)).copy()
+        p = np.broadcast_to(self._P[0], (count, 3)).copy()
+        if store_frames:
+            hi = np.zeros((count, self._joint_count, 3))
+            pOi = np.zeros((count, self._joint_count + 1, 3))
+            pOi[:, 0, :] = p
+        for i in range(self._joint_count):
+            if self._revolute[i]:
+                R = np.matmul(R, self._joint_rotations(q, i))
+            else:
+                p += q[:, i, None] * (R @ self._H[i])
+            p += R @ self._P[i + 1]
+            if store_frames:
+                hi[:, i, :] = R @ self._H[i]
+                pOi[:, i + 1, :] = p
+        if store_frames:
+            return R, p, hi, pOi
+        return R, p
+
+    def _tool_transforms(self, R, p):
+        T = np.zeros((R.shape[0], 4, 4), dtype=np.float64)
+        T[:, 0:3, 0:3] = R
+        T[:, 0:3, 3] = p
+        T[:, 3, 3] = 1
+        T = np.matmul(T, self._T_tip)
+        if self._has_base:
+            T = np.matmul(self._T_base, T)
+        return T
+
+    def fwdkin(self, q):
+        """
+        Compute the forward kinematics for an array of joint positions
+
+        :param q: The (T, n_joints) array of joint positions
+        :type q: numpy.ndarray
+        :return: The (T, 4, 4) array of homogeneous transforms of the tool
+        :rtype: numpy.ndarray
+        """
+        q = self._check_q(q)
+        R, p = self._chain_frames(q)
+        return self._tool_transforms(R, p)
+
+    def fwdkin_poses(self, q, geometry_util):
+        """
+        Compute the forward kinematics for an array of joint positions, returned as a
+        Robot Raconteur Pose array
+
+        :param q: The (T, n_joints) array of joint positions
+        :type q: numpy.ndarray
+        :param geometry_util: The GeometryUtil used to create the poses
+        :type geometry_util: RobotRaconteurCompanion.Util.GeometryUtil.GeometryUtil
+        :return: The tool poses
+        :rtype: com.robotraconteur.geometry.Pose[]
+        """
+        return geometry_util.transforms_to_poses(self.fwdkin(q))
+
+    def jacobian(self, q):
+        """
+        Compute the Jacobian of the tool for an array of joint positions
+
+        The Jacobian matches ``general_robotics_toolbox.robotjacobian``, with the angular velocity in the
+        first three rows and the linear velocity in the last three rows, expressed in the base frame.
+
+        :param q: The (T, n_joints) array of joint positions
+        :type q: numpy.ndarray
+        :return: The (T, 6, n_joints) array of Jacobians
+        :rtype: numpy.ndarray
+        """
+        q = self._check_q(q)
+        _, J = self._fwdkin_jacobian(q)
+        return J
+
+    def _fwdkin_jacobian(self, q):
+        R, p, hi, pOi = self._chain_frames(q, store_frames=True)
+        pOT = p + R @ self._p_tip
+        J = np.zeros((q.shape[0], 6, self._joint_count), dtype=np.float64)
+        rev = self._revolute
+        J[:, 0:3, rev] = hi[:, rev, :].transpose(0, 2, 1)
+        J[:, 3:6, rev] = np.cross(hi[:, rev, :], pOT[:, None, :] - pOi[:, :-1, :][:, rev, :]).transpose(0, 2, 1)
+        J[:, 3:6, ~rev] = hi[:, ~rev, :].transpose(0, 2, 1)
+        if self._has_base:
+            R_base = self._T_base[0:3, 0:3]
+            J[:, 0:3, :] = np.matmul(R_base, J[:, 0:3, :])
+            J[:, 3:6, :] = np.matmul(R_base, J[:, 3:6, :])
+        return self._tool_transforms(R, p), J
+
+    def jacobian_metrics(self, q, processes=None, chunk_size=100000):
+        """
+        Compute manipulability and singularity metrics for an array of joint positions
+
+        The metrics are computed from the min(6, n_joints) singular values of the Jacobian. The manipulability
+        is the product of the singular values. This is the Yoshikawa measure ``sqrt(det(J*J^T))`` for robots
+        with at least 6 joints, and ``sqrt(det(J^T*J))`` for robots with fewer than 6 joints. The condition
+        number is the ratio of the largest to the smallest singular value, and is infinite at a singularity.
+
+        Large arrays can be split into chunks and evaluated in a process pool by setting ``processes``.
+
+        :param q: The (T, n_joints) array of joint positions
+        :type q: numpy.ndarray
+        :param processes: (optional) The number of worker processes. Defaults to None to evaluate in this process
+        :type processes: int
+        :param chunk_size: (optional) The number of samples per chunk when using worker processes
+        :type chunk_size: int
+        :return: The manipulability, condition number, and minimum singular value, each a (T,) array
+        :rtype: tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        """
+        q = self._check_q(q)
+        if processes is not None and q.shape[0] > chunk_size:
+            chunks = [q[i:i + chunk_size] for i in range(0, q.shape[0], chunk_size)]
+            mp_context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=processes, mp_context=mp_context) as executor:
+                res = list(executor.map(_chunk_jacobian_metrics, [self] * len(chunks), chunks))
+            return tuple(np.concatenate([r[i] for r in res]) for i in range(3))
+
+        sv = np.linalg.svd(self.jacobian(q), compute_uv=False)
+        manipulability = np.prod(sv, axis=1)
+        sv_min = sv[:, -1]
+        with np.errstate(divide="ignore"):
+            condition_number = np.where(sv_min > 0, sv[:, 0] / np.where(sv_min > 0, sv_min, 1), np.inf)
+        return manipulability, condition_number, sv_min
+
+    def is_singular(self, q, tol=1e-6):
+        """
+        Check if joint positions are at or near a kinematic singularity
+
+        :param q: The (T, n_joints) array of joint positions
+        :type q: numpy.ndarray
+        :param tol: (optional) The minimum singular value threshold. Defaults to 1e-6
+        :type tol: float
+        :return: The (T,) boolean array that is True for singular configurations
+        :rtype: numpy.ndarray
+        """
+        _, _, sv_min = self.jacobian_metrics(q)
+        return sv_min < tol
+
+    def robot_states_joint_positions(self, robot_states):
+        """
+        Stack the chain joint positions from a sequence of RobotState or AdvancedRobotState structures
+
+        :param robot_states: The robot states
+        :type robot_states: list[com.robotraconteur.robotics.robot.RobotState]
+        :return: The (T, n_joints) array of joint positions
+        :rtype: numpy.ndarray
+        """
+        q_all = np.array([s.joint_position for s in robot_states], dtype=np.float64)
+        if q_all.ndim != 2:
+            raise RR.InvalidArgumentException("Robot states must have joint_position of the same length")
+        return q_all[:, self._joint_numbers]
+
+    def fwdkin_robot_states(self, robot_states):
+        """
+        Compute the forward kinematics for the joint positions of a sequence of RobotState structures
+
+        :param robot_states: The robot states
+        :type robot_states: list[com.robotraconteur.robotics.robot.RobotState]
+        :return: The (T, 4, 4) array of homogeneous transforms of the tool
+        :rtype: numpy.ndarray
+        """
+        return self.fwdkin(self.robot_states_joint_positions(robot_states))
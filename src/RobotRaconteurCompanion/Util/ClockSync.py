@@ -0,0 +1,265 @@
+import RobotRaconteur as RR
+RRN = RR.RobotRaconteurNode.s
+import numpy as np
+import threading
+
+from .DateTimeUtil import DateTimeUtil
+
+
+def _theil_sen(x, y):
+    # Median of the pairwise slopes, robust to outliers
+    i, j = np.triu_indices(len(x), 1)
+    dx = x[j] - x[i]
+    valid = dx != 0
+    if not np.any(valid):
+        return 0.0, float(np.median(y))
+    slope = float(np.median((y[j] - y[i])[valid] / dx[valid]))
+    return slope, float(np.median(y - slope * x))
+
+
+class ClockSyncEstimator(object):
+    """
+    Estimate the offset and drift of the clock of a remote node relative to the local node TimeSpec
+
+    The TimeSpec of each node is not synchronized with other nodes. The estimator measures the remote time
+    using ``remote_time_func``, which is normally a property read or function call on a remote Device that
+    returns the remote node time. The local TimeSpec is read before and after the call, and the remote time
+    is assumed to correspond to the midpoint of the round trip.
+
+    The most recent ``window_size`` samples are kept. The samples with a round trip time above the median are
+    discarded, since they are most affected by transport delays, and the offset and drift are fitted to the
+    remaining samples using the Theil-Sen estimator, which is robust to outliers. The memory used is constant.
+
+    ``remote_time_func`` may return a TimeSpec2, TimeSpec3, DateTimeUTC, or DeviceTime, or an integer time in
+    nanoseconds. For DeviceTime, the ``device_ts`` field is used.
+
+    :param remote_time_func: The function to call to read the remote time
+    :type remote_time_func: Callable[[], numpy.ndarray]
+    :param window_size: (optional) The number of samples to keep. Defaults to 64
+    :type window_size: int
+    :param error_handler: (optional) Called with the exception if a periodic sample started by ``Start`` fails
+    :type error_handler: Callable[[Exception], None]
+    :param node: (optional) The Robot Raconteur node to use for the local time. Defaults to RobotRaconteurNode.s
+    :type node: RobotRaconteur.RobotRaconteurNode
+    :param client_obj: (optional) The client object to use for finding types. Defaults to None
+    :type client_obj: RobotRaconteur.ClientObject
+    """
+
+    def __init__(self, remote_time_func, window_size=64, error_handler=None, node=None, client_obj=None):
+        if node is None:
+            self._node = RRN
+        else:
+            self._node = node
+        self._client_obj = client_obj
+        assert window_size >= 2, "window_size must be at least 2"
+
+        self._remote_time_func = remote_time_func
+        self._error_handler = error_handler
+        self._datetime_util = DateTimeUtil(self._node, self._client_obj)
+        self._lock = threading.Lock()
+
+        self._local_ns = np.zeros((window_size,), dtype=np.int64)
+        self._offset_ns = np.zeros((window_size,), dtype=np.int64)
+        self._rtt_ns = np.zeros((window_size,), dtype=np.int64)
+        self._sample_count = 0
+
+        # (ref_ns, offset, drift) is replaced as one tuple so readers see a consistent model without the lock
+        self._model = None
+        self._timer = None
+
+    def _local_now_ns(self):
+        ts = self._node.NowTimeSpec()
+        return ts.seconds * 1000000000 + ts.nanoseconds
+
+    def _remote_ns(self, remote_time):
+        if isinstance(remote_time, (int, np.integer)):
+            return int(remote_time)
+        remote_time = np.asarray(remote_time).reshape(-1)
+        if remote_time.dtype.names is not None and "device_ts" in remote_time.dtype.names:
+            remote_time = remote_time["device_ts"]
+        return int(self._datetime_util.TimeArrayToNanoseconds(remote_time)[0])
+
+    def Sample(self, count=1):
+        """
+        Measure the remote time and update the estimate
+
+        :param count: (optional) The number of samples to take. Defaults to 1
+        :type count: int
+        """
+        for _ in range(count):
+            t0 = self._local_now_ns()
+            remote_time = self._remote_time_func()
+            t1 = self._local_now_ns()
+            self.AddSample(t0, self._remote_ns(remote_time), t1)
+
+    def AddSample(self, local_send_ns, remote_ns, local_receive_ns):
+        """
+        Add a sample measured by the caller and update the estimate
+
+        :param local_send_ns: The local TimeSpec before the request in nanoseconds
+        :type local_send_ns: int
+        :param remote_ns: The remote time in nanoseconds
+        :type remote_ns: int
+        :param local_receive_ns: The local TimeSpec after the response in nanoseconds
+        :type local_receive_ns: int
+        """
+        local_mid = (local_send_ns + local_receive_ns) // 2
+        with self._lock:
+            i = self._sample_count % len(self._local_ns)
+            self._local_ns[i] = local_mid
+            self._offset_ns[i] = remote_ns - local_mid
+            self._rtt_ns[i] = local_receive_ns - local_send_ns
+            self._sample_count += 1
+            self._update_estimate()
+
+    def _update_estimate(self):
+        n = min(self._sample_count, len(self._local_ns))
+        local_ns = self._local_ns[:n]
+        offset_ns = self._offset_ns[:n]
+        rtt_ns = self._rtt_ns[:n]
+        keep = rtt_ns <= np.median(rtt_ns)
+        ref_ns = int(local_ns.max())
+        x = (local_ns[keep] - ref_ns).astype(np.float64)
+        y = (offset_ns[keep] - offset_ns[keep][0]).astype(np.float64)
+        if n < 3:
+            drift = 0.0
+            offset = float(np.median(y))
+        else:
+            drift, offset = _theil_sen(x, y)
+        self._model = (ref_ns, offset + float(offset_ns[keep][0]), drift)
+
+    @property
+    def sample_count(self):
+        """
+        The total number of samples taken
+
+        :rtype: int
+        """
+        return self._sample_count
+
+    @property
+    def offset_ns(self):
+        """
+        The estimated offset in nanoseconds at the current local time, remote minus local
+
+        :rtype: float
+        """
+        return self.OffsetAt(self._local_now_ns())
+
+    @property
+    def drift(self):
+        """
+        The estimated drift of the remote clock relative to the local clock, in seconds per second
+
+        :rtype: float
+        """
+        model = self._model
+        if model is None:
+            return 0.0
+        return model[2]
+
+    @property
+    def round_trip_time_ns(self):
+        """
+        The median round trip time of the samples in nanoseconds
+
+        :rtype: float
+        """
+        with self._lock:
+            n = min(self._sample_count, len(self._rtt_ns))
+            if n == 0:
+                return None
+            return float(np.median(self._rtt_ns[:n]))
+
+    def OffsetAt(self, local_ns):
+        """
+        The estimated offset in nanoseconds at local times, remote minus local
+
+        :param local_ns: The local TimeSpec times in nanoseconds
+        :type local_ns: numpy.ndarray
+        :return: The offsets in nanoseconds
+        :rtype: numpy.ndarray
+        """
+        model = self._model
+        if model is None:
+            raise RR.InvalidOperationException("No clock samples")
+        ref_ns, offset, drift = model
+        return offset + drift * (np.asarray(local_ns, dtype=np.int64) - ref_ns)
+
+    def RemoteToLocalNanoseconds(self, remote_ns):
+        """
+        Map remote times to local TimeSpec times
+
+        :param remote_ns: The remote times in int64 nanoseconds since the epoch
+        :type remote_ns: numpy.ndarray
+        :return: The local times in int64 nanoseconds since the epoch
+        :rtype: numpy.ndarray
+        """
+        model = self._model
+        if model is None:
+            raise RR.InvalidOperationException("No clock samples")
+        ref_ns, offset, drift = model
+        # remote = local + offset + drift * (local - ref), solved for local relative to ref
+        remote_rel = np.asarray(remote_ns, dtype=np.int64) - ref_ns
+        local_rel = (remote_rel - offset) / (1.0 + drift)
+        return np.round(local_rel).astype(np.int64) + ref_ns
+
+    def RemoteTimeArrayToLocal(self, remote_time_array, time_type="TimeSpec2", device_info=None):
+        """
+        Map an array of remote TimeSpec2, TimeSpec3, or DeviceTime to local TimeSpec times
+
+        For DeviceTime arrays, the ``device_ts`` field is mapped.
+
+        :param remote_time_array: The array of remote times
+        :type remote_time_array: numpy.ndarray
+        :param time_type: (optional) ``TimeSpec2`` or ``TimeSpec3``. Defaults to ``TimeSpec2``
+        :type time_type: str
+        :param device_info: (optional) The device info structure to use for the clock UUID. Defaults to None
+        :type device_info: com.robotraconteur.device.DeviceInfo
+        :return: The array of local times
+        :rtype: numpy.ndarray
+        """
+        remote_time_array = np.asarray(remote_time_array)
+        if remote_time_array.dtype.names is not None and "device_ts" in remote_time_array.dtype.names:
+            remote_time_array = remote_time_array["device_ts"]
+        local_ns = self.RemoteToLocalNanoseconds(self._datetime_util.TimeArrayToNanoseconds(remote_time_array))
+        return self._datetime_util.NanosecondsToTimeArray(local_ns, time_type, device_info)
+
+    def Start(self, period=1.0):
+        """
+        Sample the remote time periodically using a node timer
+
+        :param period: (optional) The sample period in seconds. Defaults to 1
+        :type period: float
+        """
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = self._node.CreateTimer(period, self._handle_timer)
+            self._timer.Start()
+
+    def Close(self):
+        """
+        Stop sampling the remote time
+        """
+        with self._lock:
+            if self._timer is None:
+                return
+            self._timer.Stop()
+            self._timer = None
+
+    def _handle_timer(self, timer_evt):
+        if timer_evt.stopped:
+            return
+        try:
+            self.Sample()
+        except Exception as e:
+            # Failed samples are skipped and the estimate is unchanged
+            if self._error_handler is not None:
+                self._error_handler(e)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.Close()
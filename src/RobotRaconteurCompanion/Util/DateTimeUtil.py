@@ -3,6 +3,9 @@ RRN = RR.RobotRaconteurNode.s
 import datetime
 import numpy as np
 import math
+import threading
+
+_utc_epoch = datetime.datetime(1970, 1, 1, 0, 0, 0, 0)
 
 
 class DateTimeUtil(object):
@@ -28,7 +31,7 @@ class DateTimeUtil(object):
         self._timespec3_dt = self._node.GetNamedArrayDType("com.robotraconteur.datetime.TimeSpec3", self._client_obj)
         self._devicetime_dt = self._node.GetPodDType("com.robotraconteur.device.clock.DeviceTime", self._client_obj)
 
-        self._datetime_const = self._node.GetConstants("com.robotraconteur.datetime")
+        self._datetime_const = self._node.GetConstants("com.robotraconteur.datetime", self._client_obj)
         self._clock_codes = self._datetime_const["ClockTypeCode"]
 
     def UtcNow(self, device_info=None):
@@ -110,3 +113,300 @@ class DateTimeUtil(object):
         ret[0]["device_ts"] = self.TimeSpec2Now(device_info)
         ret[0]["device_utc"] = self.UtcNow(device_info)
         return ret
+
+    def _time_array_dtype(self, time_type):
+        if isinstance(time_type, np.dtype):
+            return time_type
+        if time_type == "TimeSpec2":
+            return self._timespec2_dt
+        if time_type == "TimeSpec3":
+            return self._timespec3_dt
+        if time_type == "DateTimeUTC":
+            return self._datetimeutc_dt
+        raise RR.InvalidArgumentException(f"Invalid time type: {time_type}")
+
+    def TimeArrayToNanoseconds(self, time_array):
+        """
+        Convert an array of TimeSpec2, TimeSpec3, or DateTimeUTC to int64 nanoseconds since the epoch
+
+        Any array with ``seconds`` and ``nanoseconds`` fields, such as the ``device_ts`` field of a DeviceTime
+        array, can also be converted. The conversion is vectorized and does not loop over the elements.
+
+        :param time_array: The array of times
+        :type time_array: numpy.ndarray
+        :return: The int64 array of nanoseconds
+        :rtype: numpy.ndarray
+        """
+        time_array = np.asarray(time_array)
+        names = time_array.dtype.names
+        if names is not None and "seconds" in names and "nanoseconds" in names:
+            return time_array["seconds"].astype(np.int64) * 1000000000 + time_array["nanoseconds"].astype(np.int64)
+        if names is not None and "microseconds" in names:
+            return time_array["microseconds"].astype(np.int64) * 1000
+        raise RR.InvalidArgumentException("Invalid time array type")
+
+    def TimeArrayToSeconds(self, time_array):
+        """
+        Convert an array of TimeSpec2, TimeSpec3, or DateTimeUTC to float64 seconds since the epoch
+
+        :param time_array: The array of times
+        :type time_array: numpy.ndarray
+        :return: The float64 array of seconds
+        :rtype: numpy.ndarray
+        """
+        time_array = np.asarray(time_array)
+        names = time_array.dtype.names
+        if names is not None and "seconds" in names and "nanoseconds" in names:
+            return time_array["seconds"].astype(np.float64) + time_array["nanoseconds"].astype(np.float64) * 1e-9
+        if names is not None and "microseconds" in names:
+            us = time_array["microseconds"].astype(np.int64)
+            return (us // 1000000).astype(np.float64) + (us % 1000000).astype(np.float64) * 1e-6
+        raise RR.InvalidArgumentException("Invalid time array type")
+
+    def TimeArrayToDateTime64(self, time_array):
+        """
+        Convert an array of TimeSpec2, TimeSpec3, or DateTimeUTC to numpy datetime64[ns]
+
+        :param time_array: The array of times
+        :type time_array: numpy.ndarray
+        :return: The datetime64[ns] array
+        :rtype: numpy.ndarray
+        """
+        return self.TimeArrayToNanoseconds(time_array).view("datetime64[ns]")
+
+    def NanosecondsToTimeArray(self, nanoseconds, time_type="TimeSpec2", device_info=None):
+        """
+        Convert int64 nanoseconds since the epoch to an array of TimeSpec2, TimeSpec3, or DateTimeUTC
+
+        TimeSpec3 has microsecond resolution, and the nanoseconds are rounded down.
+
+        :param nanoseconds: The int64 array of nanoseconds
+        :type nanoseconds: numpy.ndarray
+        :param time_type: (optional) ``TimeSpec2``, ``TimeSpec3``, or ``DateTimeUTC``. Defaults to ``TimeSpec2``
+        :type time_type: str
+        :param device_info: (optional) The device info structure to use for the clock UUID. Defaults to None
+        :type device_info: com.robotraconteur.device.DeviceInfo
+        :return: The array of times
+        :rtype: numpy.ndarray
+        """
+        ns = np.asarray(nanoseconds, dtype=np.int64)
+        dtype = self._time_array_dtype(time_type)
+        ret = np.zeros(ns.shape, dtype=dtype)
+        if "microseconds" in dtype.names:
+            ret["microseconds"] = ns // 1000
+            return ret
+        ret["seconds"] = ns // 1000000000
+        ret["nanoseconds"] = ns % 1000000000
+        ret["clock_info"]["clock_type"] = self._clock_codes["default"]
+        if device_info is not None and device_info.device is not None:
+            ret["clock_info"]["clock_uuid"] = device_info.device.uuid
+        return ret
+
+    def SecondsToTimeArray(self, seconds, time_type="TimeSpec2", device_info=None):
+        """
+        Convert float64 seconds since the epoch to an array of TimeSpec2, TimeSpec3, or DateTimeUTC
+
+        :param seconds: The float64 array of seconds
+        :type seconds: numpy.ndarray
+        :param time_type: (optional) ``TimeSpec2``, ``TimeSpec3``, or ``DateTimeUTC``. Defaults to ``TimeSpec2``
+        :type time_type: str
+        :param device_info: (optional) The device info structure to use for the clock UUID. Defaults to None
+        :type device_info: com.robotraconteur.device.DeviceInfo
+        :return: The array of times
+        :rtype: numpy.ndarray
+        """
+        seconds = np.asarray(seconds, dtype=np.float64)
+        whole = np.floor(seconds)
+        ns = whole.astype(np.int64) * 1000000000 + np.round((seconds - whole) * 1e9).astype(np.int64)
+        return self.NanosecondsToTimeArray(ns, time_type, device_info)
+
+    def DateTime64ToTimeArray(self, datetime64, time_type="TimeSpec2", device_info=None):
+        """
+        Convert numpy datetime64 to an array of TimeSpec2, TimeSpec3, or DateTimeUTC
+
+        :param datetime64: The datetime64 array
+        :type datetime64: numpy.ndarray
+        :param time_type: (optional) ``TimeSpec2``, ``TimeSpec3``, or ``DateTimeUTC``. Defaults to ``TimeSpec2``
+        :type time_type: str
+        :param device_info: (optional) The device info structure to use for the clock UUID. Defaults to None
+        :type device_info: com.robotraconteur.device.DeviceInfo
+        :return: The array of times
+        :rtype: numpy.ndarray
+        """
+        ns = np.asarray(datetime64).astype("datetime64[ns]").view(np.int64)
+        return self.NanosecondsToTimeArray(ns, time_type, device_info)
+
+    def CreateClockMapping(self, device_info=None, resample_interval=10.0, drift_threshold=1e-4):
+        """
+        Create a ClockMapping to create DeviceTime and UTC stamps from a single TimeSpec read
+
+        :param device_info: (optional) The device info structure to use for the clock UUID. Defaults to None
+        :type device_info: com.robotraconteur.device.DeviceInfo
+        :param resample_interval: (optional) The maximum interval between offset samples in seconds
+        :type resample_interval: float
+        :param drift_threshold: (optional) The offset change in seconds that is treated as drift
+        :type drift_threshold: float
+        :return: The clock mapping
+        :rtype: ClockMapping
+        """
+        return ClockMapping(device_info, resample_interval, drift_threshold, self._node, self._client_obj)
+
+
+class ClockMapping(object):
+    """
+    Map the node TimeSpec to UTC using a cached offset
+
+    ``DateTimeUtil.UtcNow`` and ``DateTimeUtil.FillDeviceTime`` read the node UTC clock and convert
+    Python datetime objects for every stamp. ClockMapping samples the offset between the node TimeSpec
+    and UTC, and derives the UTC time from the TimeSpec using integer nanosecond arithmetic. Each stamp
+    then only needs one ``NowTimeSpec`` read.
+
+    The offset is sampled again after ``resample_interval`` seconds. If the offset changed by more than
+    ``drift_threshold`` since the previous sample, the interval is halved, otherwise it is doubled up to
+    ``resample_interval``. Call ``Resample`` to force a new sample, for instance after the system clock
+    was changed.
+
+    :param device_info: (optional) The device info structure to use for the clock UUID. Defaults to None
+    :type device_info: com.robotraconteur.device.DeviceInfo
+    :param resample_interval: (optional) The maximum interval between offset samples in seconds. Defaults to 10
+    :type resample_interval: float
+    :param drift_threshold: (optional) The offset change in seconds that is treated as drift. Defaults to 1e-4
+    :type drift_threshold: float
+    :param node: (optional) The Robot Raconteur node to use. Defaults to RobotRaconteurNode.s
+    :type node: RobotRaconteur.RobotRaconteurNode
+    :param client_obj: (optional) The client object to use for finding types. Defaults to None
+    :type client_obj: RobotRaconteur.ClientObject
+    """
+
+    _min_resample_interval_ns = 100000000
+
+    def __init__(self, device_info=None, resample_interval=10.0, drift_threshold=1e-4, node=None, client_obj=None):
+        if node is None:
+            self._node = RRN
+        else:
+            self._node = node
+        self._client_obj = client_obj
+
+        datetimeutc_dt = self._node.GetPodDType("com.robotraconteur.datetime.DateTimeUTC", self._client_obj)
+        timespec2_dt = self._node.GetPodDType("com.robotraconteur.datetime.TimeSpec2", self._client_obj)
+        self._devicetime_dt = self._node.GetPodDType("com.robotraconteur.device.clock.DeviceTime", self._client_obj)
+        clock_codes = self._node.GetConstants("com.robotraconteur.datetime", self._client_obj)["ClockTypeCode"]
+
+        # Template with the clock info of both stamps filled
+        self._devicetime_template = np.zeros((1,), self._devicetime_dt)
+        self._devicetime_template[0]["device_ts"]["clock_info"]["clock_type"] = clock_codes["default"]
+        self._devicetime_template[0]["device_utc"]["clock_info"]["clock_type"] = clock_codes["default"]
+        if device_info is not None and device_info.device is not None:
+            self._devicetime_template[0]["device_ts"]["clock_info"]["clock_uuid"] = device_info.device.uuid
+            self._devicetime_template[0]["device_utc"]["clock_info"]["clock_uuid"] = device_info.device.uuid
+        self._timespec2_template = np.zeros((1,), timespec2_dt)
+        self._timespec2_template[0] = self._devicetime_template[0]["device_ts"]
+        self._datetimeutc_template = np.zeros((1,), datetimeutc_dt)
+        self._datetimeutc_template[0] = self._devicetime_template[0]["device_utc"]
+
+        self._max_interval_ns = int(resample_interval * 1e9)
+        self._drift_threshold_ns = int(drift_threshold * 1e9)
+        self._lock = threading.Lock()
+        self._offset_ns = None
+        self._interval_ns = self._max_interval_ns
+        self._next_sample_ns = 0
+        self.Resample()
+
+    def _now_timespec_ns(self):
+        ts = self._node.NowTimeSpec()
+        return ts.seconds * 1000000000 + ts.nanoseconds
+
+    def Resample(self):
+        """
+        Sample the offset between the node TimeSpec and UTC
+
+        :return: The offset in nanoseconds, UTC minus TimeSpec
+        :rtype: int
+        """
+        ts1 = self._now_timespec_ns()
+        utc = (self._node.NowUTC() - _utc_epoch) // datetime.timedelta(microseconds=1) * 1000
+        ts2 = self._now_timespec_ns()
+        offset_ns = utc - (ts1 + ts2) // 2
+        with self._lock:
+            if self._offset_ns is not None:
+                if abs(offset_ns - self._offset_ns) > self._drift_threshold_ns:
+                    self._interval_ns = max(self._interval_ns // 2, self._min_resample_interval_ns)
+                else:
+                    self._interval_ns = min(self._interval_ns * 2, self._max_interval_ns)
+            self._offset_ns = offset_ns
+            self._next_sample_ns = ts2 + self._interval_ns
+        return offset_ns
+
+    @property
+    def offset_ns(self):
+        """
+        The current offset in nanoseconds, UTC minus TimeSpec
+
+        :rtype: int
+        """
+        return self._offset_ns
+
+    def NowNanoseconds(self):
+        """
+        Get the current TimeSpec and UTC time from one TimeSpec read
+
+        :return: The TimeSpec and the UTC time, in integer nanoseconds since the epoch
+        :rtype: tuple[int, int]
+        """
+        ts_ns = self._now_timespec_ns()
+        if ts_ns >= self._next_sample_ns:
+            self.Resample()
+        return ts_ns, ts_ns + self._offset_ns
+
+    def TimeSpecToUtcNanoseconds(self, timespec_ns):
+        """
+        Map node TimeSpec times to UTC using the current offset
+
+        :param timespec_ns: The TimeSpec times in int64 nanoseconds since the epoch
+        :type timespec_ns: numpy.ndarray
+        :return: The UTC times in int64 nanoseconds since the epoch
+        :rtype: numpy.ndarray
+        """
+        return np.asarray(timespec_ns, dtype=np.int64) + np.int64(self._offset_ns)
+
+    def TimeSpec2Now(self):
+        """
+        Get the current TimeSpec, stored as TimeSpec2
+
+        :return: The current TimeSpec as TimeSpec2
+        :rtype: com.robotraconteur.datetime.TimeSpec2
+        """
+        ts = self._node.NowTimeSpec()
+        ret = self._timespec2_template.copy()
+        ret[0]["seconds"] = ts.seconds
+        ret[0]["nanoseconds"] = ts.nanoseconds
+        return ret
+
+    def UtcNow(self):
+        """
+        Get the current UTC time derived from the node TimeSpec
+
+        :return: The current UTC time
+        :rtype: com.robotraconteur.datetime.DateTimeUTC
+        """
+        _, utc_ns = self.NowNanoseconds()
+        ret = self._datetimeutc_template.copy()
+        ret[0]["seconds"], ret[0]["nanoseconds"] = divmod(utc_ns, 1000000000)
+        return ret
+
+    def FillDeviceTime(self, seqno):
+        """
+        Fill a DeviceTime structure with the current time
+
+        :param seqno: The sequence number to use
+        :type seqno: int
+        :return: The DeviceTime structure
+        :rtype: com.robotraconteur.device.clock.DeviceTime
+        """
+        ts_ns, utc_ns = self.NowNanoseconds()
+        ret = self._devicetime_template.copy()
+        r = ret[0]
+        r["device_seqno"] = seqno
+        r["device_ts"]["seconds"], r["device_ts"]["nanoseconds"] = divmod(ts_ns, 1000000000)
+        r["device_utc"]["seconds"], r["device_utc"]["nanoseconds"] = divmod(utc_ns, 1000000000)
+        return ret
@@ -1,8 +1,16 @@
 import threading
+import asyncio
 import RobotRaconteur as RR
 import collections.abc
 import uuid as py_uuid
+import numpy as np
 from contextlib import suppress
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+import time
 import yaml
 
 
@@ -50,6 +58,9 @@ class DeviceConnectorDetails:
     :ivar max_connections: The maximum number of connections to the device. Defaults to 10. Should be set to 1 for
                             connecting to a single device
     :vartype max_connections: int
+    :ivar priority: The connection priority of the device. Devices with higher priority are connected first
+                            when the DeviceConnector limits the number of concurrent connection attempts
+    :vartype priority: int
 
     :param device_nickname: The nickname of the device
     :type device_nickname: str
@@ -80,12 +91,15 @@ class DeviceConnectorDetails:
     :param max_connections: The maximum number of connections to the device. Defaults to 10. Should be set to 1 for
                             connecting to a single device
     :type max_connections: int
+    :param priority: The connection priority of the device. Devices with higher priority are connected first
+                            when the DeviceConnector limits the number of concurrent connection attempts. Defaults to 0
+    :type priority: int
     """
 
     def __init__(self, device_nickname, device=None, serial_number=None, tags=None, tag_match_operation="and",
                  service_nodes=None,
                  transport_schemes=None, urls=None, url_auth=None, root_object_type=None, subscription_filter=None,
-                 max_connections=10):
+                 max_connections=10, priority=0):
         if not any([device is not None, serial_number is not None, urls is not None, root_object_type is not None]):
             raise RR.InvalidArgumentException(
                 "At least one of device, serial_number, urls, or root_object_type must be specified")
@@ -113,6 +127,7 @@ class DeviceConnectorDetails:
         self.url_auth = url_auth
         self.max_connections = max_connections
         self.tag_match_operation = tag_match_operation
+        self.priority = priority
 
 
 class DeviceConnector:
@@ -198,6 +213,21 @@ class DeviceConnector:
 
     Use io.StringIO to load the YAML from a string.
 
+    By default, all devices are connected at once. For large numbers of devices, use
+    ``max_concurrent_connections`` to limit the number of connection attempts in progress at the same time.
+    Devices are then connected in order of the ``priority`` field of the DeviceConnectorDetails, highest first.
+    A device that has not connected within ``connection_attempt_timeout`` continues to try to connect in the
+    background, but no longer counts against the limit. Use ``WaitDevices`` to wait for some or all devices
+    to connect, and ``DeviceConnectTimes`` to get the time each device took to connect.
+
+    Devices found using discovery can take several seconds to connect. Set ``url_cache`` to keep the URLs
+    of the services each device last connected to in a file. By default, the file is stored in the user cache
+    directory of the node. When a cached device is added, it connects directly using the cached URLs while
+    discovery runs in the background. If discovery finds the same service with new URLs, the URLs are updated.
+    If the device has not connected within ``url_cache_timeout``, it connects to the first service found by
+    discovery instead. The cache is updated every time the device connects, including when it reconnects to a
+    service that moved to a different node.
+
     :param device_list: (optional) A list of DeviceConnectorDetails to connect to devices
     :type device_list: list[DeviceConnectorDetails]
     :param devices_yaml_f: (optional) A file object containing YAML formatted device details
@@ -206,18 +236,58 @@ class DeviceConnector:
     :type autoconnect: bool
     :param node: (optional) The Robot Raconteur node to use for parsing. Defaults to RobotRaconteurNode.s
     :type node: RobotRaconteur.RobotRaconteurNode
+    :param max_concurrent_connections: (optional) The maximum number of devices attempting to connect at the
+                                        same time. Defaults to None for no limit
+    :type max_concurrent_connections: int
+    :param connection_attempt_timeout: (optional) The time in seconds a connecting device counts against
+                                        ``max_concurrent_connections``. Defaults to 10
+    :type connection_attempt_timeout: float
+    :param url_cache: (optional) True to use the default URL cache file, or the path of the cache file.
+                        Defaults to None to disable the cache
+    :type url_cache: bool | str | pathlib.Path
+    :param url_cache_timeout: (optional) The time in seconds to wait for a device to connect using the cached
+                                URLs. Defaults to 5
+    :type url_cache_timeout: float
     """
 
-    def __init__(self, device_list=None, devices_yaml_f=None, autoconnect=True, node=None):
+    def __init__(self, device_list=None, devices_yaml_f=None, autoconnect=True, node=None,
+                 max_concurrent_connections=None, connection_attempt_timeout=10.0, url_cache=None,
+                 url_cache_timeout=5.0):
         self._lock = threading.Lock()
+        self._cv = threading.Condition(self._lock)
         if node is None:
             self._node = RR.RobotRaconteurNode.s
         else:
             self._node = node
 
+        if max_concurrent_connections is not None and max_concurrent_connections < 1:
+            raise RR.InvalidArgumentException("max_concurrent_connections must be at least 1")
+
         self.subscription_manager = RR.ServiceSubscriptionManager(node=self._node)
 
         self._autoconnect = autoconnect
+        self._max_concurrent_connections = max_concurrent_connections
+        self._connection_attempt_timeout = connection_attempt_timeout
+
+        self._device_details = dict()
+        self._priorities = dict()
+        self._connect_queue = []
+        self._connecting = dict()
+        self._connect_start = dict()
+        self._connect_times = dict()
+        self._timer = None
+        self._closed = False
+
+        self._url_cache = None
+        if url_cache is not None and url_cache is not False:
+            if url_cache is True:
+                url_cache = Path(self._node.GetNodeDirectories().user_cache_dir) / "device_connector" / "url_cache.yml"
+            self._url_cache = _DeviceUrlCache(url_cache)
+        self._url_cache_timeout = url_cache_timeout
+        self._url_cache_keys = dict()
+        self._url_cache_discovery = dict()
+        self._url_cache_handlers = dict()
+        self._url_cache_updated = set()
 
         if devices_yaml_f is not None:
             if device_list is not None:
@@ -226,18 +296,187 @@ class DeviceConnector:
 
         if device_list is not None:
             try:
-                for device in device_list:
+                for device in sorted(device_list, key=lambda d: -getattr(d, "priority", 0)):
                     self._do_update_device(device)
             except:
                 with suppress(Exception):
-                    self.subscription_manager.Close()
+                    self.Close()
                 raise
 
-    def _do_update_device(self, device_details, force_connect=False):
+    def _do_update_device(self, device_details, force_connect=False, enable=None):
         sub_details = _device_details_to_subscription_details(
             self._node, device_details.device_nickname, device_details)
-        sub_details.Enabled = self._autoconnect or force_connect
-        self.subscription_manager.AddSubscription(sub_details)
+        nickname = device_details.device_nickname
+        if enable is None:
+            enable = self._autoconnect or force_connect
+        cache_key = None
+        cached = None
+        if self._url_cache is not None and device_details.urls is None and device_details.subscription_filter is None:
+            cache_key = _device_details_cache_key(device_details)
+            cached = self._url_cache.get(nickname, cache_key)
+        with self._lock:
+            self._remove_connect_state(nickname)
+            self._remove_url_cache_discovery(nickname)
+            self._url_cache_keys.pop(nickname, None)
+            self._device_details[nickname] = device_details
+            self._priorities[nickname] = getattr(device_details, "priority", 0)
+            if cache_key is not None:
+                self._url_cache_keys[nickname] = cache_key
+            if cached is not None:
+                # Connect using the cached URLs, and run discovery in the background to update the URLs
+                discovery = self._node.SubscribeServiceInfo2(sub_details.ServiceTypes, sub_details.Filter)
+                discovery.ServiceDetected += lambda sub, client_id, info: self._url_cache_service_detected(
+                    nickname, info)
+                self._url_cache_discovery[nickname] = discovery
+                sub_details = RR.ServiceSubscriptionManagerDetails(
+                    Name=nickname, ConnectionMethod=RR.ServiceSubscriptionManager_CONNECTION_METHOD_URL,
+                    Urls=cached["urls"])
+            sub_details.Enabled = enable and self._max_concurrent_connections is None
+            self.subscription_manager.AddSubscription(sub_details)
+            connected_client_ids = []
+            if self._url_cache is not None:
+                connected_client_ids = self._attach_url_cache_handler(nickname)
+            if enable:
+                self._start_connect(nickname)
+        # Clients that connected before the handler was attached
+        for client_id in connected_client_ids:
+            self._url_cache_client_connected(nickname, client_id)
+
+    def _remove_connect_state(self, nickname):
+        with suppress(ValueError):
+            self._connect_queue.remove(nickname)
+        self._connecting.pop(nickname, None)
+        self._connect_start.pop(nickname, None)
+        self._connect_times.pop(nickname, None)
+        self._url_cache_updated.discard(nickname)
+
+    def _remove_url_cache_discovery(self, nickname):
+        discovery = self._url_cache_discovery.pop(nickname, None)
+        if discovery is not None:
+            with suppress(Exception):
+                discovery.Close()
+
+    def _attach_url_cache_handler(self, nickname):
+        # The cache is updated every time the subscription connects, including reconnects to a moved service
+        sub = self.subscription_manager.GetSubscription(nickname)
+        current = self._url_cache_handlers.get(nickname, None)
+        if current is not None and current[0] is sub:
+            return []
+        self._detach_url_cache_handler(nickname)
+
+        def handler(sub, client_id, client):
+            self._url_cache_client_connected(nickname, client_id)
+        sub.ClientConnected += handler
+        self._url_cache_handlers[nickname] = (sub, handler)
+        return list(sub.GetConnectedClients().keys())
+
+    def _detach_url_cache_handler(self, nickname):
+        current = self._url_cache_handlers.pop(nickname, None)
+        if current is not None:
+            with suppress(Exception):
+                current[0].ClientConnected -= current[1]
+
+    def _url_cache_client_connected(self, nickname, client_id):
+        with self._lock:
+            cache_key = self._url_cache_keys.get(nickname, None)
+            if self._closed or cache_key is None:
+                return
+            service_urls = None
+            with suppress(Exception):
+                service_urls = self._connected_service_urls(nickname, client_id)
+        try:
+            if service_urls is None:
+                self._url_cache.remove(nickname)
+            else:
+                self._url_cache.set(nickname, cache_key, *service_urls)
+        finally:
+            # The connect time is recorded after the cache is written, so the cache is current when
+            # WaitDevices returns
+            with self._lock:
+                self._url_cache_updated.add(nickname)
+                self._cv.notify_all()
+
+    def _url_cache_service_detected(self, nickname, service_info):
+        # The cached service was found by discovery. Update the URLs if the service has moved.
+        update = None
+        with self._lock:
+            if nickname not in self._url_cache_discovery:
+                return
+            cached = self._url_cache.get(nickname, self._url_cache_keys.get(nickname, None))
+            urls = list(service_info.ConnectionURL)
+            if cached is None or cached["node_id"] != str(service_info.NodeID) \
+                    or cached["service_name"] != service_info.Name or cached["urls"] == urls:
+                return
+            with suppress(Exception):
+                self.subscription_manager.GetSubscription(nickname).UpdateServiceURL(urls)
+            update = (nickname, self._url_cache_keys[nickname], str(service_info.NodeID), service_info.Name, urls)
+        self._url_cache.set(*update)
+
+    def _connected_service_urls(self, nickname, client_id):
+        sub = self.subscription_manager.GetSubscription(nickname)
+        if nickname in self._url_cache_discovery:
+            urls = list(sub.ServiceURL)
+        else:
+            res, node_info = self._node.TryGetDetectedNodeCacheInfo(client_id.NodeID)
+            if not res:
+                return None
+            urls = [_url_with_service_name(u, client_id.ServiceName) for u in node_info.ConnectionURL]
+        return str(client_id.NodeID), client_id.ServiceName, urls
+
+    def _start_connect(self, nickname):
+        # Subscriptions are enabled directly without a limit. Otherwise the device is queued
+        # and enabled by _schedule_connections
+        if self._max_concurrent_connections is None:
+            self._connect_start.setdefault(nickname, time.monotonic())
+        elif nickname not in self._connect_queue and nickname not in self._connect_start:
+            self._connect_queue.append(nickname)
+            self._connect_queue.sort(key=lambda n: -self._priorities.get(n, 0))
+            self._schedule_connections()
+        if self._timer is None and not self._closed:
+            self._timer = self._node.CreateTimer(0.05, self._connect_timer_handler)
+            self._timer.Start()
+
+    def _schedule_connections(self):
+        while self._connect_queue and len(self._connecting) < self._max_concurrent_connections:
+            nickname = self._connect_queue.pop(0)
+            now = time.monotonic()
+            self._connecting[nickname] = now
+            self._connect_start[nickname] = now
+            self.subscription_manager.EnableSubscription(nickname)
+
+    def _connect_timer_handler(self, timer_evt):
+        if timer_evt.stopped:
+            return
+        with self._lock:
+            now = time.monotonic()
+            for nickname, t_start in list(self._connect_start.items()):
+                if nickname in self._connect_times:
+                    continue
+                if self.subscription_manager.IsConnected(nickname):
+                    if nickname in self._url_cache_keys and nickname not in self._url_cache_updated:
+                        continue
+                    self._connect_times[nickname] = now - t_start
+                    self._connecting.pop(nickname, None)
+                    continue
+                if nickname in self._connecting and now - t_start > self._connection_attempt_timeout:
+                    del self._connecting[nickname]
+                if nickname in self._url_cache_discovery and now - t_start > self._url_cache_timeout:
+                    # The cached service is not available, use the first service found by discovery
+                    detected = list(self._url_cache_discovery[nickname].GetDetectedServiceInfo2().values())
+                    if len(detected) > 0:
+                        self._remove_url_cache_discovery(nickname)
+                        with suppress(Exception):
+                            self.subscription_manager.GetSubscription(nickname).UpdateServiceURL(
+                                list(detected[0].ConnectionURL), close_connected=True)
+            if self._max_concurrent_connections is not None:
+                self._schedule_connections()
+            if not self._connect_queue and all(n in self._connect_times for n in self._connect_start):
+                # Nothing left to track. _start_connect creates a new timer when needed
+                if self._timer is not None:
+                    with suppress(Exception):
+                        self._timer.Stop()
+                    self._timer = None
+            self._cv.notify_all()
 
     def AddDevice(self, device_details, force_connect=False):
         """
@@ -259,7 +498,16 @@ class DeviceConnector:
         :type close: bool
         """
 
-        self.subscription_manager.RemoveSubscription(device_nickname, close)
+        with self._lock:
+            self._remove_connect_state(device_nickname)
+            self._priorities.pop(device_nickname, None)
+            self._device_details.pop(device_nickname, None)
+            self._remove_url_cache_discovery(device_nickname)
+            self._detach_url_cache_handler(device_nickname)
+            self._url_cache_keys.pop(device_nickname, None)
+            self.subscription_manager.RemoveSubscription(device_nickname, close)
+            if self._max_concurrent_connections is not None:
+                self._schedule_connections()
 
     def ConnectDevice(self, device_nickname):
         """
@@ -269,7 +517,10 @@ class DeviceConnector:
         :type device_nickname: str
         """
 
-        self.subscription_manager.EnableSubscription(device_nickname)
+        with self._lock:
+            if self._max_concurrent_connections is None:
+                self.subscription_manager.EnableSubscription(device_nickname)
+            self._start_connect(device_nickname)
 
     def DisconnectDevice(self, device_nickname, close=True):
         """
@@ -281,7 +532,69 @@ class DeviceConnector:
         :type close: bool
         """
 
-        self.subscription_manager.DisableSubscription(device_nickname, close)
+        with self._lock:
+            self._remove_connect_state(device_nickname)
+            self.subscription_manager.DisableSubscription(device_nickname, close)
+            if self._max_concurrent_connections is not None:
+                self._schedule_connections()
+
+    def ApplyDeviceList(self, device_list, close=True):
+        """
+        Update the DeviceConnector to match a new list of devices
+
+        The new list is compared to the current devices. Devices not in the new list are removed, new devices
+        are added, and devices with changed DeviceConnectorDetails are removed and added again. Devices with
+        unchanged details keep their existing subscription and connections. A change to only the ``priority``
+        is applied without reconnecting. Changed devices keep their enabled state.
+
+        This can be used to reload the device list from a YAML file while the DeviceConnector is running.
+
+        :param device_list: The new list of DeviceConnectorDetails
+        :type device_list: list[DeviceConnectorDetails]
+        :param close: (optional) If True, close the connections of removed and changed devices
+        :type close: bool
+        :return: The nicknames of the added, removed, and updated devices
+        :rtype: tuple[list[str], list[str], list[str]]
+        """
+        new_details = dict()
+        for device_details in device_list:
+            if device_details.device_nickname in new_details:
+                raise RR.InvalidArgumentException(f"Duplicate device nickname {device_details.device_nickname}")
+            # Check the details are valid before making any changes
+            _device_details_to_subscription_details(self._node, device_details.device_nickname, device_details)
+            new_details[device_details.device_nickname] = device_details
+
+        with self._lock:
+            current_details = dict(self._device_details)
+
+        removed = [n for n in current_details if n not in new_details]
+        added = []
+        updated = []
+
+        for nickname in removed:
+            self.RemoveDevice(nickname, close)
+
+        for device_details in sorted(new_details.values(), key=lambda d: -getattr(d, "priority", 0)):
+            nickname = device_details.device_nickname
+            current = current_details.get(nickname, None)
+            if current is None:
+                self._do_update_device(device_details)
+                added.append(nickname)
+            elif _device_details_equal(current, device_details, ("priority",)):
+                with self._lock:
+                    self._device_details[nickname] = device_details
+                    if self._priorities.get(nickname, 0) != getattr(device_details, "priority", 0):
+                        self._priorities[nickname] = getattr(device_details, "priority", 0)
+                        self._connect_queue.sort(key=lambda n: -self._priorities.get(n, 0))
+                        updated.append(nickname)
+            else:
+                with self._lock:
+                    enabled = self.subscription_manager.IsEnabled(nickname) or nickname in self._connect_queue
+                self.RemoveDevice(nickname, close)
+                self._do_update_device(device_details, enable=enabled)
+                updated.append(nickname)
+
+        return added, removed, updated
 
     def GetDevice(self, device_nickname, force_create=False):
         """
@@ -311,11 +624,140 @@ class DeviceConnector:
         except:
             return False, None
 
+    def WaitDevices(self, device_nicknames=None, fraction=None, timeout=-1):
+        """
+        Wait for devices to connect
+
+        If ``device_nicknames`` is specified, wait for all of the listed devices to connect. If ``fraction`` is
+        specified, wait for at least that fraction of the devices being connected to connect. Devices that
+        were not connected because ``autoconnect`` is False, or that were stopped using ``DisconnectDevice``,
+        are not counted. If both are specified, both conditions must be met. If neither is specified, wait
+        for all devices being connected to connect.
+
+        A device counts as connected if it has connected at least once, as reported by ``DeviceConnectTimes``.
+        Devices that disconnected later are still counted.
+
+        :param device_nicknames: (optional) The nicknames of the devices to wait for
+        :type device_nicknames: list[str]
+        :param fraction: (optional) The fraction of devices to wait for, between 0 and 1
+        :type fraction: float
+        :param timeout: (optional) The timeout in seconds, or -1 to wait forever. Defaults to -1
+        :type timeout: float
+        :return: True if the devices connected before the timeout
+        :rtype: bool
+        """
+        if device_nicknames is None and fraction is None:
+            fraction = 1.0
+        t_end = None if timeout < 0 else time.monotonic() + timeout
+
+        def devices_connected():
+            if device_nicknames is not None:
+                if not all(n in self._connect_times for n in device_nicknames):
+                    return False
+            if fraction is not None:
+                count = len(self._connect_queue) + len(self._connect_start)
+                if count > 0 and len(self._connect_times) < fraction * count:
+                    return False
+            return True
+
+        with self._lock:
+            while not devices_connected():
+                if self._closed:
+                    return False
+                if t_end is None:
+                    self._cv.wait()
+                else:
+                    remaining = t_end - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cv.wait(remaining)
+            return True
+
+    @property
+    def DeviceConnectTimes(self):
+        """
+        Get the time each device took to connect
+
+        The time is measured from when the DeviceConnector started connecting to the device, after waiting
+        for the concurrent connection limit, until the device first connected. Devices that have connected
+        at least once are included, even if they are currently disconnected. Devices that have not
+        connected are not included.
+
+        :return: A dictionary of device nickname to connect time in seconds
+        :rtype: dict[str, float]
+        """
+        with self._lock:
+            return dict(self._connect_times)
+
+    async def AsyncGetClient(self, device_nickname, timeout=-1):
+        """
+        Get the default client of a device without blocking the asyncio event loop
+
+        The Robot Raconteur asynchronous callback is forwarded to the running event loop, so no thread is
+        blocked while waiting for the device to connect.
+
+        :param device_nickname: The nickname of the device
+        :type device_nickname: str
+        :param timeout: (optional) The timeout in seconds, or -1 to wait forever. Defaults to -1
+        :type timeout: float
+        :return: The default client of the device
+        :rtype: RobotRaconteur.ServiceStub
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def set_result(client, err):
+            if future.done():
+                return
+            if err is not None:
+                future.set_exception(err)
+            else:
+                future.set_result(client)
+
+        def handler(client, err):
+            with suppress(RuntimeError):
+                loop.call_soon_threadsafe(set_result, client, err)
+
+        self.GetDevice(device_nickname).AsyncGetDefaultClient(handler, timeout)
+        return await future
+
+    def AsyncEvents(self, device_nicknames=None):
+        """
+        Get an asynchronous iterator of device connect and disconnect events
+
+        Must be called from a running asyncio event loop. The iterator yields DeviceConnectorEvent tuples,
+        starting with a ``connected`` event for each client that is already connected. Each connection is
+        reported once. Devices added after the iterator is created are not included. Close the iterator using ``Close()`` or ``async with``.
+
+        .. code-block:: python
+
+            async with connector.AsyncEvents() as events:
+                async for event in events:
+                    print(event.event, event.device_nickname)
+
+        :param device_nicknames: (optional) The nicknames of the devices to monitor. Defaults to all devices
+        :type device_nicknames: list[str]
+        :return: The asynchronous event iterator
+        :rtype: DeviceConnectorEvents
+        """
+        if device_nicknames is None:
+            device_nicknames = self.DeviceNicknames
+        return DeviceConnectorEvents(self, device_nicknames)
+
     def Close(self):
         """
         Close the DeviceConnector and all subscriptions
         """
 
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                with suppress(Exception):
+                    self._timer.Stop()
+                self._timer = None
+            for nickname in list(self._url_cache_discovery.keys()):
+                self._remove_url_cache_discovery(nickname)
+            self._cv.notify_all()
         self.subscription_manager.Close()
 
     @property
@@ -329,10 +771,207 @@ class DeviceConnector:
         return self.subscription_manager.SubscriptionNames
 
 
+class DeviceConnectorEvent:
+    """
+    Device connect or disconnect event returned by DeviceConnector.AsyncEvents
+
+    :ivar event: ``connected`` or ``disconnected``
+    :vartype event: str
+    :ivar device_nickname: The nickname of the device
+    :vartype device_nickname: str
+    :ivar client: The client that was connected or disconnected
+    :vartype client: RobotRaconteur.ServiceStub
+    """
+
+    def __init__(self, event, device_nickname, client):
+        self.event = event
+        self.device_nickname = device_nickname
+        self.client = client
+
+
+class DeviceConnectorEvents:
+    """
+    Asynchronous iterator of device connect and disconnect events. Use DeviceConnector.AsyncEvents()
+    to create.
+
+    :param connector: The DeviceConnector
+    :type connector: DeviceConnector
+    :param device_nicknames: The nicknames of the devices to monitor
+    :type device_nicknames: list[str]
+    """
+
+    def __init__(self, connector, device_nicknames):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._handlers = []
+        self._closed = False
+        # Clients reported from GetConnectedClients. A client that connects after the handlers are added but
+        # before the snapshot is read is also reported by its queued callback, which is skipped.
+        self._initial_clients = dict()
+
+        for nickname in device_nicknames:
+            sub = connector.GetDevice(nickname)
+            connected = self._make_handler("connected", nickname)
+            disconnected = self._make_handler("disconnected", nickname)
+            sub.ClientConnected += connected
+            sub.ClientDisconnected += disconnected
+            self._handlers.append((sub, connected, disconnected))
+            clients = sub.GetConnectedClients()
+            self._initial_clients[nickname] = set(clients.keys())
+            for client in clients.values():
+                self._queue.put_nowait(DeviceConnectorEvent("connected", nickname, client))
+
+    def _make_handler(self, event, nickname):
+        def handler(sub, subscription_id, client):
+            with suppress(RuntimeError):
+                self._loop.call_soon_threadsafe(self._put_event, event, nickname, subscription_id, client)
+        return handler
+
+    def _put_event(self, event, nickname, subscription_id, client):
+        initial_clients = self._initial_clients[nickname]
+        if subscription_id in initial_clients:
+            initial_clients.discard(subscription_id)
+            if event == "connected":
+                return
+        self._queue.put_nowait(DeviceConnectorEvent(event, nickname, client))
+
+    def Close(self):
+        """
+        Stop receiving events. Iteration stops after the queued events are returned. Must be called from
+        the event loop thread.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        for sub, connected, disconnected in self._handlers:
+            with suppress(Exception):
+                sub.ClientConnected -= connected
+            with suppress(Exception):
+                sub.ClientDisconnected -= disconnected
+        self._handlers = []
+        self._queue.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self._queue.get()
+        if event is None:
+            # Keep the end marker so later calls also stop
+            self._queue.put_nowait(None)
+            raise StopAsyncIteration
+        return event
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.Close()
+
+
+def _value_equal(a, b):
+    if a is b:
+        return True
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return isinstance(a, np.ndarray) and isinstance(b, np.ndarray) and np.array_equal(a, b)
+    if type(a) != type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_value_equal(a[k], b[k]) for k in a)
+    if isinstance(a, (list, tuple)):
+        return len(a) == len(b) and all(_value_equal(a1, b1) for a1, b1 in zip(a, b))
+    if hasattr(a, "__slots__"):
+        return all(_value_equal(getattr(a, k, None), getattr(b, k, None)) for k in a.__slots__)
+    if hasattr(a, "__dict__"):
+        return _value_equal(vars(a), vars(b))
+    return a == b
+
+
+def _device_details_equal(a, b, ignore=()):
+    a_vars = {k: v for k, v in vars(a).items() if k not in ignore}
+    b_vars = {k: v for k, v in vars(b).items() if k not in ignore}
+    return _value_equal(a_vars, b_vars)
+
+
+class _DeviceUrlCache:
+    # URLs of the services devices last connected to, stored in a YAML file
+
+    def __init__(self, path):
+        self._path = Path(path)
+        self._lock = threading.Lock()
+        self._devices = dict()
+        with suppress(Exception):
+            with open(self._path, "r") as f:
+                devices = yaml.safe_load(f)["devices"]
+            if isinstance(devices, dict):
+                self._devices = devices
+
+    def get(self, nickname, cache_key):
+        with self._lock:
+            entry = self._devices.get(nickname, None)
+            if not isinstance(entry, dict) or entry.get("key", None) != cache_key \
+                    or not isinstance(entry.get("urls", None), list) or len(entry["urls"]) == 0:
+                return None
+            return dict(entry)
+
+    def set(self, nickname, cache_key, node_id, service_name, urls):
+        entry = {"key": cache_key, "node_id": node_id, "service_name": service_name, "urls": list(urls)}
+        with self._lock:
+            if self._devices.get(nickname, None) == entry:
+                return
+            self._devices[nickname] = entry
+            self._save()
+
+    def remove(self, nickname):
+        with self._lock:
+            if self._devices.pop(nickname, None) is not None:
+                self._save()
+
+    def _save(self):
+        # The cache only speeds up connecting, so failing to write it is not an error
+        with suppress(OSError):
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._path.with_name(self._path.name + ".tmp")
+            with open(tmp_path, "w") as f:
+                yaml.safe_dump({"devices": self._devices}, f)
+            os.replace(tmp_path, self._path)
+
+
+def _cache_key_value(v):
+    if isinstance(v, np.ndarray):
+        return _cache_key_value(v.tolist())
+    if isinstance(v, dict):
+        return {str(k): _cache_key_value(v1) for k, v1 in v.items()}
+    if isinstance(v, (list, tuple)):
+        return [_cache_key_value(v1) for v1 in v]
+    if v is None or isinstance(v, (str, int, float, bool)):
+        return v
+    if hasattr(v, "__slots__"):
+        return {k: _cache_key_value(getattr(v, k, None)) for k in v.__slots__}
+    if hasattr(v, "__dict__"):
+        return _cache_key_value(vars(v))
+    return str(v)
+
+
+def _device_details_cache_key(device_details):
+    # Cached URLs are only used if the details used to find the device are unchanged
+    key_vars = {k: v for k, v in vars(device_details).items() if k != "priority"}
+    key_json = json.dumps(_cache_key_value(key_vars), sort_keys=True, default=str)
+    return hashlib.sha256(key_json.encode("utf-8")).hexdigest()
+
+
+def _url_with_service_name(url, service_name):
+    # Use the same form as the service discovery URLs
+    url = re.sub(r"nodeid=\{([^}]*)\}", r"nodeid=\1", url)
+    if re.search(r"[?&]service=", url):
+        return re.sub(r"([?&])service=[^&]*", lambda m: m.group(1) + "service=" + service_name, url)
+    return url + ("&" if "?" in url else "?") + "service=" + service_name
+
+
 def _device_details_to_subscription_details(node, nickname, device_details):
     if device_details.urls is not None:
         url_param = device_details.urls
-        if not isinstance(device_details.urls, collections.abc.Sequence) and not isinstance(device_details.urls, str):
+        if isinstance(device_details.urls, str) or not isinstance(device_details.urls, collections.abc.Sequence):
             url_param = [device_details.urls]
         username = None
         credentials = None
@@ -490,6 +1129,8 @@ def load_device_details_from_yaml_dict(yaml_dict):
             args["serial_number"] = v["serial_number"]
         if v.get("tags") is not None:
             args["tags"] = v["tags"]
+        if v.get("priority") is not None:
+            args["priority"] = v["priority"]
         details_out1 = DeviceConnectorDetails(k, **args)
         details_out.append(details_out1)
     return details_out
@@ -21,6 +21,52 @@ def _name_from_identifier(id_):
     return id_.name
 
 
+def _batch_R2q(R):
+    # Vectorized version of rox.R2q for an (N,3,3) array of rotation matrices
+    R = np.asarray(R, dtype=np.float64)
+    q = np.zeros(R.shape[:-2] + (4,), dtype=np.float64)
+    tr = R[..., 0, 0] + R[..., 1, 1] + R[..., 2, 2]
+    m0 = tr > 0
+    m1 = ~m0 & (R[..., 0, 0] > R[..., 1, 1]) & (R[..., 0, 0] > R[..., 2, 2])
+    m2 = ~m0 & ~m1 & (R[..., 1, 1] > R[..., 2, 2])
+    m3 = ~m0 & ~m1 & ~m2
+
+    R0 = R[m0]
+    S = 2 * np.sqrt(tr[m0] + 1)
+    q[m0] = np.stack((0.25 * S, (R0[:, 2, 1] - R0[:, 1, 2]) / S, (R0[:, 0, 2] - R0[:, 2, 0]) / S,
+                      (R0[:, 1, 0] - R0[:, 0, 1]) / S), axis=-1)
+    R1 = R[m1]
+    S = 2 * np.sqrt(1 + R1[:, 0, 0] - R1[:, 1, 1] - R1[:, 2, 2])
+    q[m1] = np.stack(((R1[:, 2, 1] - R1[:, 1, 2]) / S, 0.25 * S, (R1[:, 0, 1] + R1[:, 1, 0]) / S,
+                      (R1[:, 0, 2] + R1[:, 2, 0]) / S), axis=-1)
+    R2 = R[m2]
+    S = 2 * np.sqrt(1 - R2[:, 0, 0] + R2[:, 1, 1] - R2[:, 2, 2])
+    q[m2] = np.stack(((R2[:, 0, 2] - R2[:, 2, 0]) / S, (R2[:, 0, 1] + R2[:, 1, 0]) / S, 0.25 * S,
+                      (R2[:, 1, 2] + R2[:, 2, 1]) / S), axis=-1)
+    R3 = R[m3]
+    S = 2 * np.sqrt(1 - R3[:, 0, 0] - R3[:, 1, 1] + R3[:, 2, 2])
+    q[m3] = np.stack(((R3[:, 1, 0] - R3[:, 0, 1]) / S, (R3[:, 0, 2] + R3[:, 2, 0]) / S,
+                      (R3[:, 1, 2] + R3[:, 2, 1]) / S, 0.25 * S), axis=-1)
+    return q
+
+
+def _batch_q2R(q):
+    # Vectorized version of rox.q2R for an (N,4) array of quaternions
+    q = np.asarray(q, dtype=np.float64)
+    w, x, y, z = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+    R = np.empty(q.shape[:-1] + (3, 3), dtype=np.float64)
+    R[..., 0, 0] = 1 - 2 * (y * y + z * z)
+    R[..., 0, 1] = 2 * (x * y - w * z)
+    R[..., 0, 2] = 2 * (x * z + w * y)
+    R[..., 1, 0] = 2 * (x * y + w * z)
+    R[..., 1, 1] = 1 - 2 * (x * x + z * z)
+    R[..., 1, 2] = 2 * (y * z - w * x)
+    R[..., 2, 0] = 2 * (x * z - w * y)
+    R[..., 2, 1] = 2 * (y * z + w * x)
+    R[..., 2, 2] = 1 - 2 * (x * x + y * y)
+    return R
+
+
 class GeometryUtil(object):
     def __init__(self, node=None, client_obj=None):
         if node is None:
@@ -561,6 +607,48 @@ class GeometryUtil(object):
         """
         return self._rox_transform_to_xyz_rpy(self.pose_to_rox_transform(transform))
 
+    def transforms_to_poses(self, T, dtype=np.float64):
+        """
+        Converts an array of 4x4 homogeneous transforms to a Robot Raconteur Pose array
+
+        :param T: The (N,4,4) array of homogeneous transforms
+        :type T: numpy.ndarray
+        :param dtype: The numpy dtype of the poses. Must be float64 or float32. Defaults to float64
+        :type dtype: numpy.dtype
+        :return: The Robot Raconteur Pose array with N elements
+        :rtype: com.robotraconteur.geometry.Pose[]
+        """
+        T = np.asarray(T)
+        ret = np.zeros((T.shape[0],), dtype=self._create_return_np(self._pose_type, dtype).dtype)
+        q = _batch_R2q(T[:, 0:3, 0:3])
+        ret["orientation"]["w"] = q[:, 0]
+        ret["orientation"]["x"] = q[:, 1]
+        ret["orientation"]["y"] = q[:, 2]
+        ret["orientation"]["z"] = q[:, 3]
+        ret["position"]["x"] = T[:, 0, 3]
+        ret["position"]["y"] = T[:, 1, 3]
+        ret["position"]["z"] = T[:, 2, 3]
+        return ret
+
+    def poses_to_transforms(self, rr_poses):
+        """
+        Converts a Robot Raconteur Pose array to an array of 4x4 homogeneous transforms
+
+        :param rr_poses: The Robot Raconteur Pose array
+        :type rr_poses: com.robotraconteur.geometry.Pose[]
+        :return: The (N,4,4) array of homogeneous transforms
+        :rtype: numpy.ndarray
+        """
+        o = rr_poses["orientation"]
+        p = rr_poses["position"]
+        T = np.zeros((len(rr_poses), 4, 4), dtype=np.float64)
+        T[:, 0:3, 0:3] = _batch_q2R(np.stack((o["w"], o["x"], o["y"], o["z"]), axis=-1))
+        T[:, 0, 3] = p["x"]
+        T[:, 1, 3] = p["y"]
+        T[:, 2, 3] = p["z"]
+        T[:, 3, 3] = 1
+        return T
+
     def rox_transform_to_named_pose(self, rox_transform, dtype=np.float64):
         """
         Converts a general_robotics_toolbox Transform to a Robot Raconteur NamedPose. The client_frame_id
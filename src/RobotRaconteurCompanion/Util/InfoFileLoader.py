@@ -2,10 +2,40 @@ import RobotRaconteur as RR
 RRN = RR.RobotRaconteurNode.s
 import numpy as np
 import re
+import multiprocessing
+import threading
+import traceback
+import hashlib
+import os
+import yaml
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from RobotRaconteur.RobotRaconteurPythonUtil import PackMessageElement, UnpackMessageElement
 
 from .LocalIdentifiersManager import LocalIdentifiersManager
 from .IdentifierUtil import IdentifierUtil
-from ..InfoParser import InfoParser
+from ..InfoParser import InfoParser, _InfoYamlLoader
+
+_bulk_worker_node = None
+
+
+def _bulk_worker_init(extra_robdefs):
+    # Each worker process uses its own node with the standard types registered
+    global _bulk_worker_node
+    from ..StdRobDef import RegisterStdRobDefServiceTypes
+    _bulk_worker_node = RR.RobotRaconteurNode()
+    _bulk_worker_node.Init()
+    RegisterStdRobDefServiceTypes(_bulk_worker_node)
+    if extra_robdefs:
+        _bulk_worker_node.RegisterServiceTypes(list(extra_robdefs))
+
+
+def _bulk_worker_parse(file_name, info_type_name):
+    parser = InfoParser(_bulk_worker_node)
+    info = parser.ParseInfoFile(file_name, info_type_name)
+    m = PackMessageElement(info, info_type_name, node=_bulk_worker_node)
+    m.UpdateData()
+    return bytes(RR.MessageElementToBytes(m))
 
 
 class InfoFileLoader(object):
@@ -110,3 +140,280 @@ class InfoFileLoader(object):
         info = self._info_parser.ParseInfoFile(file_name, info_type_name)
         _, _, fds = self._load_device_identifier(info, category)
         return info, fds
+
+    def IterLoadInfoFile(self, file_name, info_type_name=None, category="unspecified"):
+        """
+        Iterate over a multi-document YAML file containing device info structures and assign
+        device identifiers as each structure is parsed
+
+        See ``InfoParser.IterParseInfoDocuments`` for how the structure type of each document is declared.
+
+        :param file_name: The file name or file object of the multi-document Yaml file
+        :type file_name: str
+        :param info_type_name: (optional) The type name for documents that do not declare a type
+        :type info_type_name: str
+        :param category: (optional) The category of the device identifiers. Defaults to "unspecified".
+        :type category: str
+        :return: An iterator of tuples containing the loaded info Yaml structure and the device identifier
+            lock file descriptor
+        :rtype: Iterator[tuple]
+        """
+        for _, info in self._info_parser.IterParseInfoFile(file_name, info_type_name):
+            _, _, fds = self._load_device_identifier(info, category)
+            yield info, fds
+
+    def LoadInfoFiles(self, info_files, category="unspecified", max_workers=None, extra_robdefs=None,
+                      min_parallel_files=8):
+        """
+        Load many device info Yaml structures from files in parallel and assign device identifiers
+
+        The files are parsed concurrently in a process pool. Each worker process creates its own
+        node, registers the standard service types, parses the file, and returns the structure
+        serialized as a message element. The structures are deserialized in this process, and the
+        device identifiers are assigned and locked in this process in the order of ``info_files``.
+
+        Service types other than the standard types must be passed using ``extra_robdefs``.
+
+        The process pool uses the ``spawn`` start method, so each worker imports the ``__main__`` module of
+        the calling program. Scripts that call this function must use an ``if __name__ == "__main__":``
+        guard. If ``max_workers`` is 1 or there are fewer than ``min_parallel_files`` files, the files are
+        parsed in this process without starting a process pool.
+
+        :param info_files: A list of ``(file_name, info_type_name)`` or ``(file_name, info_type_name, category)``
+            tuples
+        :type info_files: list[tuple]
+        :param category: (optional) The default category of the device identifiers. Defaults to "unspecified".
+        :type category: str
+        :param max_workers: (optional) The number of worker processes. Defaults to the number of CPUs
+        :type max_workers: int
+        :param extra_robdefs: (optional) Additional service definition texts to register in the workers
+        :type extra_robdefs: list[str]
+        :param min_parallel_files: (optional) The minimum number of files to use a process pool. Defaults to 8
+        :type min_parallel_files: int
+        :return: A list of tuples containing the loaded info Yaml structure and the device identifier
+            lock file descriptor, in the same order as ``info_files``
+        :rtype: list[tuple]
+        """
+        file_names = []
+        type_names = []
+        categories = []
+        for f in info_files:
+            if len(f) == 3:
+                file_name, info_type_name, f_category = f
+            else:
+                file_name, info_type_name = f
+                f_category = category
+            if not isinstance(file_name, (str, Path)):
+                raise RR.InvalidArgumentException("LoadInfoFiles requires file names")
+            file_names.append(str(file_name))
+            type_names.append(info_type_name)
+            categories.append(f_category)
+
+        if len(file_names) == 0:
+            return []
+
+        serialized = None
+        if max_workers != 1 and len(file_names) >= min_parallel_files:
+            mp_context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context,
+                                     initializer=_bulk_worker_init, initargs=(extra_robdefs,)) as executor:
+                serialized = list(executor.map(_bulk_worker_parse, file_names, type_names))
+
+        ret = []
+        try:
+            for i, (file_name, info_type_name, f_category) in enumerate(zip(file_names, type_names, categories)):
+                if serialized is None:
+                    info = self._info_parser.ParseInfoFile(file_name, info_type_name)
+                else:
+                    m = RR.MessageElementFromBytes(bytearray(serialized[i]))
+                    info = UnpackMessageElement(m, info_type_name, self._client_obj, self._node)
+                _, _, fds = self._load_device_identifier(info, f_category)
+                ret.append((info, fds))
+        except:
+            for _, fds in ret:
+                if fds is not None:
+                    fds.__exit__(None, None, None)
+            raise
+        return ret
+
+
+class InfoFileWatcher(object):
+    """
+    Utility class to watch device info Yaml files and reload them when they change
+
+    The files are polled periodically using the node timer. A file is only read when its modification
+    time or size changes, and is only parsed when the hash of its contents changes. The callback receives
+    the new structure and the list of top-level fields that changed. The callback is called with
+    ``callback(file_name, info, changed_fields)``.
+
+    Device identifiers are not locked again when a file is reloaded. If the structure returned by
+    ``InfoFileLoader`` is passed to ``AddFile``, its device identifier is kept in reloaded structures
+    as long as the device name does not change.
+
+    :param poll_interval: (optional) The polling interval in seconds. Defaults to 1
+    :type poll_interval: float
+    :param error_handler: (optional) The error handler to call if a file fails to reload
+    :type error_handler: callable
+    :param node: (optional) The Robot Raconteur node to use for parsing. Defaults to RobotRaconteurNode.s
+    :type node: RobotRaconteur.RobotRaconteurNode
+    :param client_obj: (optional) The client object to use for finding types. Defaults to None
+    :type client_obj: RobotRaconteur.ClientObject
+    """
+
+    def __init__(self, poll_interval=1, error_handler=None, node=None, client_obj=None):
+        if node is None:
+            self._node = RRN
+        else:
+            self._node = node
+        self._client_obj = client_obj
+
+        self._info_parser = InfoParser(self._node, self._client_obj)
+        self._poll_interval = poll_interval
+        self._error_handler = error_handler
+        self._lock = threading.RLock()
+        self._files = {}
+        self._poll_timer = None
+
+    def AddFile(self, file_name, info_type_name, callback, info=None):
+        """
+        Add a file to watch
+
+        :param file_name: The file name of the info Yaml structure
+        :type file_name: str
+        :param info_type_name: The type name of the info Yaml structure
+        :type info_type_name: str
+        :param callback: The function called when the file changes
+        :type callback: callable
+        :param info: (optional) The currently loaded structure. Used to keep the device identifier.
+        """
+        file_name = str(file_name)
+        st = os.stat(file_name)
+        with open(file_name, "rb") as f:
+            file_bytes = f.read()
+        entry = {
+            "type_name": info_type_name,
+            "callback": callback,
+            "stat": (st.st_mtime_ns, st.st_size),
+            "hash": hashlib.sha256(file_bytes).digest(),
+            "dict": yaml.load(file_bytes, Loader=_InfoYamlLoader),
+            "info": info
+        }
+        with self._lock:
+            self._files[file_name] = entry
+
+    def RemoveFile(self, file_name):
+        """
+        Stop watching a file
+
+        :param file_name: The file name to remove
+        :type file_name: str
+        """
+        with self._lock:
+            self._files.pop(str(file_name), None)
+
+    def Start(self):
+        """
+        Start polling the watched files using a node timer
+        """
+        with self._lock:
+            if self._poll_timer is not None:
+                return
+            self._poll_timer = self._node.CreateTimer(self._poll_interval, self._handle_poll_timer)
+            self._poll_timer.Start()
+
+    def Close(self):
+        """
+        Stop polling the watched files
+        """
+        with self._lock:
+            if self._poll_timer is None:
+                return
+            self._poll_timer.Stop()
+            self._poll_timer = None
+
+    def Poll(self):
+        """
+        Check the watched files now and reload the files that changed
+
+        :return: The file names that were reloaded
+        :rtype: list[str]
+        """
+        ret = []
+        with self._lock:
+            files = list(self._files.items())
+        for file_name, entry in files:
+            try:
+                if self._poll_file(file_name, entry):
+                    ret.append(file_name)
+            except Exception as e:
+                self._handle_error(e)
+        return ret
+
+    def _poll_file(self, file_name, entry):
+        # The entry is compared and updated under the lock so concurrent polls cannot both reload the
+        # same change. Only the callback is called outside the lock.
+        with self._lock:
+            try:
+                st = os.stat(file_name)
+            except FileNotFoundError:
+                return False
+            file_stat = (st.st_mtime_ns, st.st_size)
+            if file_stat == entry["stat"]:
+                return False
+            entry["stat"] = file_stat
+            with open(file_name, "rb") as f:
+                file_bytes = f.read()
+            file_hash = hashlib.sha256(file_bytes).digest()
+            if file_hash == entry["hash"]:
+                return False
+            entry["hash"] = file_hash
+
+            info_dict = yaml.load(file_bytes, Loader=_InfoYamlLoader)
+            old_dict = entry["dict"] or {}
+            changed_fields = [k for k in info_dict.keys() | old_dict.keys()
+                              if info_dict.get(k, None) != old_dict.get(k, None)]
+            if len(changed_fields) == 0:
+                entry["dict"] = info_dict
+                return False
+            info = self._info_parser.ParseInfoDict(info_dict, entry["type_name"], Path(file_name).parent)
+            _keep_device_identifier(entry["info"], info)
+            entry["dict"] = info_dict
+            entry["info"] = info
+            callback = entry["callback"]
+        callback(file_name, info, sorted(changed_fields))
+        return True
+
+    def _handle_error(self, e):
+        try:
+            if self._error_handler is not None:
+                self._error_handler(e)
+            else:
+                traceback.print_exc()
+        except:
+            traceback.print_exc()
+
+    def _handle_poll_timer(self, timer_evt):
+        if timer_evt.stopped:
+            return
+        self.Poll()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.Close()
+
+
+def _keep_device_identifier(old_info, new_info):
+    if old_info is None:
+        return
+    if hasattr(new_info, "device_info"):
+        if old_info.device_info is None or new_info.device_info is None:
+            return
+        old_info = old_info.device_info
+        new_info = new_info.device_info
+    if not hasattr(new_info, "device") or old_info.device is None or new_info.device is None:
+        return
+    if old_info.device.name == new_info.device.name and \
+            (new_info.device.uuid is None or not np.any(new_info.device.uuid[0]["uuid_bytes"])):
+        new_info.device = old_info.device
@@ -0,0 +1,247 @@
+import RobotRaconteur as RR
+RRN = RR.RobotRaconteurNode.s
+import numpy as np
+
+from .GeometryUtil import _batch_R2q
+from .SensorDataUtil import SensorDataHeaderFactory
+
+
+class _RobotStateBuffer(object):
+    # One set of preallocated state structures. The RobotState and AdvancedRobotState share the same arrays.
+    def __init__(self, publisher, joint_count, chain_count):
+        p = publisher
+        self.ts = np.zeros((1,), dtype=p._timespec3_dt)
+        self.joint_position = np.zeros((joint_count,), dtype=np.float64)
+        self.joint_velocity = np.zeros((joint_count,), dtype=np.float64)
+        self.joint_effort = np.zeros((joint_count,), dtype=np.float64)
+        self.joint_position_command = np.zeros((joint_count,), dtype=np.float64)
+        self.joint_velocity_command = np.zeros((joint_count,), dtype=np.float64)
+        self.kin_chain_tcp = np.zeros((chain_count,), dtype=p._pose_dt)
+        self.kin_chain_tcp["orientation"]["w"] = 1
+        self.kin_chain_tcp_vel = np.zeros((chain_count,), dtype=p._spatial_velocity_dt)
+        self.kin_chain_tcp_flat = self.kin_chain_tcp.view(np.float64).reshape((chain_count, 7))
+        self.kin_chain_tcp_vel_flat = self.kin_chain_tcp_vel.view(np.float64).reshape((chain_count, 6))
+
+        self.robot_state = p._robot_state_type()
+        self.advanced_robot_state = p._advanced_robot_state_type()
+        for s in (self.robot_state, self.advanced_robot_state):
+            s.ts = self.ts
+            s.joint_position = self.joint_position
+            s.joint_velocity = self.joint_velocity
+            s.joint_effort = self.joint_effort
+            s.joint_position_command = self.joint_position_command
+            s.joint_velocity_command = self.joint_velocity_command
+            s.kin_chain_tcp = self.kin_chain_tcp
+            s.kin_chain_tcp_vel = self.kin_chain_tcp_vel
+        self.advanced_robot_state.joint_position_units = p._joint_position_units
+        self.advanced_robot_state.joint_effort_units = p._joint_effort_units
+
+        self.header_ts = np.zeros((1,), dtype=p._timespec2_dt)
+        self.header_ts[0]["clock_info"]["clock_type"] = p._clock_type
+        if p._clock_uuid is not None:
+            self.header_ts[0]["clock_info"]["clock_uuid"] = p._clock_uuid
+        self.header = p._sensordataheader_type()
+        self.header.ts = self.header_ts
+        self.header.source_info = p._source_info
+        self.robot_state_sensor_data = p._robot_state_sensor_data_type()
+        self.robot_state_sensor_data.data_header = self.header
+        self.robot_state_sensor_data.robot_state = self.advanced_robot_state
+
+
+class RobotStatePublisher(object):
+    """
+    Fill RobotState, AdvancedRobotState, and RobotStateSensorData structures for high rate robot drivers
+    without allocating new structures each control cycle
+
+    Two sets of state structures and arrays are allocated when the publisher is created. Each call to
+    ``update`` writes the new data in place into the set that was not returned by the previous call,
+    advances the sequence number and timestamps, and returns the filled set. The structures returned by an
+    update remain unchanged until the next-but-one update, so they can be sent on wires and pipes while the
+    next cycle is being filled. The RobotState and AdvancedRobotState of a set share the same arrays, and
+    the AdvancedRobotState is the robot_state of the RobotStateSensorData.
+
+    Structures returned by the publisher must not be modified or stored by the caller.
+
+    :param joint_count: The number of joints of the robot
+    :type joint_count: int
+    :param chain_count: (optional) The number of kinematic chains. Defaults to 1
+    :type chain_count: int
+    :param device_info: (optional) The device info used for the sensor data source info and clock UUID
+    :type device_info: com.robotraconteur.device.DeviceInfo
+    :param joint_position_units: (optional) The JointPositionUnits of each joint for AdvancedRobotState
+    :type joint_position_units: list[int]
+    :param joint_effort_units: (optional) The JointEffortUnits of each joint for AdvancedRobotState
+    :type joint_effort_units: list[int]
+    :param node: (optional) The Robot Raconteur node to use for finding types. Defaults to RobotRaconteurNode.s
+    :type node: RobotRaconteur.RobotRaconteurNode
+    :param client_obj: (optional) The client object to use for finding types. Defaults to None
+    :type client_obj: RobotRaconteur.ClientObject
+    """
+
+    def __init__(self, joint_count, chain_count=1, device_info=None, joint_position_units=None,
+                 joint_effort_units=None, node=None, client_obj=None):
+        if node is None:
+            self._node = RRN
+        else:
+            self._node = node
+        self._client_obj = client_obj
+
+        self._robot_state_type = self._node.GetStructureType(
+            "com.robotraconteur.robotics.robot.RobotState", self._client_obj)
+        self._advanced_robot_state_type = self._node.GetStructureType(
+            "com.robotraconteur.robotics.robot.AdvancedRobotState", self._client_obj)
+        self._robot_state_sensor_data_type = self._node.GetStructureType(
+            "com.robotraconteur.robotics.robot.RobotStateSensorData", self._client_obj)
+        self._sensordataheader_type = self._node.GetStructureType(
+            "com.robotraconteur.sensordata.SensorDataHeader", self._client_obj)
+        self._timespec2_dt = self._node.GetPodDType("com.robotraconteur.datetime.TimeSpec2", self._client_obj)
+        self._timespec3_dt = self._node.GetNamedArrayDType("com.robotraconteur.datetime.TimeSpec3", self._client_obj)
+        self._pose_dt = self._node.GetNamedArrayDType("com.robotraconteur.geometry.Pose", self._client_obj)
+        self._spatial_velocity_dt = self._node.GetNamedArrayDType(
+            "com.robotraconteur.geometry.SpatialVelocity", self._client_obj)
+        self._clock_type = self._node.GetConstants("com.robotraconteur.datetime", self._client_obj)["ClockTypeCode"]["default"]
+
+        self._joint_count = joint_count
+        self._chain_count = chain_count
+        self._joint_position_units = np.zeros((joint_count,), dtype=np.uint8) if joint_position_units is None \
+            else np.array(joint_position_units, dtype=np.uint8)
+        self._joint_effort_units = np.zeros((joint_count,), dtype=np.uint8) if joint_effort_units is None \
+            else np.array(joint_effort_units, dtype=np.uint8)
+
+        self._clock_uuid = None
+        if device_info is not None and device_info.device is not None:
+            self._clock_uuid = device_info.device.uuid
+        self._source_info = SensorDataHeaderFactory(device_info, node=self._node,
+                                                    client_obj=self._client_obj).source_info
+
+        self._buffers = [_RobotStateBuffer(self, joint_count, chain_count) for _ in range(2)]
+        self._front = 1
+        self._seqno = 0
+
+    @property
+    def seqno(self):
+        """
+        The sequence number of the last update
+
+        :rtype: int
+        """
+        return self._seqno
+
+    def _fill_joint_array(self, dest, v, name):
+        if v is None:
+            dest.fill(0)
+            return
+        v = np.asarray(v)
+        if v.shape != dest.shape:
+            raise RR.InvalidArgumentException(f"{name} must have {self._joint_count} elements")
+        np.copyto(dest, v)
+
+    def update(self, joint_position, joint_velocity=None, joint_effort=None, joint_position_command=None,
+               joint_velocity_command=None, kin_chain_tcp=None, kin_chain_tcp_vel=None, command_mode=0,
+               operational_mode=0, controller_state=0, robot_state_flags=0, trajectory_running=False,
+               trajectory_time=0.0, trajectory_max_time=0.0, trajectory_current_waypoint=0, config_seqno=0,
+               ts=None):
+        """
+        Write the state of the current control cycle into the back buffer and swap the buffers
+
+        Joint arrays and ``kin_chain_tcp_vel`` that are None are filled with zeros, and ``kin_chain_tcp``
+        that is None is filled with the identity pose. The values of the previous update are not kept.
+        ``kin_chain_tcp`` can be a Pose array or a (chain_count, 4, 4) array of homogeneous transforms.
+        ``kin_chain_tcp_vel`` can be a SpatialVelocity array or a (chain_count, 6) array with the angular
+        velocity followed by the linear velocity.
+
+        :param joint_position: The joint positions
+        :type joint_position: numpy.ndarray
+        :param joint_velocity: (optional) The joint velocities
+        :type joint_velocity: numpy.ndarray
+        :param joint_effort: (optional) The joint efforts
+        :type joint_effort: numpy.ndarray
+        :param joint_position_command: (optional) The commanded joint positions
+        :type joint_position_command: numpy.ndarray
+        :param joint_velocity_command: (optional) The commanded joint velocities
+        :type joint_velocity_command: numpy.ndarray
+        :param kin_chain_tcp: (optional) The tool poses of the kinematic chains
+        :type kin_chain_tcp: numpy.ndarray
+        :param kin_chain_tcp_vel: (optional) The tool velocities of the kinematic chains
+        :type kin_chain_tcp_vel: numpy.ndarray
+        :param command_mode: (optional) The RobotCommandMode
+        :type command_mode: int
+        :param operational_mode: (optional) The RobotOperationalMode
+        :type operational_mode: int
+        :param controller_state: (optional) The RobotControllerState
+        :type controller_state: int
+        :param robot_state_flags: (optional) The RobotStateFlags
+        :type robot_state_flags: int
+        :param trajectory_running: (optional) True if a trajectory is running
+        :type trajectory_running: bool
+        :param trajectory_time: (optional) The current trajectory time for AdvancedRobotState
+        :type trajectory_time: float
+        :param trajectory_max_time: (optional) The trajectory duration for AdvancedRobotState
+        :type trajectory_max_time: float
+        :param trajectory_current_waypoint: (optional) The current trajectory waypoint for AdvancedRobotState
+        :type trajectory_current_waypoint: int
+        :param config_seqno: (optional) The configuration sequence number for AdvancedRobotState
+        :type config_seqno: int
+        :param ts: (optional) The node TimeSpec of the state. Defaults to ``node.NowTimeSpec()``
+        :type ts: RobotRaconteur.TimeSpec
+        :return: The filled RobotState, AdvancedRobotState, and RobotStateSensorData
+        :rtype: tuple[com.robotraconteur.robotics.robot.RobotState,
+            com.robotraconteur.robotics.robot.AdvancedRobotState,
+            com.robotraconteur.robotics.robot.RobotStateSensorData]
+        """
+        self._front ^= 1
+        b = self._buffers[self._front]
+        self._seqno += 1
+        seqno = self._seqno
+
+        if ts is None:
+            ts = self._node.NowTimeSpec()
+        ts_seconds = ts.seconds
+        ts_nanoseconds = ts.nanoseconds
+        b.ts[0]["microseconds"] = ts_seconds * 1000000 + ts_nanoseconds // 1000
+        header_ts = b.header_ts[0]
+        header_ts["seconds"] = ts_seconds
+        header_ts["nanoseconds"] = ts_nanoseconds
+        b.header.seqno = seqno
+
+        self._fill_joint_array(b.joint_position, joint_position, "joint_position")
+        self._fill_joint_array(b.joint_velocity, joint_velocity, "joint_velocity")
+        self._fill_joint_array(b.joint_effort, joint_effort, "joint_effort")
+        self._fill_joint_array(b.joint_position_command, joint_position_command, "joint_position_command")
+        self._fill_joint_array(b.joint_velocity_command, joint_velocity_command, "joint_velocity_command")
+
+        if kin_chain_tcp is None:
+            b.kin_chain_tcp_flat.fill(0)
+            b.kin_chain_tcp_flat[:, 0] = 1
+        else:
+            kin_chain_tcp = np.asarray(kin_chain_tcp)
+            if kin_chain_tcp.dtype == self._pose_dt:
+                np.copyto(b.kin_chain_tcp, kin_chain_tcp.reshape(b.kin_chain_tcp.shape))
+            else:
+                if kin_chain_tcp.shape != (self._chain_count, 4, 4):
+                    raise RR.InvalidArgumentException("kin_chain_tcp must be a Pose array or (chain_count, 4, 4) array")
+                b.kin_chain_tcp_flat[:, 0:4] = _batch_R2q(kin_chain_tcp[:, 0:3, 0:3])
+                b.kin_chain_tcp_flat[:, 4:7] = kin_chain_tcp[:, 0:3, 3]
+        if kin_chain_tcp_vel is None:
+            b.kin_chain_tcp_vel_flat.fill(0)
+        else:
+            kin_chain_tcp_vel = np.asarray(kin_chain_tcp_vel)
+            if kin_chain_tcp_vel.dtype == self._spatial_velocity_dt:
+                np.copyto(b.kin_chain_tcp_vel, kin_chain_tcp_vel.reshape(b.kin_chain_tcp_vel.shape))
+            else:
+                b.kin_chain_tcp_vel_flat[:] = kin_chain_tcp_vel.reshape((self._chain_count, 6))
+
+        for s in (b.robot_state, b.advanced_robot_state):
+            s.seqno = seqno
+            s.command_mode = command_mode
+            s.operational_mode = operational_mode
+            s.controller_state = controller_state
+            s.robot_state_flags = robot_state_flags
+            s.trajectory_running = trajectory_running
+        a = b.advanced_robot_state
+        a.trajectory_time = trajectory_time
+        a.trajectory_max_time = trajectory_max_time
+        a.trajectory_current_waypoint = trajectory_current_waypoint
+        a.config_seqno = config_seqno
+
+        return b.robot_state, a, b.robot_state_sensor_data
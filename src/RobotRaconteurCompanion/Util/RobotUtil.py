@@ -2,6 +2,11 @@ import general_robotics_toolbox as rox
 import RobotRaconteur as RR
 RRN = RR.RobotRaconteurNode.s
 import numpy as np
+import collections
+import hashlib
+import threading
+
+from .BatchKinematics import BatchKinematics
 
 
 def _check_list(l, error_msg, expected_count=-1):
@@ -13,6 +18,55 @@ def _check_list(l, error_msg, expected_count=-1):
             raise RR.InvalidArgumentException(error_msg)
 
 
+def _hash_update_identifier(h, ident):
+    if ident is None:
+        h.update(b"\0")
+        return
+    h.update(str(ident.name).encode("utf-8"))
+    h.update(b"\0")
+
+
+def _hash_update_array(h, arr):
+    if arr is None:
+        h.update(b"\0")
+        return
+    h.update(np.ascontiguousarray(arr).tobytes())
+
+
+def _robot_info_chain_fingerprint(robot_info, chain_number):
+    # Fingerprint of the RobotInfo fields used by robot_info_to_rox_robot for a chain
+    h = hashlib.sha1()
+    h.update(str(chain_number).encode("ascii"))
+    if robot_info.chains is None or chain_number >= len(robot_info.chains):
+        return None
+    chain = robot_info.chains[chain_number]
+    if chain.joint_numbers is None:
+        return None
+    _hash_update_array(h, np.asarray(chain.joint_numbers, dtype=np.int64))
+    _hash_update_array(h, chain.H)
+    _hash_update_array(h, chain.P)
+    _hash_update_array(h, chain.flange_pose)
+    if chain.link_identifiers is not None and len(chain.link_identifiers) > 0:
+        _hash_update_identifier(h, chain.link_identifiers[0])
+    else:
+        h.update(b"\0")
+    _hash_update_identifier(h, chain.flange_identifier)
+    if robot_info.joint_info is not None:
+        for j in chain.joint_numbers:
+            if j >= len(robot_info.joint_info):
+                return None
+            j_info = robot_info.joint_info[j]
+            h.update(str(j_info.joint_type).encode("ascii"))
+            l = j_info.joint_limits
+            if l is not None:
+                h.update(np.array([l.lower, l.upper, l.velocity, l.acceleration], dtype=np.float64).tobytes())
+            _hash_update_identifier(h, j_info.joint_identifier)
+    device_info = robot_info.device_info
+    if device_info is not None and device_info.device_origin_pose is not None:
+        _hash_update_array(h, device_info.device_origin_pose.pose)
+    return h.digest()
+
+
 class RobotUtil:
     """
     Utility class to convert a Robot Raconteur com.robotraconteur.robotics.robot.RobotInfo to
@@ -24,15 +78,22 @@ class RobotUtil:
     :type node: RobotRaconteur.RobotRaconteurNode
     :param client_obj: (optional) The client object to use for finding types. Defaults to None
     :type client_obj: RobotRaconteur.ClientObject
+    :param rox_robot_cache_size: (optional) The maximum number of converted robots kept by
+        ``robot_info_to_rox_robot_cached``. Defaults to 32
+    :type rox_robot_cache_size: int
     """
 
-    def __init__(self, node=None, client_obj=None):
+    def __init__(self, node=None, client_obj=None, rox_robot_cache_size=32):
         if node is None:
             self._node = RRN
         else:
             self._node = node
         self._client_obj = client_obj
 
+        self._rox_robot_cache = collections.OrderedDict()
+        self._rox_robot_cache_size = rox_robot_cache_size
+        self._rox_robot_cache_lock = threading.Lock()
+
     def robot_info_to_rox_robot(self, robot_info, chain_number):
         """
         Convert a RobotInfo to a general_robotics_toolbox.Robot object
@@ -61,17 +122,8 @@ class RobotUtil:
         _check_list(chain.H, f"invalid shape for H in chain number {chain_number}", joint_count)
         _check_list(chain.P, f"invalid shape for P in chain number {chain_number}", joint_count + 1)
 
-        H = np.zeros((3, joint_count), dtype=np.float64)
-        for i in range(joint_count):
-            H[0, i] = chain.H[i]["x"]
-            H[1, i] = chain.H[i]["y"]
-            H[2, i] = chain.H[i]["z"]
-
-        P = np.zeros((3, joint_count + 1), dtype=np.float64)
-        for i in range(joint_count + 1):
-            P[0, i] = chain.P[i]["x"]
-            P[1, i] = chain.P[i]["y"]
-            P[2, i] = chain.P[i]["z"]
+        H = np.vstack((chain.H["x"], chain.H["y"], chain.H["z"])).astype(np.float64)
+        P = np.vstack((chain.P["x"], chain.P["y"], chain.P["z"])).astype(np.float64)
 
         joint_type = [0] * joint_count
         joint_lower_limit = np.zeros((joint_count,), dtype=np.float64)
@@ -81,7 +133,7 @@ class RobotUtil:
         joint_names = [None] * joint_count
 
         for i in range(joint_count):
-            j = robot_info.joint_info[i]
+            j = robot_info.joint_info[chain.joint_numbers[i]]
             if j.joint_type == 1:
                 # Revolute joint
                 joint_type[i] = 0
@@ -131,3 +183,116 @@ class RobotUtil:
                               T_flange=rox.Transform(r_flange, p_flange), T_base=T_base)
 
         return rox_robot
+
+    def robot_info_to_rox_robot_cached(self, robot_info, chain_number):
+        """
+        Convert a RobotInfo to a general_robotics_toolbox.Robot object, reusing a previous conversion
+        if the kinematic chain and joint info have not changed
+
+        The cache is keyed by a fingerprint of the contents of the RobotInfo fields used in the
+        conversion, and the least recently used robots are evicted. The returned robot is shared
+        between calls and must not be modified.
+
+        :param robot_info: The RobotInfo to convert
+        :type robot_info: com.robotraconteur.robotics.robot.RobotInfo
+        :param chain_number: The kinematic chain number to convert
+        :type chain_number: int
+        :return: The converted robot
+        :rtype: general_robotics_toolbox.Robot
+        """
+        key = _robot_info_chain_fingerprint(robot_info, chain_number)
+        if key is None:
+            # Let robot_info_to_rox_robot raise the error for the invalid chain
+            return self.robot_info_to_rox_robot(robot_info, chain_number)
+        with self._rox_robot_cache_lock:
+            rox_robot = self._rox_robot_cache.get(key, None)
+            if rox_robot is not None:
+                self._rox_robot_cache.move_to_end(key)
+                return rox_robot
+
+        rox_robot = self.robot_info_to_rox_robot(robot_info, chain_number)
+
+        with self._rox_robot_cache_lock:
+            self._rox_robot_cache[key] = rox_robot
+            while len(self._rox_robot_cache) > self._rox_robot_cache_size:
+                self._rox_robot_cache.popitem(last=False)
+        return rox_robot
+
+    def robot_info_to_rox_robots(self, robot_info):
+        """
+        Convert all kinematic chains in a RobotInfo to general_robotics_toolbox.Robot objects
+
+        The conversions are cached in the same way as ``robot_info_to_rox_robot_cached``.
+
+        :param robot_info: The RobotInfo to convert
+        :type robot_info: com.robotraconteur.robotics.robot.RobotInfo
+        :return: The converted robots, one for each kinematic chain
+        :rtype: list[general_robotics_toolbox.Robot]
+        """
+        _check_list(robot_info.chains, "could not find kinematic chains")
+        return [self.robot_info_to_rox_robot_cached(robot_info, i) for i in range(len(robot_info.chains))]
+
+    def robot_info_to_batch_kinematics(self, robot_info, chain_number):
+        """
+        Create a BatchKinematics object for a kinematic chain in a RobotInfo. The converted robot is
+        cached in the same way as ``robot_info_to_rox_robot_cached``.
+
+        :param robot_info: The RobotInfo to convert
+        :type robot_info: com.robotraconteur.robotics.robot.RobotInfo
+        :param chain_number: The kinematic chain number to convert
+        :type chain_number: int
+        :return: The vectorized kinematics for the chain
+        :rtype: RobotRaconteurCompanion.Util.BatchKinematics.BatchKinematics
+        """
+        rox_robot = self.robot_info_to_rox_robot_cached(robot_info, chain_number)
+        return BatchKinematics(rox_robot, robot_info.chains[chain_number].joint_numbers)
+
+    def robot_info_joint_limits(self, robot_info, chain_number=None, joint_names=None):
+        """
+        Read the joint limits from the JointInfo structures of a RobotInfo
+
+        The joints are selected by name if joint_names is specified, otherwise by the joint numbers of
+        the kinematic chain if chain_number is specified, otherwise all joints are returned.
+
+        :param robot_info: The RobotInfo to read
+        :type robot_info: com.robotraconteur.robotics.robot.RobotInfo
+        :param chain_number: (optional) The kinematic chain number
+        :type chain_number: int
+        :param joint_names: (optional) The names of the joints
+        :type joint_names: list[str]
+        :return: The lower, upper, velocity, and acceleration limit arrays
+        :rtype: tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        """
+        _check_list(robot_info.joint_info, "joint_info must not be null")
+        if joint_names is not None and len(joint_names) > 0:
+            all_names = [j.joint_identifier.name if j.joint_identifier is not None else ""
+                         for j in robot_info.joint_info]
+            joint_numbers = []
+            for n in joint_names:
+                if n not in all_names:
+                    raise RR.InvalidArgumentException(f"invalid joint name: {n}")
+                joint_numbers.append(all_names.index(n))
+        elif chain_number is not None:
+            _check_list(robot_info.chains, f"could not find kinematic chain number {chain_number}")
+            if chain_number >= len(robot_info.chains):
+                raise RR.InvalidArgumentException(f"invalid kinematic chain number {chain_number}")
+            joint_numbers = robot_info.chains[chain_number].joint_numbers
+        else:
+            joint_numbers = range(len(robot_info.joint_info))
+
+        limits = np.zeros((4, len(joint_numbers)), dtype=np.float64)
+        for i, j_num in enumerate(joint_numbers):
+            if j_num >= len(robot_info.joint_info):
+                raise RR.InvalidArgumentException(f"joint number out of bounds: {j_num}")
+            l = robot_info.joint_info[j_num].joint_limits
+            if l is None:
+                raise RR.InvalidArgumentException("joint_limits must not be null")
+            limits[:, i] = (l.lower, l.upper, l.velocity, l.acceleration)
+        return limits[0], limits[1], limits[2], limits[3]
+
+    def clear_rox_robot_cache(self):
+        """
+        Clear the cache used by ``robot_info_to_rox_robot_cached``
+        """
+        with self._rox_robot_cache_lock:
+            self._rox_robot_cache.clear()
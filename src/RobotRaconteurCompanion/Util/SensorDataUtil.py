@@ -1,6 +1,7 @@
 import RobotRaconteur as RR
 RRN = RR.RobotRaconteurNode.s
 import numpy as np
+import itertools
 
 from .DateTimeUtil import DateTimeUtil
 
@@ -46,3 +47,94 @@ class SensorDataUtil(object):
         ret.source_info.source = device_info.device
         ret.source_info.source_world_pose = np.zeros((1,), self._pose_dt)
         return ret
+
+    def CreateSensorDataHeaderFactory(self, device_info, first_seqno=1):
+        """
+        Create a SensorDataHeaderFactory for a device
+
+        :param device_info: The device info to use for the source info
+        :type device_info: com.robotraconteur.device.DeviceInfo
+        :param first_seqno: (optional) The first automatic sequence number. Defaults to 1
+        :type first_seqno: int
+        :return: The header factory
+        :rtype: SensorDataHeaderFactory
+        """
+        return SensorDataHeaderFactory(device_info, first_seqno, self._node, self._client_obj)
+
+
+class SensorDataHeaderFactory(object):
+    """
+    Create SensorDataHeader structures for a device with low overhead
+
+    The SensorDataSourceInfo is created once and shared by all headers created by the factory, so it must
+    not be modified. Each header only needs a new TimeSpec2 stamped with the node TimeSpec and the
+    sequence number. The sequence number is incremented automatically if not specified.
+
+    :param device_info: The device info to use for the source info and clock UUID
+    :type device_info: com.robotraconteur.device.DeviceInfo
+    :param first_seqno: (optional) The first automatic sequence number. Defaults to 1
+    :type first_seqno: int
+    :param node: (optional) The Robot Raconteur node to use for finding types. Defaults to RobotRaconteurNode.s
+    :type node: RobotRaconteur.RobotRaconteurNode
+    :param client_obj: (optional) The client object to use for finding types. Defaults to None
+    :type client_obj: RobotRaconteur.ClientObject
+    """
+
+    def __init__(self, device_info, first_seqno=1, node=None, client_obj=None):
+        if node is None:
+            self._node = RRN
+        else:
+            self._node = node
+        self._client_obj = client_obj
+
+        self._sensordataheader = self._node.GetStructureType(
+            "com.robotraconteur.sensordata.SensorDataHeader", self._client_obj)
+        sourceinfo_type = self._node.GetStructureType(
+            "com.robotraconteur.sensordata.SensorDataSourceInfo", self._client_obj)
+        pose_dt = self._node.GetNamedArrayDType("com.robotraconteur.geometry.Pose", self._client_obj)
+        timespec2_dt = self._node.GetPodDType("com.robotraconteur.datetime.TimeSpec2", self._client_obj)
+        clock_codes = self._node.GetConstants("com.robotraconteur.datetime", self._client_obj)["ClockTypeCode"]
+
+        self._source_info = sourceinfo_type()
+        self._source_info.source_world_pose = np.zeros((1,), pose_dt)
+        self._ts_template = np.zeros((1,), timespec2_dt)
+        self._ts_template[0]["clock_info"]["clock_type"] = clock_codes["default"]
+        if device_info is not None and device_info.device is not None:
+            self._source_info.source = device_info.device
+            if device_info.device.uuid is not None:
+                self._ts_template[0]["clock_info"]["clock_uuid"] = device_info.device.uuid
+
+        self._seqno_counter = itertools.count(first_seqno)
+
+    @property
+    def source_info(self):
+        """
+        The shared source info of the headers
+
+        :rtype: com.robotraconteur.sensordata.SensorDataSourceInfo
+        """
+        return self._source_info
+
+    def CreateHeader(self, seqno=None, ts=None):
+        """
+        Create a SensorDataHeader stamped with the current time
+
+        :param seqno: (optional) The sequence number. Defaults to the next automatic sequence number
+        :type seqno: int
+        :param ts: (optional) The node TimeSpec to stamp. Defaults to ``node.NowTimeSpec()``
+        :type ts: RobotRaconteur.TimeSpec
+        :return: The header
+        :rtype: com.robotraconteur.sensordata.SensorDataHeader
+        """
+        if seqno is None:
+            seqno = next(self._seqno_counter)
+        if ts is None:
+            ts = self._node.NowTimeSpec()
+        ret = self._sensordataheader()
+        ret.seqno = seqno
+        ret_ts = self._ts_template.copy()
+        ret_ts[0]["seconds"] = ts.seconds
+        ret_ts[0]["nanoseconds"] = ts.nanoseconds
+        ret.ts = ret_ts
+        ret.source_info = self._source_info
+        return ret
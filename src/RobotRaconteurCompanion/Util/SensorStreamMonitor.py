@@ -0,0 +1,337 @@
+import RobotRaconteur as RR
+RRN = RR.RobotRaconteurNode.s
+import numpy as np
+import threading
+
+
+def _find_data_header(value):
+    # Sensor data structures keep the header in data_header or sensor_data, or in an info
+    # structure such as Image.image_info or LaserScan.scan_info
+    for name in ("data_header", "sensor_data"):
+        header = getattr(value, name, None)
+        if header is not None:
+            return header
+    for name in getattr(value, "__slots__", ()):
+        header = getattr(getattr(value, name, None), "data_header", None)
+        if header is not None:
+            return header
+    raise RR.InvalidArgumentException("Could not find SensorDataHeader in value")
+
+
+class SensorStreamMonitor(object):
+    """
+    Monitor the sequence numbers and latency of a stream of sensor data
+
+    Each sensor data structure contains a ``SensorDataHeader`` with the sequence number and the TimeSpec2
+    when the data was captured. The monitor detects dropped, reordered, and duplicate sequence numbers, and
+    keeps rolling statistics of the latency (local receive time minus header ``ts``), the jitter, and the
+    receive rate. All statistics are kept in fixed size buffers, so the memory used is constant.
+
+    The monitor can be attached to wire and pipe subscriptions using ``AttachWireSubscription`` and
+    ``AttachPipeSubscription``, or samples can be added by the caller using ``AddSample`` or ``AddHeader``.
+
+    The header ``ts`` is in the clock of the sending node. If the nodes are not on the same machine, pass
+    a ``ClockSyncEstimator`` as ``clock_sync`` to map the header times to the local node clock.
+
+    A sequence number received after a larger sequence number is counted as reordered, and is removed from
+    the dropped count. Sequence numbers older than ``reorder_window`` behind the largest sequence number cannot
+    be checked for duplicates and are counted as reordered.
+
+    :param window_size: (optional) The number of samples used for the rolling statistics. Defaults to 1024
+    :type window_size: int
+    :param latency_bin_edges: (optional) The latency histogram bin edges in seconds. Defaults to 25
+        logarithmically spaced edges from 10 us to 10 s
+    :type latency_bin_edges: numpy.ndarray
+    :param reorder_window: (optional) The number of sequence numbers tracked for reordering. Defaults to 256
+    :type reorder_window: int
+    :param clock_sync: (optional) The estimator used to map the header times to local time. Defaults to None
+    :type clock_sync: RobotRaconteurCompanion.Util.ClockSync.ClockSyncEstimator
+    :param header_func: (optional) Function returning the SensorDataHeader of a received value. Defaults to
+        searching the ``data_header`` and ``sensor_data`` fields
+    :type header_func: Callable[[Any], com.robotraconteur.sensordata.SensorDataHeader]
+    :param node: (optional) The Robot Raconteur node to use for the receive time. Defaults to RobotRaconteurNode.s
+    :type node: RobotRaconteur.RobotRaconteurNode
+    :param client_obj: (optional) The client object to use for finding types. Defaults to None
+    :type client_obj: RobotRaconteur.ClientObject
+    """
+
+    def __init__(self, window_size=1024, latency_bin_edges=None, reorder_window=256, clock_sync=None,
+                 header_func=None, node=None, client_obj=None):
+        if node is None:
+            self._node = RRN
+        else:
+            self._node = node
+        self._client_obj = client_obj
+        assert window_size >= 2, "window_size must be at least 2"
+        assert reorder_window >= 1, "reorder_window must be at least 1"
+
+        if latency_bin_edges is None:
+            latency_bin_edges = np.logspace(-5, 1, 25)
+        self._latency_bin_edges = np.asarray(latency_bin_edges, dtype=np.float64)
+        self._latency_bin_edges_ns = np.round(self._latency_bin_edges * 1e9).astype(np.int64)
+
+        self._clock_sync = clock_sync
+        self._header_func = header_func if header_func is not None else _find_data_header
+        self._lock = threading.Lock()
+
+        self._window_size = window_size
+        self._latency_ns = np.zeros((window_size,), dtype=np.int64)
+        self._latency_bin = np.zeros((window_size,), dtype=np.int64)
+        self._receive_ns = np.zeros((window_size,), dtype=np.int64)
+        self._latency_counts = np.zeros((len(self._latency_bin_edges_ns) + 1,), dtype=np.int64)
+        self._received_seqno = np.zeros((reorder_window,), dtype=bool)
+
+        self._wire_subs = []
+        self._pipe_subs = []
+
+        self.Reset()
+
+    def Reset(self):
+        """
+        Reset the statistics
+        """
+        with self._lock:
+            self._latency_counts[:] = 0
+            self._received_seqno[:] = False
+            self._sample_count = 0
+            self._max_seqno = None
+            self._dropped_count = 0
+            self._reordered_count = 0
+            self._duplicate_count = 0
+            self._last_latency_ns = None
+            self._jitter_ns = 0.0
+
+    def _header_ts_ns(self, ts):
+        ts = np.asarray(ts).reshape(-1)[0]
+        ts_ns = int(ts["seconds"]) * 1000000000 + int(ts["nanoseconds"])
+        if self._clock_sync is not None:
+            ts_ns = int(self._clock_sync.RemoteToLocalNanoseconds(ts_ns))
+        return ts_ns
+
+    def _update_seqno(self, seqno):
+        # Returns True if the sample is in order
+        w = len(self._received_seqno)
+        if self._max_seqno is None:
+            self._max_seqno = seqno
+            self._received_seqno[seqno % w] = True
+            return True
+        if seqno > self._max_seqno:
+            gap = seqno - self._max_seqno - 1
+            self._dropped_count += gap
+            if gap + 1 >= w:
+                self._received_seqno[:] = False
+            else:
+                self._received_seqno[np.arange(self._max_seqno + 1, seqno + 1) % w] = False
+            self._received_seqno[seqno % w] = True
+            self._max_seqno = seqno
+            return True
+        if self._max_seqno - seqno < w and self._received_seqno[seqno % w]:
+            self._duplicate_count += 1
+            return False
+        if self._max_seqno - seqno < w:
+            self._received_seqno[seqno % w] = True
+        self._reordered_count += 1
+        self._dropped_count = max(self._dropped_count - 1, 0)
+        return False
+
+    def AddHeader(self, data_header, receive_ns=None):
+        """
+        Add a received SensorDataHeader
+
+        :param data_header: The received header
+        :type data_header: com.robotraconteur.sensordata.SensorDataHeader
+        :param receive_ns: (optional) The local TimeSpec when the data was received in nanoseconds. Defaults
+            to the current node TimeSpec
+        :type receive_ns: int
+        """
+        if receive_ns is None:
+            now = self._node.NowTimeSpec()
+            receive_ns = now.seconds * 1000000000 + now.nanoseconds
+        latency_ns = receive_ns - self._header_ts_ns(data_header.ts)
+        seqno = int(data_header.seqno)
+
+        with self._lock:
+            in_order = self._update_seqno(seqno)
+            if in_order and self._last_latency_ns is not None:
+                # RFC 3550 interarrival jitter
+                d = abs(latency_ns - self._last_latency_ns)
+                self._jitter_ns += (d - self._jitter_ns) / 16.0
+            if in_order:
+                self._last_latency_ns = latency_ns
+
+            i = self._sample_count % self._window_size
+            if self._sample_count >= self._window_size:
+                self._latency_counts[self._latency_bin[i]] -= 1
+            b = int(np.searchsorted(self._latency_bin_edges_ns, latency_ns, side="right"))
+            self._latency_ns[i] = latency_ns
+            self._latency_bin[i] = b
+            self._receive_ns[i] = receive_ns
+            self._latency_counts[b] += 1
+            self._sample_count += 1
+
+    def AddSample(self, value, receive_ns=None):
+        """
+        Add a received sensor data structure
+
+        The header is found using ``header_func``.
+
+        :param value: The received sensor data structure
+        :type value: Any
+        :param receive_ns: (optional) The local TimeSpec when the data was received in nanoseconds. Defaults
+            to the current node TimeSpec
+        :type receive_ns: int
+        """
+        self.AddHeader(self._header_func(value), receive_ns)
+
+    def AttachWireSubscription(self, wire_subscription):
+        """
+        Add the values received by a wire subscription to the monitor
+
+        :param wire_subscription: The wire subscription
+        :type wire_subscription: RobotRaconteur.WireSubscription
+        """
+        wire_subscription.WireValueChanged += self._wire_value_changed
+        self._wire_subs.append(wire_subscription)
+
+    def AttachPipeSubscription(self, pipe_subscription, packet_handler=None):
+        """
+        Add the packets received by a pipe subscription to the monitor
+
+        The monitor dequeues the packets from the subscription, so they must be processed in
+        ``packet_handler`` instead of calling ``ReceivePacket``. ``packet_handler`` is called with the packets
+        in the order they were received.
+
+        :param pipe_subscription: The pipe subscription
+        :type pipe_subscription: RobotRaconteur.PipeSubscription
+        :param packet_handler: (optional) Called with each packet after it is added to the monitor
+        :type packet_handler: Callable[[Any], None]
+        """
+        # Packet received callbacks may run concurrently, so the queue is drained by one thread at a
+        # time to keep the packets in order
+        receive_lock = threading.Lock()
+
+        def pipe_packet_received(sub):
+            with receive_lock:
+                while True:
+                    res, packet = sub.TryReceivePacketWait(0)
+                    if not res:
+                        break
+                    self.AddSample(packet)
+                    if packet_handler is not None:
+                        packet_handler(packet)
+
+        pipe_subscription.PipePacketReceived += pipe_packet_received
+        self._pipe_subs.append((pipe_subscription, pipe_packet_received))
+
+    def Close(self):
+        """
+        Detach the monitor from the wire and pipe subscriptions
+        """
+        for wire_sub in self._wire_subs:
+            wire_sub.WireValueChanged -= self._wire_value_changed
+        for pipe_sub, handler in self._pipe_subs:
+            pipe_sub.PipePacketReceived -= handler
+        self._wire_subs = []
+        self._pipe_subs = []
+
+    def _wire_value_changed(self, wire_sub, value, ts):
+        self.AddSample(value)
+
+    @property
+    def received_count(self):
+        """
+        The total number of samples received
+
+        :rtype: int
+        """
+        return self._sample_count
+
+    @property
+    def dropped_count(self):
+        """
+        The number of sequence numbers that were skipped and not received later
+
+        :rtype: int
+        """
+        return self._dropped_count
+
+    @property
+    def reordered_count(self):
+        """
+        The number of samples received after a sample with a larger sequence number
+
+        :rtype: int
+        """
+        return self._reordered_count
+
+    @property
+    def duplicate_count(self):
+        """
+        The number of samples received with a sequence number that was already received
+
+        :rtype: int
+        """
+        return self._duplicate_count
+
+    @property
+    def jitter(self):
+        """
+        The smoothed latency variation between consecutive in order samples in seconds, computed
+        as the interarrival jitter of RFC 3550
+
+        :rtype: float
+        """
+        return self._jitter_ns * 1e-9
+
+    @property
+    def rate(self):
+        """
+        The receive rate over the rolling window in samples per second, or None if fewer than two samples
+        have been received
+
+        :rtype: float
+        """
+        with self._lock:
+            n = min(self._sample_count, self._window_size)
+            if n < 2:
+                return None
+            oldest = self._receive_ns[self._sample_count % self._window_size if n == self._window_size else 0]
+            newest = self._receive_ns[(self._sample_count - 1) % self._window_size]
+            if newest <= oldest:
+                return None
+            return (n - 1) * 1e9 / (newest - oldest)
+
+    @property
+    def latency_histogram(self):
+        """
+        The histogram of the latency over the rolling window
+
+        ``counts[0]`` counts the latencies below ``edges[0]``, ``counts[i]`` counts the latencies between
+        ``edges[i-1]`` and ``edges[i]``, and ``counts[-1]`` counts the latencies above ``edges[-1]``.
+
+        :return: The counts and the bin edges in seconds
+        :rtype: tuple[numpy.ndarray, numpy.ndarray]
+        """
+        with self._lock:
+            return self._latency_counts.copy(), self._latency_bin_edges
+
+    def LatencyPercentile(self, percentile):
+        """
+        Compute latency percentiles over the rolling window
+
+        :param percentile: The percentile or array of percentiles between 0 and 100
+        :type percentile: float
+        :return: The latency in seconds, or None if no samples have been received
+        :rtype: float
+        """
+        with self._lock:
+            n = min(self._sample_count, self._window_size)
+            if n == 0:
+                return None
+            return np.percentile(self._latency_ns[:n], percentile) * 1e-9
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.Close()
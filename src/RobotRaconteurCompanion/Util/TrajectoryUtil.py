@@ -0,0 +1,680 @@
+import RobotRaconteur as RR
+RRN = RR.RobotRaconteurNode.s
+import numpy as np
+
+from .RobotUtil import RobotUtil
+
+limit_violation_dtype = np.dtype([("index", np.int64), ("joint", np.int64), ("kind", "U12"),
+                                  ("value", np.float64), ("limit", np.float64)])
+"""
+The numpy dtype of the limit violations returned by ``TrajectoryUtil.check_joint_limits``. ``index`` is the
+waypoint index, ``joint`` is the joint index, ``kind`` is one of ``position``, ``velocity``, or
+``acceleration``, ``value`` is the value that violated the limit, and ``limit`` is the violated limit.
+"""
+
+
+def _limit_violations(kind, mask, index_offset, values, limits, first_only):
+    if first_only:
+        i = np.argmax(mask.reshape(-1))
+        w_idx, j_idx = np.unravel_index([i], mask.shape)
+    else:
+        w_idx, j_idx = np.nonzero(mask)
+    ret = np.zeros((len(w_idx),), dtype=limit_violation_dtype)
+    ret["index"] = w_idx + index_offset
+    ret["joint"] = j_idx
+    ret["kind"] = kind
+    ret["value"] = values[w_idx, j_idx]
+    ret["limit"] = np.broadcast_to(limits, mask.shape)[w_idx, j_idx]
+    return ret
+
+
+def _spline_velocities(t, q):
+    # Knot velocities of the natural cubic spline through the waypoints. The tridiagonal system
+    # is solved with the Thomas algorithm for all joints at once.
+    count = q.shape[0]
+    if count < 3:
+        return np.broadcast_to((q[-1] - q[0]) / (t[-1] - t[0]), q.shape).copy()
+    h = np.diff(t)[:, None]
+    delta = np.diff(q, axis=0) / h
+    a = np.zeros((count, 1))
+    b = np.zeros((count, 1))
+    c = np.zeros((count, 1))
+    d = np.zeros(q.shape)
+    b[0] = 2
+    c[0] = 1
+    d[0] = 3 * delta[0]
+    a[1:-1] = h[1:]
+    b[1:-1] = 2 * (h[:-1] + h[1:])
+    c[1:-1] = h[:-1]
+    d[1:-1] = 3 * (h[1:] * delta[:-1] + h[:-1] * delta[1:])
+    a[-1] = 1
+    b[-1] = 2
+    d[-1] = 3 * delta[-1]
+    for i in range(1, count):
+        w = a[i] / b[i - 1]
+        b[i] = b[i] - w * c[i - 1]
+        d[i] = d[i] - w * d[i - 1]
+    v = np.zeros(q.shape)
+    v[-1] = d[-1] / b[-1]
+    for i in range(count - 2, -1, -1):
+        v[i] = (d[i] - c[i] * v[i + 1]) / b[i]
+    return v
+
+
+class JointTrajectoryInterpolator(object):
+    """
+    Interpolate joint positions and velocities of a trajectory at arbitrary times
+
+    The polynomial coefficients of each segment are computed when the interpolator is created. Evaluating
+    an array of times uses a binary search to find the segments, followed by polynomial evaluation for all
+    samples at once. Times before the start or after the end of the trajectory are clamped to the first
+    or last waypoint.
+
+    The interpolation mode of a waypoint determines how the segment ending at the waypoint is
+    interpolated. ``default`` and ``joint`` use linear interpolation in joint space. ``joint_cubic_spline``
+    uses cubic Hermite polynomials with the waypoint joint velocities, or the knot velocities of a natural
+    cubic spline if the joint velocities are not specified. Cartesian interpolation modes, including
+    ``cubic_spline``, and custom interpolation modes are not supported.
+
+    Use ``TrajectoryUtil.create_interpolator`` to create from a JointTrajectory structure.
+
+    :param time_from_start: The (T,) array of waypoint times in seconds. Must be strictly increasing.
+    :type time_from_start: numpy.ndarray
+    :param joint_position: The (T, n_joints) array of joint positions
+    :type joint_position: numpy.ndarray
+    :param joint_velocity: (optional) The (T, n_joints) array of joint velocities
+    :type joint_velocity: numpy.ndarray
+    :param interpolation_mode: (optional) The InterpolationMode of all waypoints, or a (T,) array
+        with the mode of each waypoint. Defaults to ``default``
+    :type interpolation_mode: int | numpy.ndarray
+    """
+
+    # com.robotraconteur.robotics.trajectory.InterpolationMode values
+    _linear_modes = (0, 1)
+    _cubic_modes = (5,)
+
+    def __init__(self, time_from_start, joint_position, joint_velocity=None, interpolation_mode=None):
+        t = np.array(time_from_start, dtype=np.float64)
+        q = np.array(joint_position, dtype=np.float64)
+        count = t.shape[0]
+        if t.ndim != 1 or count < 2:
+            raise RR.InvalidArgumentException("Trajectory must have at least two waypoints")
+        if q.ndim != 2 or q.shape[0] != count:
+            raise RR.InvalidArgumentException("joint_position must have shape (T, n_joints)")
+        h = np.diff(t)
+        if np.any(h <= 0):
+            raise RR.InvalidArgumentException("time_from_start must be strictly increasing")
+
+        if interpolation_mode is None:
+            interpolation_mode = 0
+        modes = np.broadcast_to(np.asarray(interpolation_mode, dtype=np.int64), (count,))
+        seg_modes = modes[1:]
+        linear = np.isin(seg_modes, self._linear_modes)
+        cubic = np.isin(seg_modes, self._cubic_modes)
+        if not np.all(linear | cubic):
+            raise RR.InvalidArgumentException("Only joint space interpolation modes are supported")
+
+        # Coefficients of q(s) = c0 + c1*s + c2*s^2 + c3*s^3, with s the time from the segment start
+        delta = np.diff(q, axis=0) / h[:, None]
+        c = np.zeros((4, count - 1, q.shape[1]), dtype=np.float64)
+        c[0] = q[:-1]
+        c[1] = delta
+        if np.any(cubic):
+            if joint_velocity is not None:
+                v = np.asarray(joint_velocity, dtype=np.float64)
+                if v.shape != q.shape:
+                    raise RR.InvalidArgumentException("joint_velocity must have the same shape as joint_position")
+            else:
+                v = _spline_velocities(t, q)
+            hc = h[cubic, None]
+            v0 = v[:-1][cubic]
+            v1 = v[1:][cubic]
+            c[1, cubic] = v0
+            c[2, cubic] = (3 * delta[cubic] - 2 * v0 - v1) / hc
+            c[3, cubic] = (v0 + v1 - 2 * delta[cubic]) / (hc * hc)
+
+        self._t = t
+        self._h = h
+        self._c = c
+        self._joint_count = q.shape[1]
+
+    @property
+    def duration(self):
+        """
+        The time of the last waypoint in seconds
+
+        :rtype: float
+        """
+        return float(self._t[-1])
+
+    @property
+    def joint_count(self):
+        """
+        The number of joints
+
+        :rtype: int
+        """
+        return self._joint_count
+
+    def interpolate(self, t):
+        """
+        Interpolate the joint positions and velocities
+
+        :param t: The time or array of times in seconds
+        :type t: float | numpy.ndarray
+        :return: The joint positions and joint velocities. The arrays have shape (n_joints,) for a scalar
+            time and (M, n_joints) for an array of M times.
+        :rtype: tuple[numpy.ndarray, numpy.ndarray]
+        """
+        t = np.asarray(t, dtype=np.float64)
+        scalar = t.ndim == 0
+        t = t.reshape(-1)
+        idx = np.clip(np.searchsorted(self._t, t, side="right") - 1, 0, len(self._h) - 1)
+        s = np.clip(t - self._t[idx], 0, self._h[idx])[:, None]
+        c0, c1, c2, c3 = self._c[:, idx]
+        q = c0 + s * (c1 + s * (c2 + s * c3))
+        qd = c1 + s * (2 * c2 + s * 3 * c3)
+        if t.size > 0:
+            # The velocity is zero when the time is clamped to the first or last waypoint
+            outside = (t < self._t[0]) | (t > self._t[-1])
+            qd[outside] = 0
+        if scalar:
+            return q[0], qd[0]
+        return q, qd
+
+
+class TrajectoryUtil(object):
+    """
+    Utility class to convert between numpy arrays and com.robotraconteur.robotics.trajectory.JointTrajectory
+    structures
+
+    A JointTrajectory contains a list of JointTrajectoryWaypoint structures. The conversion functions
+    in this class copy the input arrays once and assign rows to the waypoints, so the per-waypoint
+    overhead is a single structure construction.
+
+    :param node: (optional) The Robot Raconteur node to use for finding types. Defaults to RobotRaconteurNode.s
+    :type node: RobotRaconteur.RobotRaconteurNode
+    :param client_obj: (optional) The client object to use for finding types. Defaults to None
+    :type client_obj: RobotRaconteur.ClientObject
+    """
+
+    def __init__(self, node=None, client_obj=None):
+        if node is None:
+            self._node = RRN
+        else:
+            self._node = node
+        self._client_obj = client_obj
+
+        self._trajectory_type = self._node.GetStructureType(
+            "com.robotraconteur.robotics.trajectory.JointTrajectory", self._client_obj)
+        self._waypoint_type = self._node.GetStructureType(
+            "com.robotraconteur.robotics.trajectory.JointTrajectoryWaypoint", self._client_obj)
+        consts = self._node.GetConstants("com.robotraconteur.robotics.trajectory", self._client_obj)
+        self._interpolation_mode = consts["InterpolationMode"]
+        self._waypoint_type_code = consts["TrajectoryWaypointType"]
+
+        self._robot_util = RobotUtil(self._node, self._client_obj)
+
+    def _enum_value(self, v, enum_consts, enum_name):
+        if isinstance(v, str):
+            ret = enum_consts.get(v, None)
+            if ret is None:
+                raise RR.InvalidArgumentException(f"Invalid {enum_name} value: {v}")
+            return ret
+        return int(v)
+
+    def create_waypoint_template(self, position_tolerance=None, velocity_tolerance=None,
+                                 interpolation_mode=None, waypoint_type=None):
+        """
+        Create a JointTrajectoryWaypoint to use as a template for arrays_to_joint_trajectory
+
+        The template fields are assigned to every waypoint of the created trajectories. Tolerance
+        arrays are shared between the waypoints and are not copied.
+
+        :param position_tolerance: (optional) The position tolerance of each joint
+        :type position_tolerance: numpy.ndarray
+        :param velocity_tolerance: (optional) The velocity tolerance of each joint
+        :type velocity_tolerance: numpy.ndarray
+        :param interpolation_mode: (optional) The InterpolationMode value or name
+        :type interpolation_mode: int | str
+        :param waypoint_type: (optional) The TrajectoryWaypointType value or name
+        :type waypoint_type: int | str
+        :return: The waypoint template
+        :rtype: com.robotraconteur.robotics.trajectory.JointTrajectoryWaypoint
+        """
+        ret = self._waypoint_type()
+        if position_tolerance is not None:
+            ret.position_tolerance = np.array(position_tolerance, dtype=np.float64)
+        if velocity_tolerance is not None:
+            ret.velocity_tolerance = np.array(velocity_tolerance, dtype=np.float64)
+        if interpolation_mode is not None:
+            ret.interpolation_mode = self._enum_value(interpolation_mode, self._interpolation_mode,
+                                                      "InterpolationMode")
+        if waypoint_type is not None:
+            ret.waypoint_type = self._enum_value(waypoint_type, self._waypoint_type_code, "TrajectoryWaypointType")
+        return ret
+
+    def arrays_to_joint_trajectory(self, time_from_start, joint_position, joint_velocity=None,
+                                   joint_names=None, joint_units=None, template=None):
+        """
+        Create a JointTrajectory from arrays of waypoint times, joint positions, and joint velocities
+
+        :param time_from_start: The (T,) array of waypoint times in seconds
+        :type time_from_start: numpy.ndarray
+        :param joint_position: The (T, n_joints) array of joint positions
+        :type joint_position: numpy.ndarray
+        :param joint_velocity: (optional) The (T, n_joints) array of joint velocities
+        :type joint_velocity: numpy.ndarray
+        :param joint_names: (optional) The joint names
+        :type joint_names: list[str]
+        :param joint_units: (optional) The JointPositionUnits of each joint
+        :type joint_units: list[int]
+        :param template: (optional) The waypoint template created with create_waypoint_template
+        :type template: com.robotraconteur.robotics.trajectory.JointTrajectoryWaypoint
+        :return: The trajectory
+        :rtype: com.robotraconteur.robotics.trajectory.JointTrajectory
+        """
+        q = np.array(joint_position, dtype=np.float64)
+        if q.ndim != 2:
+            raise RR.InvalidArgumentException("joint_position must have shape (T, n_joints)")
+        count = q.shape[0]
+        t = np.asarray(time_from_start, dtype=np.float64)
+        if t.shape != (count,):
+            raise RR.InvalidArgumentException("time_from_start must have shape (T,)")
+        if count > 1 and np.any(np.diff(t) < 0):
+            raise RR.InvalidArgumentException("time_from_start must be increasing")
+        if joint_velocity is not None:
+            qd = np.array(joint_velocity, dtype=np.float64)
+            if qd.shape != q.shape:
+                raise RR.InvalidArgumentException("joint_velocity must have the same shape as joint_position")
+            qd_rows = list(qd)
+        if joint_names is not None and len(joint_names) != q.shape[1]:
+            raise RR.InvalidArgumentException("joint_names must have n_joints entries")
+
+        template_fields = []
+        if template is not None:
+            for f in ("position_tolerance", "velocity_tolerance", "interpolation_mode", "waypoint_type",
+                      "joint_velocity"):
+                v = getattr(template, f)
+                if v is not None:
+                    template_fields.append((f, v))
+
+        waypoint_type = self._waypoint_type
+        q_rows = list(q)
+        t_list = t.tolist()
+        waypoints = [None] * count
+        for i in range(count):
+            w = waypoint_type()
+            for f, v in template_fields:
+                setattr(w, f, v)
+            w.joint_position = q_rows[i]
+            if joint_velocity is not None:
+                w.joint_velocity = qd_rows[i]
+            w.time_from_start = t_list[i]
+            waypoints[i] = w
+
+        ret = self._trajectory_type()
+        ret.joint_names = list(joint_names) if joint_names is not None else []
+        ret.joint_units = list(joint_units) if joint_units is not None else []
+        ret.waypoints = waypoints
+        return ret
+
+    def joint_trajectory_to_arrays(self, trajectory):
+        """
+        Extract the waypoint times, joint positions, and joint velocities from a JointTrajectory
+
+        The joint velocities are None if any waypoint does not specify joint_velocity.
+
+        :param trajectory: The trajectory
+        :type trajectory: com.robotraconteur.robotics.trajectory.JointTrajectory
+        :return: The (T,) array of times, the (T, n_joints) array of joint positions, and the
+            (T, n_joints) array of joint velocities or None
+        :rtype: tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        """
+        waypoints = trajectory.waypoints
+        if waypoints is None or len(waypoints) == 0:
+            raise RR.InvalidArgumentException("Trajectory must have at least one waypoint")
+        count = len(waypoints)
+        t = np.fromiter((w.time_from_start for w in waypoints), dtype=np.float64, count=count)
+        q = self._stack_waypoint_field(waypoints, "joint_position")
+        if q is None:
+            raise RR.InvalidArgumentException("Waypoints must have joint_position of the same length")
+        qd = self._stack_waypoint_field(waypoints, "joint_velocity", q.shape[1])
+        return t, q, qd
+
+    def joint_trajectory_position_tolerance(self, trajectory):
+        """
+        Extract the position tolerance of the waypoints of a JointTrajectory
+
+        :param trajectory: The trajectory
+        :type trajectory: com.robotraconteur.robotics.trajectory.JointTrajectory
+        :return: The (T, n_joints) array of position tolerances, or None if any waypoint does not
+            specify position_tolerance
+        :rtype: numpy.ndarray
+        """
+        waypoints = trajectory.waypoints
+        if waypoints is None or len(waypoints) == 0:
+            raise RR.InvalidArgumentException("Trajectory must have at least one waypoint")
+        n = len(waypoints[0].joint_position)
+        return self._stack_waypoint_field(waypoints, "position_tolerance", n)
+
+    def _stack_waypoint_field(self, waypoints, field_name, expected_count=None):
+        rows = [getattr(w, field_name) for w in waypoints]
+        if any(r is None for r in rows):
+            return None
+        try:
+            ret = np.array(rows, dtype=np.float64)
+        except ValueError:
+            return None
+        if ret.ndim != 2 or ret.shape[1] == 0:
+            return None
+        if expected_count is not None and ret.shape[1] != expected_count:
+            return None
+        return ret
+
+    def create_interpolator(self, trajectory):
+        """
+        Create a JointTrajectoryInterpolator for a JointTrajectory
+
+        :param trajectory: The trajectory
+        :type trajectory: com.robotraconteur.robotics.trajectory.JointTrajectory
+        :return: The interpolator
+        :rtype: JointTrajectoryInterpolator
+        """
+        t, q, qd = self.joint_trajectory_to_arrays(trajectory)
+        modes = np.fromiter((w.interpolation_mode for w in trajectory.waypoints), dtype=np.int64,
+                            count=len(trajectory.waypoints))
+        return JointTrajectoryInterpolator(t, q, qd, modes)
+
+    def check_joint_limits(self, time_from_start, joint_position, joint_limits, stop_on_first=False, tol=1e-9):
+        """
+        Check joint positions against position, velocity, and acceleration limits
+
+        The velocity of each segment is the finite difference of the joint positions, and is reported at
+        the waypoint ending the segment. The acceleration is the finite difference of the segment velocities,
+        and is reported at the waypoint between the segments. Limits that are zero are not checked.
+
+        If stop_on_first is True, the check stops at the first kind of limit that is violated, and only
+        the first violation of that kind is returned. Positions are checked before velocities and
+        accelerations.
+
+        :param time_from_start: The (T,) array of waypoint times in seconds
+        :type time_from_start: numpy.ndarray
+        :param joint_position: The (T, n_joints) array of joint positions
+        :type joint_position: numpy.ndarray
+        :param joint_limits: The lower, upper, velocity, and acceleration limit arrays, as returned
+            by ``RobotUtil.robot_info_joint_limits``
+        :type joint_limits: tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        :param stop_on_first: (optional) Return after the first violation is found. Defaults to False
+        :type stop_on_first: bool
+        :param tol: (optional) The tolerance added to the limits. Defaults to 1e-9
+        :type tol: float
+        :return: The violations sorted by waypoint index, with dtype ``limit_violation_dtype``. Empty if
+            the trajectory is within the limits.
+        :rtype: numpy.ndarray
+        """
+        t = np.asarray(time_from_start, dtype=np.float64)
+        q = np.asarray(joint_position, dtype=np.float64)
+        if q.ndim != 2 or t.shape != (q.shape[0],):
+            raise RR.InvalidArgumentException("Invalid time_from_start or joint_position shape")
+        lower, upper, vel, acc = (np.broadcast_to(np.asarray(l, dtype=np.float64), (q.shape[1],))
+                                  for l in joint_limits)
+        violations = []
+
+        pos_checked = lower < upper
+        low_mask = (q < lower - tol) & pos_checked
+        high_mask = (q > upper + tol) & pos_checked
+        for kind_mask, kind_limit in ((low_mask, lower), (high_mask, upper)):
+            if kind_mask.any():
+                violations.append(_limit_violations("position", kind_mask, 0, q, kind_limit, stop_on_first))
+        if stop_on_first and len(violations) > 0:
+            return min(violations, key=lambda v: v["index"][0])
+
+        if q.shape[0] > 1:
+            h = np.diff(t)
+            if np.any(h <= 0):
+                raise RR.InvalidArgumentException("time_from_start must be strictly increasing")
+            qd = np.diff(q, axis=0) / h[:, None]
+            vel_mask = (np.abs(qd) > vel + tol) & (vel > 0)
+            if vel_mask.any():
+                violations.append(_limit_violations("velocity", vel_mask, 1, qd, vel, stop_on_first))
+                if stop_on_first:
+                    return violations[0]
+
+            if q.shape[0] > 2:
+                qdd = np.diff(qd, axis=0) / (0.5 * (h[:-1] + h[1:]))[:, None]
+                acc_mask = (np.abs(qdd) > acc + tol) & (acc > 0)
+                if acc_mask.any():
+                    violations.append(_limit_violations("acceleration", acc_mask, 1, qdd, acc, stop_on_first))
+                    if stop_on_first:
+                        return violations[0]
+
+        if len(violations) == 0:
+            return np.zeros((0,), dtype=limit_violation_dtype)
+        ret = np.concatenate(violations)
+        return ret[np.argsort(ret["index"], kind="stable")]
+
+    def validate_joint_trajectory(self, trajectory, robot_info, chain_number=None, stop_on_first=False):
+        """
+        Check a JointTrajectory against the joint limits in a RobotInfo
+
+        The trajectory joints are matched to the JointInfo structures using the trajectory joint_names
+        if specified, otherwise using the joints of the kinematic chain if chain_number is specified.
+        See ``check_joint_limits`` for details on the checks.
+
+        :param trajectory: The trajectory to check
+        :type trajectory: com.robotraconteur.robotics.trajectory.JointTrajectory
+        :param robot_info: The RobotInfo with the joint limits
+        :type robot_info: com.robotraconteur.robotics.robot.RobotInfo
+        :param chain_number: (optional) The kinematic chain number
+        :type chain_number: int
+        :param stop_on_first: (optional) Return after the first violation is found. Defaults to False
+        :type stop_on_first: bool
+        :return: The violations, with dtype ``limit_violation_dtype``. Empty if the trajectory is valid.
+        :rtype: numpy.ndarray
+        """
+        t, q, _ = self.joint_trajectory_to_arrays(trajectory)
+        joint_limits = self._robot_util.robot_info_joint_limits(robot_info, chain_number, trajectory.joint_names)
+        if len(joint_limits[0]) != q.shape[1]:
+            raise RR.InvalidArgumentException("Trajectory joint count does not match the robot joint count")
+        return self.check_joint_limits(t, q, joint_limits, stop_on_first)
+
+    def compress_waypoints(self, time_from_start, joint_position, position_tolerance, joint_velocity=None,
+                           interpolation_mode=None):
+        """
+        Select a subset of waypoints that reproduces a trajectory within a position tolerance
+
+        The waypoints are selected using a Douglas-Peucker style algorithm in joint space. Starting with the
+        first and last waypoints, the trajectory through the selected waypoints is interpolated at the times
+        of all waypoints, and each segment with an error larger than the tolerance is split at the waypoint
+        with the largest error. All segments are split at once in each pass. The interpolation uses
+        JointTrajectoryInterpolator with the same interpolation modes as the trajectory, so the error at the
+        original waypoint times is guaranteed to be within the tolerance.
+
+        :param time_from_start: The (T,) array of waypoint times in seconds
+        :type time_from_start: numpy.ndarray
+        :param joint_position: The (T, n_joints) array of joint positions
+        :type joint_position: numpy.ndarray
+        :param position_tolerance: The position tolerance. Can be a scalar, a (n_joints,) array, or a
+            (T, n_joints) array with the tolerance of each waypoint. Must be greater than zero.
+        :type position_tolerance: float | numpy.ndarray
+        :param joint_velocity: (optional) The (T, n_joints) array of joint velocities
+        :type joint_velocity: numpy.ndarray
+        :param interpolation_mode: (optional) The InterpolationMode of all waypoints, or a (T,) array
+            with the mode of each waypoint
+        :type interpolation_mode: int | numpy.ndarray
+        :return: The sorted indices of the selected waypoints
+        :rtype: numpy.ndarray
+        """
+        t = np.asarray(time_from_start, dtype=np.float64)
+        q = np.asarray(joint_position, dtype=np.float64)
+        count = t.shape[0]
+        if q.ndim != 2 or q.shape[0] != count:
+            raise RR.InvalidArgumentException("joint_position must have shape (T, n_joints)")
+        if count <= 2:
+            return np.arange(count)
+        tol = np.broadcast_to(np.asarray(position_tolerance, dtype=np.float64), q.shape)
+        if np.any(tol <= 0):
+            raise RR.InvalidArgumentException("position_tolerance must be greater than zero")
+        qd = None if joint_velocity is None else np.asarray(joint_velocity, dtype=np.float64)
+        modes = np.broadcast_to(np.asarray(0 if interpolation_mode is None else interpolation_mode,
+                                           dtype=np.int64), (count,))
+
+        keep = np.zeros((count,), dtype=bool)
+        keep[0] = True
+        keep[-1] = True
+        while True:
+            kept = np.flatnonzero(keep)
+            interp = JointTrajectoryInterpolator(t[kept], q[kept], None if qd is None else qd[kept], modes[kept])
+            q_interp, _ = interp.interpolate(t)
+            err = np.max(np.abs(q - q_interp) / tol, axis=1)
+            err[keep] = 0
+            seg_max = np.maximum.reduceat(err, kept[:-1])
+            if not np.any(seg_max > 1):
+                return kept
+            # Split each segment with an error larger than the tolerance at its worst waypoint
+            seg = np.searchsorted(kept, np.arange(count), side="right") - 1
+            candidates = np.flatnonzero((err > 1) & (err == seg_max[np.minimum(seg, len(seg_max) - 1)]))
+            _, first = np.unique(seg[candidates], return_index=True)
+            keep[candidates[first]] = True
+
+    def compress_joint_trajectory(self, trajectory, position_tolerance=None):
+        """
+        Remove waypoints from a JointTrajectory while keeping the interpolation error within the waypoint
+        position_tolerance
+
+        See ``compress_waypoints`` for details on the algorithm. The returned trajectory shares the selected
+        waypoint structures with the input trajectory.
+
+        :param trajectory: The trajectory to compress
+        :type trajectory: com.robotraconteur.robotics.trajectory.JointTrajectory
+        :param position_tolerance: (optional) The position tolerance to use if the waypoints do not specify
+            position_tolerance. Can be a scalar or a (n_joints,) array.
+        :type position_tolerance: float | numpy.ndarray
+        :return: The compressed trajectory
+        :rtype: com.robotraconteur.robotics.trajectory.JointTrajectory
+        """
+        t, q, qd = self.joint_trajectory_to_arrays(trajectory)
+        tol = self.joint_trajectory_position_tolerance(trajectory)
+        if tol is None:
+            if position_tolerance is None:
+                raise RR.InvalidArgumentException("Waypoints do not specify position_tolerance")
+            tol = position_tolerance
+        modes = np.fromiter((w.interpolation_mode for w in trajectory.waypoints), dtype=np.int64,
+                            count=len(trajectory.waypoints))
+        kept = self.compress_waypoints(t, q, tol, qd, modes)
+
+        ret = self._trajectory_type()
+        ret.joint_names = trajectory.joint_names
+        ret.joint_units = trajectory.joint_units
+        ret.extended = trajectory.extended
+        ret.waypoints = [trajectory.waypoints[i] for i in kept]
+        return ret
+
+    def time_parameterize(self, joint_position, joint_limits, velocity_scale=1.0, acceleration_scale=1.0):
+        """
+        Compute the waypoint times and joint velocities to traverse a path as fast as possible within the
+        joint velocity and acceleration limits
+
+        The path is parameterized by its arc length in joint space, and the path velocity is limited by the
+        joint velocity limits and the curvature of the path at each waypoint. The path acceleration is then
+        limited using forward and backward passes, which are computed for all waypoints at once as cumulative
+        minimums. The trajectory starts and ends at rest. If the finite difference velocities or accelerations,
+        as computed by ``check_joint_limits``, still exceed the limits, the whole trajectory is slowed down.
+
+        :param joint_position: The (T, n_joints) array of joint positions of the path. Consecutive waypoints
+            must not be identical.
+        :type joint_position: numpy.ndarray
+        :param joint_limits: The lower, upper, velocity, and acceleration limit arrays, as returned
+            by ``RobotUtil.robot_info_joint_limits``. The velocity and acceleration limits must be
+            greater than zero.
+        :type joint_limits: tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        :param velocity_scale: (optional) Scale factor for the velocity limits. Defaults to 1
+        :type velocity_scale: float
+        :param acceleration_scale: (optional) Scale factor for the acceleration limits. Defaults to 1
+        :type acceleration_scale: float
+        :return: The (T,) array of waypoint times and the (T, n_joints) array of joint velocities
+        :rtype: tuple[numpy.ndarray, numpy.ndarray]
+        """
+        q = np.asarray(joint_position, dtype=np.float64)
+        if q.ndim != 2 or q.shape[0] < 2:
+            raise RR.InvalidArgumentException("joint_position must have shape (T, n_joints) with at least two waypoints")
+        count = q.shape[0]
+        vel = np.broadcast_to(np.asarray(joint_limits[2], dtype=np.float64), (q.shape[1],)) * velocity_scale
+        acc = np.broadcast_to(np.asarray(joint_limits[3], dtype=np.float64), (q.shape[1],)) * acceleration_scale
+        if np.any(vel <= 0) or np.any(acc <= 0):
+            raise RR.InvalidArgumentException("Velocity and acceleration limits must be greater than zero")
+
+        dq = np.diff(q, axis=0)
+        ds = np.linalg.norm(dq, axis=1)
+        if np.any(ds <= 0):
+            raise RR.InvalidArgumentException("Consecutive waypoints must not be identical")
+        tangent_seg = dq / ds[:, None]
+        tangent = np.zeros(q.shape)
+        tangent[0] = tangent_seg[0]
+        tangent[-1] = tangent_seg[-1]
+        tangent[1:-1] = 0.5 * (tangent_seg[:-1] + tangent_seg[1:])
+        curvature = np.zeros(q.shape)
+        curvature[1:-1] = np.diff(tangent_seg, axis=0) / (0.5 * (ds[:-1] + ds[1:]))[:, None]
+
+        # Maximum squared path velocity at each waypoint, and the increase of the squared path velocity
+        # allowed over each segment. The joint acceleration is the sum of a curvature term and a path
+        # acceleration term, and each term is allowed half of the acceleration limit.
+        with np.errstate(divide="ignore"):
+            x_max = np.minimum(np.min(vel / np.abs(tangent), axis=1) ** 2,
+                               np.min(0.5 * acc / np.abs(curvature), axis=1))
+            a_path = np.min(0.5 * acc / np.abs(tangent_seg), axis=1)
+        x_max[0] = 0
+        x_max[-1] = 0
+        b = np.concatenate(([0], np.cumsum(2 * a_path * ds)))
+        x_fwd = b + np.minimum.accumulate(x_max - b)
+        x_bwd = np.minimum.accumulate((x_max + b)[::-1])[::-1] - b
+        s_dot = np.sqrt(np.maximum(np.minimum(x_fwd, x_bwd), 0))
+
+        s_dot_sum = s_dot[:-1] + s_dot[1:]
+        with np.errstate(divide="ignore"):
+            h = np.where(s_dot_sum > 0, 2 * ds / s_dot_sum, 2 * np.sqrt(ds / a_path))
+
+        # Slow down the whole trajectory if the finite difference velocities or accelerations exceed the
+        # limits. Scaling the times by k scales the velocities by 1/k and the accelerations by 1/k^2.
+        qd_seg = dq / h[:, None]
+        ratio_v = np.max(np.abs(qd_seg) / vel)
+        ratio_a = np.max(np.abs(np.diff(qd_seg, axis=0)) / (0.5 * (h[:-1] + h[1:]))[:, None] / acc, initial=0)
+        k = max(ratio_v, np.sqrt(ratio_a))
+        if k > 1:
+            h *= k
+
+        t = np.concatenate(([0], np.cumsum(h)))
+        qd = np.zeros(q.shape)
+        qd[1:-1] = (q[2:] - q[:-2]) / (t[2:] - t[:-2])[:, None]
+        return t, qd
+
+    def create_timed_joint_trajectory(self, joint_position, robot_info, chain_number=None, joint_names=None,
+                                      template=None, velocity_scale=1.0, acceleration_scale=1.0):
+        """
+        Create a JointTrajectory from a path, with time_from_start and joint_velocity computed using
+        ``time_parameterize`` and the joint limits in a RobotInfo
+
+        :param joint_position: The (T, n_joints) array of joint positions of the path
+        :type joint_position: numpy.ndarray
+        :param robot_info: The RobotInfo with the joint limits
+        :type robot_info: com.robotraconteur.robotics.robot.RobotInfo
+        :param chain_number: (optional) The kinematic chain number
+        :type chain_number: int
+        :param joint_names: (optional) The joint names. Used to find the joint limits and stored in
+            the trajectory.
+        :type joint_names: list[str]
+        :param template: (optional) The waypoint template created with create_waypoint_template
+        :type template: com.robotraconteur.robotics.trajectory.JointTrajectoryWaypoint
+        :param velocity_scale: (optional) Scale factor for the velocity limits. Defaults to 1
+        :type velocity_scale: float
+        :param acceleration_scale: (optional) Scale factor for the acceleration limits. Defaults to 1
+        :type acceleration_scale: float
+        :return: The trajectory
+        :rtype: com.robotraconteur.robotics.trajectory.JointTrajectory
+        """
+        joint_limits = self._robot_util.robot_info_joint_limits(robot_info, chain_number, joint_names)
+        if len(joint_limits[0]) != np.shape(joint_position)[-1]:
+            raise RR.InvalidArgumentException("Path joint count does not match the robot joint count")
+        t, qd = self.time_parameterize(joint_position, joint_limits, velocity_scale, acceleration_scale)
+        return self.arrays_to_joint_trajectory(t, joint_position, qd, joint_names=joint_names, template=template)
@@ -11,3 +11,9 @@ try:
 except:
     import warnings
     warnings.warn("Could not initialize RobotRaconteurCompanion.InfoParser")
+
+try:
+    from .InfoWriter import InfoWriter
+except:
+    import warnings
+    warnings.warn("Could not initialize RobotRaconteurCompanion.InfoWriter")
@@ -4,6 +4,8 @@ import RobotRaconteurCompanion as RRC
 import importlib_resources
 from RobotRaconteur.RobotRaconteurPythonUtil import PackMessageElement, UnpackMessageElement
 import io
+import pytest
+import numpy as np
 
 
 def test_infoparser():
@@ -36,3 +38,118 @@ def test_infoparser_f():
             print(robot_info)
     finally:
         node.Shutdown()
+
+
+def test_infoparser_multi_document():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        info_text = (importlib_resources.files(__package__) / ('sawyer_robot_default_config.yml')).read_text()
+        bundle_text = "--- !com.robotraconteur.robotics.robot.RobotInfo\n" + info_text + \
+            "\n---\n" + info_text + \
+            "\n--- !com.robotraconteur.device.DeviceInfo\ndevice: my_device\nserial_number: '1234'\n"
+        parser = InfoParser(node)
+        res = list(parser.IterParseInfoDocuments(io.StringIO(bundle_text), "com.robotraconteur.robotics.robot.RobotInfo"))
+        assert [r[0] for r in res] == ["com.robotraconteur.robotics.robot.RobotInfo",
+                                       "com.robotraconteur.robotics.robot.RobotInfo", "com.robotraconteur.device.DeviceInfo"]
+        assert res[0][1].device_info.device.name == "sawyer_robot"
+        assert len(res[1][1].joint_info) == 7
+        assert res[2][1].device.name == "my_device"
+        assert res[2][1].serial_number == "1234"
+
+        with pytest.raises(RR.InvalidArgumentException):
+            list(parser.IterParseInfoDocuments(info_text))
+
+        # Empty documents are skipped
+        empty_text = "---\n---\n--- !com.robotraconteur.device.DeviceInfo\ndevice: my_device2\n---\n"
+        res = list(parser.IterParseInfoDocuments(empty_text, "com.robotraconteur.robotics.robot.RobotInfo"))
+        assert len(res) == 1
+        assert res[0][0] == "com.robotraconteur.device.DeviceInfo"
+        assert res[0][1].device.name == "my_device2"
+    finally:
+        node.Shutdown()
+
+
+_multidim_robdef = """
+service experimental.testing.companion.test_infoparser_multidim
+
+stdver 0.10
+
+struct MultiDimInfo
+    field double[3,2,2] fixed_3d
+    field int32[2,2] fixed_2d
+    field double[*] var_nd
+end
+"""
+
+
+def test_infoparser_multidimarray(tmp_path):
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        node.RegisterServiceType(_multidim_robdef)
+        lut = np.arange(2 * 3 * 4, dtype=np.float64).reshape((2, 3, 4))
+        np.save(tmp_path / "lut.npy", lut)
+        info_path = tmp_path / "multidim_info.yml"
+        info_path.write_text(
+            "fixed_3d: [[[1, 2], [3, 4]], [[5, 6], [7, 8]], [[9, 10], [11, 12]]]\n"
+            "fixed_2d: [1, 2, 3, 4]\n"
+            "var_nd: {$array: lut.npy}\n")
+        parser = InfoParser(node)
+        info = parser.ParseInfoFile(info_path, "experimental.testing.companion.test_infoparser_multidim.MultiDimInfo")
+        assert info.fixed_3d.shape == (3, 2, 2)
+        assert info.fixed_3d[2, 1, 0] == 11
+        np.testing.assert_equal(info.fixed_2d, [[1, 3], [2, 4]])
+        assert isinstance(info.var_nd, np.memmap)
+        np.testing.assert_equal(info.var_nd, lut)
+
+        info2 = parser.ParseInfoString("var_nd: [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]\n",
+                                       "experimental.testing.companion.test_infoparser_multidim.MultiDimInfo")
+        assert info2.var_nd.shape == (2, 3)
+        # Nested lists with the wrong shape are not reshaped, even if the element count matches
+        with pytest.raises(RR.InvalidArgumentException):
+            parser.ParseInfoString("fixed_2d: [[1, 2, 3, 4]]\n",
+                                   "experimental.testing.companion.test_infoparser_multidim.MultiDimInfo")
+        with pytest.raises(RR.InvalidArgumentException):
+            parser.ParseInfoString("fixed_3d: [[[1, 2], [3, 4], [5, 6]], [[7, 8], [9, 10], [11, 12]]]\n",
+                                   "experimental.testing.companion.test_infoparser_multidim.MultiDimInfo")
+        rr_info = PackMessageElement(info, "experimental.testing.companion.test_infoparser_multidim.MultiDimInfo",
+                                     node=node)
+        rr_info.UpdateData()
+        UnpackMessageElement(rr_info, node=node)
+    finally:
+        node.Shutdown()
+
+
+def test_infoparser_array_ref(tmp_path):
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        vertices = np.random.rand(100, 3)
+        triangles = np.arange(99 * 3, dtype=np.uint32).reshape((99, 3)) % 100
+        np.save(tmp_path / "vertices.npy", vertices)
+        np.save(tmp_path / "triangles.npy", triangles)
+        np.save(tmp_path / "bad_triangles.npy", triangles.astype(np.float64))
+        (tmp_path / "mesh.yml").write_text(
+            "vertices: !npy vertices.npy\n"
+            "triangles: {$array: triangles.npy}\n"
+            "mesh_type: mesh\n")
+        parser = InfoParser(node)
+        mesh = parser.ParseInfoFile(tmp_path / "mesh.yml", "com.robotraconteur.geometry.shapes.Mesh")
+        assert mesh.vertices.shape == (100,)
+        assert mesh.vertices.dtype == node.GetNamedArrayDType("com.robotraconteur.geometry.Point")
+        np.testing.assert_equal(mesh.vertices["y"], vertices[:, 1])
+        np.testing.assert_equal(mesh.triangles["v3"], triangles[:, 2])
+
+        with pytest.raises(AssertionError):
+            parser.ParseInfoString("triangles: !npy bad_triangles.npy\n",
+                                   "com.robotraconteur.geometry.shapes.Mesh", tmp_path)
+
+        rr_mesh = PackMessageElement(mesh, "com.robotraconteur.geometry.shapes.Mesh", node=node)
+        rr_mesh.UpdateData()
+        UnpackMessageElement(rr_mesh, node=node)
+    finally:
+        node.Shutdown()
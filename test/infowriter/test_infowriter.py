@@ -0,0 +1,51 @@
+import RobotRaconteur as RR
+from RobotRaconteurCompanion import InfoParser, InfoWriter
+import RobotRaconteurCompanion as RRC
+import importlib_resources
+from .. import infoparser as test_infoparser_m
+from RobotRaconteur.RobotRaconteurPythonUtil import PackMessageElement, UnpackMessageElement
+import numpy.testing as nptest
+import yaml
+import io
+
+
+def test_infowriter():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        info_text = (importlib_resources.files(test_infoparser_m) / ('sawyer_robot_default_config.yml')).read_text()
+        parser = InfoParser(node)
+        robot_info = parser.ParseInfoString(info_text, "com.robotraconteur.robotics.robot.RobotInfo")
+
+        writer = InfoWriter(node)
+        robot_info_text = writer.WriteInfoString(robot_info, "com.robotraconteur.robotics.robot.RobotInfo")
+        robot_info_dict = yaml.safe_load(robot_info_text)
+        assert robot_info_dict["device_info"]["device"] == "sawyer_robot"
+        assert robot_info_dict["device_info"]["model"]["uuid"] == "f965af3f-da91-41d7-be0f-871207c2185d"
+        assert robot_info_dict["robot_type"] == "serial"
+        assert "trajectory_command" in robot_info_dict["robot_capabilities"]
+        assert robot_info_dict["chains"][0]["H"][0] == {"x": 0.0, "y": 0.0, "z": 1.0}
+
+        robot_info2 = parser.ParseInfoString(robot_info_text, "com.robotraconteur.robotics.robot.RobotInfo")
+        assert robot_info2.robot_capabilities == robot_info.robot_capabilities
+        assert robot_info2.device_info.manufacturer.name == robot_info.device_info.manufacturer.name
+        nptest.assert_equal(robot_info2.chains[0].H, robot_info.chains[0].H)
+        nptest.assert_equal(robot_info2.chains[0].P, robot_info.chains[0].P)
+        nptest.assert_equal(robot_info2.device_info.model.uuid, robot_info.device_info.model.uuid)
+
+        rr_robot_info = PackMessageElement(robot_info2, "com.robotraconteur.robotics.robot.RobotInfo", node=node)
+        rr_robot_info.UpdateData()
+        UnpackMessageElement(rr_robot_info, node=node)
+
+        f = io.StringIO()
+        writer.WriteInfoFile(robot_info2, f, "com.robotraconteur.robotics.robot.RobotInfo")
+        assert f.getvalue() == robot_info_text
+
+        # extended is omitted when none of its values can be written
+        robot_info2.device_info.extended = {"my_value": RR.VarValue(1.0, "double")}
+        robot_info_dict2 = yaml.safe_load(writer.WriteInfoString(
+            robot_info2, "com.robotraconteur.robotics.robot.RobotInfo"))
+        assert "extended" not in robot_info_dict2["device_info"]
+    finally:
+        node.Shutdown()
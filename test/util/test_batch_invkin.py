@@ -0,0 +1,89 @@
+import RobotRaconteur as RR
+from RobotRaconteurCompanion import InfoParser
+import RobotRaconteurCompanion as RRC
+import importlib_resources
+from RobotRaconteurCompanion.Util.RobotUtil import RobotUtil
+from RobotRaconteurCompanion.Util.BatchKinematics import BatchKinematics
+from RobotRaconteurCompanion.Util.BatchInvKin import BatchInvKin
+import numpy.testing as nptest
+import numpy as np
+
+
+def _load_robot_info(node):
+    info_f = importlib_resources.files(__package__) / "sawyer_robot_with_electric_gripper_config.yml"
+    parser = InfoParser(node)
+    return parser.ParseInfoFile(info_f, "com.robotraconteur.robotics.robot.RobotInfo")
+
+
+def test_batch_invkin_path():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        robot_info = _load_robot_info(node)
+        robot_util = RobotUtil(node)
+        robot = robot_util.robot_info_to_rox_robot_cached(robot_info, 0)
+        kin = BatchKinematics(robot)
+
+        q0 = np.array([0.1, -0.5, 0.2, 1.0, -0.3, 0.6, 0.4])
+        q1 = np.array([0.5, -0.2, -0.1, 0.7, 0.2, 0.9, -0.2])
+        q_path = q0 + np.linspace(0, 1, 40)[:, None] * (q1 - q0)
+        T_path = kin.fwdkin(q_path)
+
+        ik = BatchInvKin(robot)
+        converged, q = ik.invkin_path(T_path, q0 + 0.01)
+        assert q.shape == q_path.shape
+        assert np.all(converged)
+        nptest.assert_allclose(kin.fwdkin(q), T_path, atol=1e-5)
+
+        converged2, q2 = ik.invkin_path(T_path, q0 + 0.01)
+        assert np.all(converged2)
+        nptest.assert_allclose(q2, q)
+
+        res, q_single = ik.invkin(T_path[10], q_path[10] + 0.05)
+        assert res
+        nptest.assert_allclose(kin.fwdkin(q_single)[0], T_path[10], atol=1e-5)
+
+        # Modifying a returned solution must not change the cached solution
+        q_single_expected = q_single.copy()
+        q_single[:] = 0
+        res, q_single2 = ik.invkin(T_path[10], q_path[10] + 0.05)
+        assert res
+        nptest.assert_allclose(q_single2, q_single_expected)
+
+        converged3, q3 = ik.invkin_path(T_path, q0 + 0.01, processes=2, segment_size=15)
+        assert np.all(converged3)
+        nptest.assert_allclose(kin.fwdkin(q3), T_path, atol=1e-5)
+    finally:
+        node.Shutdown()
+
+
+def test_batch_invkin_path_processes():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        robot_info = _load_robot_info(node)
+        robot_util = RobotUtil(node)
+        robot = robot_util.robot_info_to_rox_robot_cached(robot_info, 0)
+        kin = BatchKinematics(robot)
+
+        s = np.linspace(0, 1, 400)[:, None]
+        q0 = np.array([0.1, -0.5, 0.2, 1.0, -0.3, 0.6, 0.4])
+        q_path = q0 + 0.6 * np.sin(np.pi * s) * np.array([1.0, 0.5, -0.5, -0.6, 0.8, 0.4, -1.0])
+        T_path = kin.fwdkin(q_path)
+
+        ik = BatchInvKin(robot, cache_size=0)
+        converged, q = ik.invkin_path(T_path, q0)
+        assert np.all(converged)
+
+        converged2, q2 = ik.invkin_path(T_path, q0, processes=2, segment_size=50)
+        assert np.all(converged2)
+        nptest.assert_allclose(kin.fwdkin(q2), T_path, atol=1e-5)
+        # The robot is redundant, so the segments may differ slightly in the null space, but must stay
+        # on the same branch without joint jumps at the segment boundaries
+        nptest.assert_allclose(q2, q, atol=2e-2)
+        max_step = np.max(np.abs(np.diff(q, axis=0)))
+        assert np.max(np.abs(np.diff(q2, axis=0))) < 2 * max_step
+    finally:
+        node.Shutdown()
@@ -0,0 +1,97 @@
+import RobotRaconteur as RR
+from RobotRaconteurCompanion import InfoParser
+import RobotRaconteurCompanion as RRC
+import importlib_resources
+from RobotRaconteurCompanion.Util.RobotUtil import RobotUtil
+from RobotRaconteurCompanion.Util.GeometryUtil import GeometryUtil
+import numpy.testing as nptest
+import numpy as np
+import copy
+import general_robotics_toolbox as rox
+
+
+def _load_robot_info(node):
+    info_f = importlib_resources.files(__package__) / "sawyer_robot_with_electric_gripper_config.yml"
+    parser = InfoParser(node)
+    return parser.ParseInfoFile(info_f, "com.robotraconteur.robotics.robot.RobotInfo")
+
+
+def _random_q(robot, count):
+    rng = np.random.default_rng(3247)
+    return rng.uniform(robot.joint_lower_limit, robot.joint_upper_limit, (count, len(robot.joint_type)))
+
+
+def test_batch_fwdkin():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        robot_info = _load_robot_info(node)
+        robot_util = RobotUtil(node)
+        kin = robot_util.robot_info_to_batch_kinematics(robot_info, 0)
+        # Copy the cached robot before changing the tool frame
+        robot = copy.deepcopy(kin.robot)
+        robot.R_tool = rox.rot([0, 0, 1], np.deg2rad(5))
+        robot.p_tool = np.array([0, 0, 0.1577])
+        kin = type(kin)(robot)
+
+        q = _random_q(robot, 50)
+        T = kin.fwdkin(q)
+        assert T.shape == (50, 4, 4)
+        for i in range(50):
+            T_expected = rox.fwdkin(robot, q[i])
+            nptest.assert_allclose(T[i, 0:3, 0:3], T_expected.R, atol=1e-10)
+            nptest.assert_allclose(T[i, 0:3, 3], T_expected.p, atol=1e-10)
+
+        geom_util = GeometryUtil(node)
+        poses = kin.fwdkin_poses(q, geom_util)
+        assert len(poses) == 50
+        for i in range(0, 50, 7):
+            T_expected = rox.fwdkin(robot, q[i])
+            T_pose = geom_util.pose_to_rox_transform(poses[i:i + 1])
+            assert T_expected.isclose(T_pose, tol=1e-6)
+        nptest.assert_allclose(geom_util.poses_to_transforms(poses), T, atol=1e-5)
+
+        robot_state_type = node.GetStructureType("com.robotraconteur.robotics.robot.RobotState")
+        states = []
+        for i in range(5):
+            s = robot_state_type()
+            s.joint_position = q[i]
+            states.append(s)
+        nptest.assert_allclose(kin.fwdkin_robot_states(states), T[0:5])
+
+    finally:
+        node.Shutdown()
+
+
+def test_batch_jacobian():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        robot_info = _load_robot_info(node)
+        robot_util = RobotUtil(node)
+        kin = robot_util.robot_info_to_batch_kinematics(robot_info, 0)
+        robot = kin.robot
+
+        q = _random_q(robot, 50)
+        J = kin.jacobian(q)
+        assert J.shape == (50, 6, 7)
+        for i in range(50):
+            nptest.assert_allclose(J[i], rox.robotjacobian(robot, q[i]), atol=1e-10)
+
+        manipulability, condition_number, sv_min = kin.jacobian_metrics(q)
+        for i in range(0, 50, 7):
+            J_i = rox.robotjacobian(robot, q[i])
+            nptest.assert_allclose(manipulability[i], np.sqrt(np.linalg.det(J_i @ J_i.T)), rtol=1e-6)
+            nptest.assert_allclose(condition_number[i], np.linalg.cond(J_i), rtol=1e-6)
+
+        nptest.assert_equal(kin.is_singular(q, tol=1e-6), sv_min < 1e-6)
+
+        m2, c2, s2 = kin.jacobian_metrics(q, processes=2, chunk_size=20)
+        nptest.assert_allclose(m2, manipulability)
+        nptest.assert_allclose(c2, condition_number)
+        nptest.assert_allclose(s2, sv_min)
+
+    finally:
+        node.Shutdown()
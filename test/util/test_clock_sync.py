@@ -0,0 +1,118 @@
+import RobotRaconteur as RR
+import RobotRaconteurCompanion as RRC
+from RobotRaconteurCompanion.Util.TestFixtures import IntraTaskFixture
+from RobotRaconteurCompanion.Util.ClockSync import ClockSyncEstimator
+from RobotRaconteurCompanion.Util.DateTimeUtil import DateTimeUtil
+import numpy as np
+import numpy.testing as nptest
+
+_clock_device_robdef = """
+service experimental.testing.companion.clock_sync
+
+stdver 0.10
+
+import com.robotraconteur.device
+import com.robotraconteur.datetime
+import com.robotraconteur.device.clock
+
+using com.robotraconteur.device.DeviceInfo
+using com.robotraconteur.datetime.TimeSpec2
+using com.robotraconteur.device.clock.DeviceTime
+
+object ClockDevice
+    implements com.robotraconteur.device.Device
+    property DeviceInfo device_info [readonly,nolock]
+    property TimeSpec2 device_time [readonly,nolock]
+    function DeviceTime getf_device_clock_now()
+end
+"""
+
+
+class _ClockDeviceStub:
+    # Remote clock with a fixed offset and drift relative to the server node TimeSpec
+    def __init__(self, node, offset_ns, drift):
+        self._node = node
+        self._datetime_util = DateTimeUtil(node)
+        self._offset_ns = offset_ns
+        self._drift = drift
+        self._start_ns = self._now_ns()
+        self.device_info = None
+
+    def _now_ns(self):
+        ts = self._node.NowTimeSpec()
+        return ts.seconds * 1000000000 + ts.nanoseconds
+
+    def remote_ns(self, local_ns):
+        return local_ns + self._offset_ns + int(self._drift * (local_ns - self._start_ns))
+
+    @property
+    def device_time(self):
+        return self._datetime_util.NanosecondsToTimeArray(np.array([self.remote_ns(self._now_ns())]))
+
+    def getf_device_clock_now(self):
+        device_time = np.zeros((1,), dtype=self._node.GetPodDType("com.robotraconteur.device.clock.DeviceTime"))
+        device_time[0]["device_ts"] = self.device_time[0]
+        return device_time
+
+
+def test_clock_sync_estimator():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        estimator = ClockSyncEstimator(lambda: 0, window_size=32, node=node)
+
+        # Synthetic samples with a fixed offset and drift, so the estimate does not depend on timing
+        start_ns = 1700000000000000000
+        offset_ns = 2500000000
+        drift = 2e-3
+
+        def remote_ns(local_ns):
+            return local_ns + offset_ns + int(drift * (local_ns - start_ns))
+
+        for i in range(40):
+            local_send_ns = start_ns + i * 10000000
+            rtt_ns = 200000 + (i % 3) * 10000
+            if i % 7 == 0:
+                # Delayed responses with a large round trip time are discarded
+                rtt_ns = 5000000
+            remote = remote_ns(local_send_ns + 100000)
+            estimator.AddSample(local_send_ns, remote, local_send_ns + rtt_ns)
+        assert estimator.sample_count == 40
+        assert abs(estimator.drift - drift) < 1e-5
+
+        local_ns = np.array([start_ns + 400000000 + i * 1000000 for i in range(5)], dtype=np.int64)
+        remote = np.array([remote_ns(t) for t in local_ns], dtype=np.int64)
+        assert np.all(np.abs(estimator.RemoteToLocalNanoseconds(remote) - local_ns) < 100000)
+        nptest.assert_allclose(estimator.OffsetAt(local_ns), remote - local_ns, atol=100000)
+    finally:
+        node.Shutdown()
+
+
+def test_clock_sync_estimator_remote():
+    with IntraTaskFixture() as fixture:
+        fixture.register_standard_service_types()
+        fixture.register_service_types_text([_clock_device_robdef])
+        stub = _ClockDeviceStub(fixture.server_node, 2500000000, 0.0)
+        fixture.register_service("clock_device", "experimental.testing.companion.clock_sync.ClockDevice", stub)
+
+        c = fixture.connect_service("rr+intra:///?nodename=server_node&service=clock_device")
+
+        estimator = ClockSyncEstimator(lambda: c.device_time, window_size=32, node=fixture.client_node,
+                                       client_obj=c)
+        estimator.Sample(10)
+        assert estimator.sample_count == 10
+
+        local_ns = np.array([estimator._local_now_ns() + i * 1000000 for i in range(5)], dtype=np.int64)
+        remote_ns = np.array([stub.remote_ns(t) for t in local_ns], dtype=np.int64)
+        assert np.all(np.abs(estimator.RemoteToLocalNanoseconds(remote_ns) - local_ns) < 1000000)
+
+        date_time_util = DateTimeUtil(fixture.client_node, c)
+        remote_ts = date_time_util.NanosecondsToTimeArray(remote_ns)
+        local_ts = estimator.RemoteTimeArrayToLocal(remote_ts)
+        assert np.all(np.abs(date_time_util.TimeArrayToNanoseconds(local_ts) - local_ns) < 1000000)
+
+        estimator2 = ClockSyncEstimator(c.getf_device_clock_now, node=fixture.client_node, client_obj=c)
+        estimator2.Sample(5)
+        assert abs(estimator2.offset_ns - estimator.offset_ns) < 2000000
+        assert estimator2.round_trip_time_ns > 0
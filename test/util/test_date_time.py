@@ -35,3 +35,74 @@ def test_now():
         print(date_time_util.FillDeviceTime(device_info, 275837))
     finally:
         node.Shutdown()
+
+
+def test_time_array_conversions():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        date_time_util = DateTimeUtil(node=node)
+
+        ns = np.array([-1500000000, 0, 1, 1700000000123456789, 1700000001999999999], dtype=np.int64)
+        for time_type in ("TimeSpec2", "DateTimeUTC"):
+            t = date_time_util.NanosecondsToTimeArray(ns, time_type)
+            assert t.shape == (5,)
+            assert t[0]["seconds"] == -2 and t[0]["nanoseconds"] == 500000000
+            np.testing.assert_array_equal(date_time_util.TimeArrayToNanoseconds(t), ns)
+            np.testing.assert_array_equal(date_time_util.TimeArrayToDateTime64(t), ns.view("datetime64[ns]"))
+            np.testing.assert_allclose(date_time_util.TimeArrayToSeconds(t), ns * 1e-9, rtol=1e-15)
+            np.testing.assert_array_equal(date_time_util.TimeArrayToNanoseconds(
+                date_time_util.DateTime64ToTimeArray(ns.view("datetime64[ns]"), time_type)), ns)
+
+        t3 = date_time_util.NanosecondsToTimeArray(ns, "TimeSpec3")
+        np.testing.assert_array_equal(date_time_util.TimeArrayToNanoseconds(t3), (ns // 1000) * 1000)
+
+        seconds = np.array([1700000000.25, -0.75, 12.5])
+        t = date_time_util.SecondsToTimeArray(seconds)
+        np.testing.assert_array_equal(t["seconds"], [1700000000, -1, 12])
+        np.testing.assert_array_equal(t["nanoseconds"], [250000000, 250000000, 500000000])
+        np.testing.assert_allclose(date_time_util.TimeArrayToSeconds(t), seconds)
+
+        device_time = np.zeros((3,), dtype=node.GetPodDType("com.robotraconteur.device.clock.DeviceTime"))
+        device_time["device_ts"] = t
+        np.testing.assert_allclose(date_time_util.TimeArrayToSeconds(device_time["device_ts"]), seconds)
+    finally:
+        node.Shutdown()
+
+
+def test_clock_mapping():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        date_time_util = DateTimeUtil(node=node)
+
+        uuid_dtype = node.GetNamedArrayDType("com.robotraconteur.uuid.UUID")
+        identifier_type = node.GetStructureType("com.robotraconteur.identifier.Identifier")
+        device_info_type = node.GetStructureType("com.robotraconteur.device.DeviceInfo")
+        device_info = device_info_type()
+        device_info.device = identifier_type()
+        device_info.device.name = "test_device"
+        device_info.device.uuid = np.zeros((1,), dtype=uuid_dtype)
+        device_info.device.uuid[0]["uuid_bytes"] = np.arange(16, dtype=np.uint8)
+
+        clock = date_time_util.CreateClockMapping(device_info)
+
+        device_time = clock.FillDeviceTime(42)
+        expected = date_time_util.FillDeviceTime(device_info, 42)
+        assert device_time[0]["device_seqno"] == 42
+        assert device_time[0]["device_utc"]["clock_info"]["clock_uuid"]["uuid_bytes"][7] == 7
+        ts_ns = date_time_util.TimeArrayToNanoseconds(device_time["device_ts"])
+        utc_ns = date_time_util.TimeArrayToNanoseconds(device_time["device_utc"])
+        assert abs(ts_ns - date_time_util.TimeArrayToNanoseconds(expected["device_ts"]))[0] < 50000000
+        assert abs(utc_ns - date_time_util.TimeArrayToNanoseconds(expected["device_utc"]))[0] < 50000000
+        assert (utc_ns - ts_ns)[0] == clock.offset_ns
+
+        np.testing.assert_array_equal(clock.TimeSpecToUtcNanoseconds(ts_ns), utc_ns)
+        utc_now = clock.UtcNow()
+        assert abs(date_time_util.TimeArrayToNanoseconds(utc_now) - utc_ns)[0] < 50000000
+        assert clock.TimeSpec2Now()[0]["clock_info"]["clock_uuid"]["uuid_bytes"][3] == 3
+        assert abs(clock.Resample() - clock.offset_ns) < 50000000
+    finally:
+        node.Shutdown()
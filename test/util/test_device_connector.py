@@ -1,10 +1,12 @@
 import RobotRaconteur as RR
+import RobotRaconteurCompanion as RRC
 from RobotRaconteurCompanion.Util.TestFixtures import IntraTaskFixture
 
 from RobotRaconteurCompanion.Util.InfoFileLoader import InfoFileLoader
 from RobotRaconteurCompanion.Util.AttributesUtil import AttributesUtil
 
-from RobotRaconteurCompanion.Util.DeviceConnector import DeviceConnector, DeviceConnectorDetails
+from RobotRaconteurCompanion.Util.DeviceConnector import DeviceConnector, DeviceConnectorDetails, \
+    load_device_details_from_yaml
 
 import importlib_resources
 from .. import infoparser as test_infoparser_m
@@ -14,6 +16,7 @@ import time
 import pytest
 
 import io
+import asyncio
 
 
 class _RobotStub:
@@ -237,3 +240,252 @@ def test_device_connector_yaml():
         _assert_connected_device_count(con.GetDevice("robot4"), 1)
         _assert_connected_device_count(con.GetDevice("robot5"), 1)
         _assert_connected_device_count(con.GetDevice("robot6"), 1)
+
+
+def test_device_connector_concurrency():
+    yaml = \
+        """
+    devices:
+      robot1:
+        urls: rr+intra:///?nodename=server_node&service=robot1
+      robot2:
+        urls: rr+intra:///?nodename=server_node&service=robot2
+        priority: 5
+      robot3:
+        device: robot3_another_robot
+        tags:
+        - my_tag1
+        priority: 5
+      missing_robot:
+        urls: rr+intra:///?nodename=server_node&service=missing_robot
+        priority: 10
+    """
+    with _DevConnectorTestFixture() as test_fixture:
+        f = io.StringIO(yaml)
+        con = DeviceConnector(devices_yaml_f=f, node=test_fixture.client_node, max_concurrent_connections=1,
+                              connection_attempt_timeout=0.5)
+        try:
+            # missing_robot has the highest priority and holds the only connection slot until it times out
+            assert not con.WaitDevices(["robot1", "robot2", "robot3"], timeout=0.25)
+            assert con.WaitDevices(["robot1", "robot2", "robot3"], timeout=10)
+            assert con.WaitDevices(fraction=0.75, timeout=0)
+            assert not con.WaitDevices(timeout=0.1)
+
+            connect_times = con.DeviceConnectTimes
+            assert sorted(connect_times.keys()) == ["robot1", "robot2", "robot3"]
+            assert all(t >= 0 for t in connect_times.values())
+
+            _assert_connected_device_count(con.GetDevice("robot1"), 1)
+            _assert_connected_device_count(con.GetDevice("robot3"), 1)
+
+            con.DisconnectDevice("robot2")
+            assert "robot2" not in con.DeviceConnectTimes
+            con.ConnectDevice("robot2")
+            assert con.WaitDevices(["robot2"], timeout=10)
+
+            # The connect timer stops when all devices have connected, and restarts for the next connection
+            con.DisconnectDevice("missing_robot")
+            t_end = time.monotonic() + 5
+            while con._timer is not None and time.monotonic() < t_end:
+                time.sleep(0.05)
+            assert con._timer is None
+            # Devices stopped using DisconnectDevice are not waited for
+            assert con.WaitDevices(timeout=1)
+            con.DisconnectDevice("robot1")
+            con.ConnectDevice("robot1")
+            assert con._timer is not None
+            assert con.WaitDevices(["robot1"], timeout=10)
+        finally:
+            con.Close()
+
+
+def test_device_connector_asyncio():
+    with _DevConnectorTestFixture() as test_fixture:
+        con = DeviceConnector(node=test_fixture.client_node)
+        con.AddDevice(DeviceConnectorDetails(device_nickname="robot1",
+                                             urls=["rr+intra:///?nodename=server_node&service=robot1"]))
+        con.AddDevice(DeviceConnectorDetails(device_nickname="missing_robot",
+                                             urls=["rr+intra:///?nodename=server_node&service=missing_robot"]))
+
+        async def run_test():
+            async with con.AsyncEvents(["robot1"]) as events:
+                c1 = await con.AsyncGetClient("robot1", 5)
+                assert c1.device_info.device.name == "robot1"
+
+                event = await asyncio.wait_for(events.__anext__(), 5)
+                assert event.event == "connected"
+                assert event.device_nickname == "robot1"
+
+                # A connect callback for a client in the initial snapshot is not reported twice
+                async with con.AsyncEvents(["robot1"]) as events2:
+                    client_id = list(con.GetDevice("robot1").GetConnectedClients().keys())[0]
+                    events2._make_handler("connected", "robot1")(None, client_id, c1)
+                    await asyncio.sleep(0.1)
+                    assert events2._queue.qsize() == 1
+
+                with pytest.raises(Exception):
+                    await con.AsyncGetClient("missing_robot", 0.2)
+
+                test_fixture.fixture.server_node.CloseService("robot1")
+                event = await asyncio.wait_for(events.__anext__(), 5)
+                assert event.event == "disconnected"
+                assert event.device_nickname == "robot1"
+
+                events.Close()
+                assert [e async for e in events] == []
+
+        try:
+            asyncio.run(run_test())
+        finally:
+            con.Close()
+
+
+def test_device_connector_apply_device_list():
+    with _DevConnectorTestFixture() as test_fixture:
+        con = DeviceConnector(node=test_fixture.client_node)
+        try:
+            added, removed, updated = con.ApplyDeviceList([
+                DeviceConnectorDetails("robot1", urls=["rr+intra:///?nodename=server_node&service=robot1"]),
+                DeviceConnectorDetails("robot2", device="robot2"),
+                DeviceConnectorDetails("robot3", device="robot3_another_robot", tags=["my_tag1"]),
+                DeviceConnectorDetails("robot5", urls=["rr+intra:///?nodename=server_node&service=robot1"])
+            ])
+            assert sorted(added) == ["robot1", "robot2", "robot3", "robot5"]
+            assert removed == [] and updated == []
+
+            sub1 = con.GetDevice("robot1")
+            sub2 = con.GetDevice("robot2")
+            c1 = sub1.GetDefaultClientWait(5)
+            c2 = sub2.GetDefaultClientWait(5)
+            _assert_service_name(test_fixture.client_node, con.GetDevice("robot5"), "robot1")
+            con.GetDevice("robot3").GetDefaultClientWait(5)
+
+            disconnected = []
+            sub1.ClientDisconnected += lambda sub, sub_id, client: disconnected.append("robot1")
+            sub2.ClientDisconnected += lambda sub, sub_id, client: disconnected.append("robot2")
+
+            yaml_str = """
+            devices:
+              robot1:
+                urls:
+                - rr+intra:///?nodename=server_node&service=robot1
+              robot2:
+                device: robot2
+                priority: 2
+              robot4:
+                urls: rr+intra:///?nodename=server_node&service=robot4
+              robot5:
+                urls:
+                - rr+intra:///?nodename=server_node&service=robot2
+            """
+            added, removed, updated = con.ApplyDeviceList(load_device_details_from_yaml(io.StringIO(yaml_str)))
+            assert added == ["robot4"]
+            assert removed == ["robot3"]
+            assert sorted(updated) == ["robot2", "robot5"]
+
+            assert sorted(con.DeviceNicknames) == ["robot1", "robot2", "robot4", "robot5"]
+            _assert_service_name(test_fixture.client_node, con.GetDevice("robot4"), "robot4")
+            _assert_service_name(test_fixture.client_node, con.GetDevice("robot5"), "robot2")
+
+            assert con.GetDevice("robot1").GetDefaultClient() is c1
+            assert con.GetDevice("robot2").GetDefaultClient() is c2
+            assert disconnected == []
+
+            with pytest.raises(RR.InvalidArgumentException):
+                con.ApplyDeviceList([DeviceConnectorDetails("robot1", device="robot1"),
+                                     DeviceConnectorDetails("robot1", device="robot2")])
+            assert sorted(con.DeviceNicknames) == ["robot1", "robot2", "robot4", "robot5"]
+        finally:
+            con.Close()
+
+
+def test_device_connector_url_cache(tmp_path):
+    cache_path = tmp_path / "url_cache.yml"
+    devices = [DeviceConnectorDetails("robot1", device="robot1"),
+               DeviceConnectorDetails("robot3", device="robot3_another_robot", tags=["my_tag1"])]
+
+    with _DevConnectorTestFixture() as test_fixture:
+        con = DeviceConnector(devices, node=test_fixture.client_node, url_cache=cache_path)
+        try:
+            assert con.WaitDevices(timeout=10)
+            assert sorted(yaml.safe_load(cache_path.read_text())["devices"].keys()) == ["robot1", "robot3"]
+        finally:
+            con.Close()
+
+        cache = yaml.safe_load(cache_path.read_text())["devices"]
+        assert cache["robot1"]["service_name"] == "robot1"
+        assert all("service=robot1" in u for u in cache["robot1"]["urls"])
+
+        # Warm start uses the cached URLs directly
+        con = DeviceConnector(devices, node=test_fixture.client_node, url_cache=cache_path)
+        try:
+            assert con.WaitDevices(timeout=10)
+            assert list(con.GetDevice("robot1").ServiceURL) == cache["robot1"]["urls"]
+            _assert_service_name(test_fixture.client_node, con.GetDevice("robot1"), "robot1")
+            _assert_service_name(test_fixture.client_node, con.GetDevice("robot3"), "robot3")
+        finally:
+            con.Close()
+
+        # Changed details do not use the cached URLs
+        con = DeviceConnector([DeviceConnectorDetails("robot1", device="robot2")], node=test_fixture.client_node,
+                              url_cache=cache_path)
+        try:
+            _assert_service_name(test_fixture.client_node, con.GetDevice("robot1"), "robot2")
+        finally:
+            con.Close()
+
+    # The server node has a new NodeID, so the cached URLs are stale and discovery is used
+    with _DevConnectorTestFixture() as test_fixture:
+        con = DeviceConnector(devices[0:1], node=test_fixture.client_node, url_cache=cache_path,
+                              url_cache_timeout=0.5)
+        try:
+            assert con.WaitDevices(timeout=10)
+            _assert_service_name(test_fixture.client_node, con.GetDevice("robot1"), "robot1")
+        finally:
+            con.Close()
+        cache2 = yaml.safe_load(cache_path.read_text())["devices"]
+        assert cache2["robot1"]["node_id"] != cache["robot1"]["node_id"]
+
+
+def test_device_connector_url_cache_reconnect(tmp_path):
+    cache_path = tmp_path / "url_cache.yml"
+    with _DevConnectorTestFixture() as test_fixture:
+        con = DeviceConnector([DeviceConnectorDetails("robot1", device="robot1")], node=test_fixture.client_node,
+                              url_cache=cache_path)
+        server_node2 = None
+        try:
+            assert con.WaitDevices(timeout=10)
+            node_id = yaml.safe_load(cache_path.read_text())["devices"]["robot1"]["node_id"]
+            assert node_id == str(test_fixture.fixture.server_node.NodeID)
+
+            # Restart the service on a new node without recreating the connector
+            server_node2 = RR.RobotRaconteurNode()
+            server_node2.SetNodeName("server_node2")
+            server_node2.Init()
+            server_transport2 = RR.IntraTransport(server_node2)
+            server_node2.RegisterTransport(server_transport2)
+            server_transport2.StartServer()
+            RRC.RegisterStdRobDefServiceTypes(server_node2)
+            robot_info = test_fixture.load_info("robot1", category="test2")
+            attributes = test_fixture.attributes_util.GetDefaultServiceAttributesFromDeviceInfo(
+                robot_info.device_info)
+            test_fixture.fixture.server_node.CloseService("robot1")
+            ctx = server_node2.RegisterService("robot1", "com.robotraconteur.robotics.robot.Robot",
+                                               _RobotStub(robot_info))
+            ctx.SetServiceAttributes(attributes)
+
+            _assert_service_name(test_fixture.client_node, con.GetDevice("robot1"), "robot1")
+            t_end = time.monotonic() + 10
+            cache = None
+            while time.monotonic() < t_end:
+                cache = yaml.safe_load(cache_path.read_text())["devices"]["robot1"]
+                if cache["node_id"] == str(server_node2.NodeID):
+                    break
+                time.sleep(0.05)
+            assert cache["node_id"] == str(server_node2.NodeID)
+            node_id2 = str(server_node2.NodeID).strip("{}")
+            assert all(node_id2 in u and "service=robot1" in u for u in cache["urls"])
+        finally:
+            con.Close()
+            if server_node2 is not None:
+                server_node2.Shutdown()
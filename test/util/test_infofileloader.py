@@ -1,9 +1,10 @@
 import RobotRaconteur as RR
-from RobotRaconteurCompanion.Util.InfoFileLoader import InfoFileLoader
+from RobotRaconteurCompanion.Util.InfoFileLoader import InfoFileLoader, InfoFileWatcher
 import RobotRaconteurCompanion as RRC
 import importlib_resources
 from .. import infoparser as test_infoparser_m
 import yaml
+import os
 
 
 def test_infoparser():
@@ -37,3 +38,75 @@ def test_infoparser_dict():
 
     finally:
         node.Shutdown()
+
+
+def test_infoparser_bulk():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        info_f1 = importlib_resources.files(test_infoparser_m) / 'sawyer_robot_default_config.yml'
+        info_f2 = importlib_resources.files(__package__) / 'sawyer_robot_with_electric_gripper_config.yml'
+        parser = InfoFileLoader(node)
+        res = parser.LoadInfoFiles([
+            (info_f1, "com.robotraconteur.robotics.robot.RobotInfo", "test"),
+            (info_f2, "com.robotraconteur.robotics.robot.RobotInfo", "test2")
+        ], max_workers=2, min_parallel_files=0)
+        assert len(res) == 2
+        for robot_info, fd in res:
+            with fd:
+                assert robot_info.device_info.device.name == "sawyer_robot"
+                assert len(robot_info.joint_info) == 7
+        assert res[1][0].device_info.device_origin_pose is not None
+
+        # Small lists are parsed in this process
+        res2 = parser.LoadInfoFiles([
+            (info_f1, "com.robotraconteur.robotics.robot.RobotInfo", "test"),
+            (info_f2, "com.robotraconteur.robotics.robot.RobotInfo", "test2")
+        ])
+        assert len(res2) == 2
+        for robot_info, fd in res2:
+            with fd:
+                assert robot_info.device_info.device.name == "sawyer_robot"
+        assert res2[1][0].device_info.device_origin_pose is not None
+
+    finally:
+        node.Shutdown()
+
+
+def test_info_file_watcher(tmp_path):
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        info_text = (importlib_resources.files(test_infoparser_m) / ('sawyer_robot_default_config.yml')).read_text()
+        info_path = tmp_path / "robot_info.yml"
+        info_path.write_text(info_text)
+        parser = InfoFileLoader(node)
+        robot_info, fd = parser.LoadInfoFile(info_path, "com.robotraconteur.robotics.robot.RobotInfo", category="test")
+        with fd:
+            changes = []
+            watcher = InfoFileWatcher(node=node)
+            watcher.AddFile(info_path, "com.robotraconteur.robotics.robot.RobotInfo",
+                            lambda f, info, fields: changes.append((info, fields)), robot_info)
+            assert watcher.Poll() == []
+
+            # Same contents with a new modification time is not reloaded
+            info_path.write_text(info_text)
+            os.utime(info_path, ns=(1, 1))
+            assert watcher.Poll() == []
+
+            info_dict = yaml.safe_load(info_text)
+            info_dict["joint_info"][0]["joint_limits"]["upper"] = 1.5
+            info_dict["robot_type"] = "other"
+            info_path.write_text(yaml.safe_dump(info_dict))
+            assert watcher.Poll() == [str(info_path)]
+            assert len(changes) == 1
+            new_info, fields = changes[0]
+            assert fields == ["joint_info", "robot_type"]
+            assert new_info.joint_info[0].joint_limits.upper == 1.5
+            assert new_info.device_info.device is robot_info.device_info.device
+            watcher.Close()
+
+    finally:
+        node.Shutdown()
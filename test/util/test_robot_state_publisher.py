@@ -0,0 +1,71 @@
+import RobotRaconteur as RR
+import RobotRaconteurCompanion as RRC
+from RobotRaconteurCompanion.Util.RobotStatePublisher import RobotStatePublisher
+from RobotRaconteur.RobotRaconteurPythonUtil import PackMessageElement, UnpackMessageElement
+import numpy.testing as nptest
+import numpy as np
+import general_robotics_toolbox as rox
+
+
+def test_robot_state_publisher():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+
+        identifier_type = node.GetStructureType("com.robotraconteur.identifier.Identifier")
+        device_info_type = node.GetStructureType("com.robotraconteur.device.DeviceInfo")
+        uuid_dtype = node.GetNamedArrayDType("com.robotraconteur.uuid.UUID")
+        device_info = device_info_type()
+        device_info.device = identifier_type()
+        device_info.device.name = "test_robot"
+        device_info.device.uuid = np.zeros((1,), dtype=uuid_dtype)
+        device_info.device.uuid[0]["uuid_bytes"] = np.arange(16, dtype=np.uint8)
+
+        publisher = RobotStatePublisher(6, device_info=device_info, node=node)
+
+        T = np.eye(4)
+        T[0:3, 0:3] = rox.rot([0, 0, 1], 0.3)
+        T[0:3, 3] = [0.1, 0.2, 0.3]
+        q = np.arange(6, dtype=np.float64) * 0.1
+        state1, adv1, sensor1 = publisher.update(q, joint_velocity=q * 2, kin_chain_tcp=T[None, :, :],
+                                                 kin_chain_tcp_vel=np.arange(6)[None, :], command_mode=1)
+        assert state1.seqno == 1
+        assert sensor1.data_header.seqno == 1
+        assert sensor1.robot_state is adv1
+        nptest.assert_allclose(state1.joint_position, q)
+        nptest.assert_allclose(adv1.joint_velocity, q * 2)
+        nptest.assert_allclose(state1.kin_chain_tcp[0]["orientation"].tolist(), rox.R2q(T[0:3, 0:3]))
+        nptest.assert_allclose(state1.kin_chain_tcp[0]["position"].tolist(), T[0:3, 3])
+        nptest.assert_allclose(state1.kin_chain_tcp_vel[0]["linear"].tolist(), [3, 4, 5])
+        assert sensor1.data_header.ts[0]["clock_info"]["clock_uuid"]["uuid_bytes"][3] == 3
+        assert sensor1.data_header.source_info.source.name == "test_robot"
+
+        ts = node.NowTimeSpec()
+        state2, _, sensor2 = publisher.update(q + 1, ts=ts)
+        assert state2 is not state1
+        assert state2.seqno == 2
+        nptest.assert_allclose(state1.joint_position, q)
+        nptest.assert_allclose(state2.joint_velocity, 0)
+        assert state2.ts[0]["microseconds"] == ts.seconds * 1000000 + ts.nanoseconds // 1000
+        assert sensor2.data_header.ts[0]["nanoseconds"] == ts.nanoseconds
+
+        # The buffers are reused every second update
+        state3, _, _ = publisher.update(q + 2)
+        assert state3 is state1
+        assert publisher.seqno == 3
+        # Tool poses and velocities that are not passed are reset instead of keeping older values
+        nptest.assert_allclose(state3.kin_chain_tcp[0]["orientation"].tolist(), [1, 0, 0, 0])
+        nptest.assert_allclose(state3.kin_chain_tcp[0]["position"].tolist(), [0, 0, 0])
+        nptest.assert_allclose(state3.kin_chain_tcp_vel[0]["linear"].tolist(), [0, 0, 0])
+
+        state_type = "com.robotraconteur.robotics.robot.RobotState"
+        m = RR.MessageElementFromBytes(bytearray(RR.MessageElementToBytes(
+            PackMessageElement(state3, state_type, node=node))))
+        assert UnpackMessageElement(m, state_type, node=node).seqno == 3
+        sensor_type = "com.robotraconteur.robotics.robot.RobotStateSensorData"
+        m = RR.MessageElementFromBytes(bytearray(RR.MessageElementToBytes(
+            PackMessageElement(sensor2, sensor_type, node=node))))
+        assert UnpackMessageElement(m, sensor_type, node=node).data_header.seqno == 2
+    finally:
+        node.Shutdown()
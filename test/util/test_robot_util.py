@@ -87,3 +87,32 @@ def test_infoparser2():
 
     finally:
         node.Shutdown()
+
+
+def test_robot_util_cached():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        info_f = importlib_resources.files(__package__) / "sawyer_robot_with_electric_gripper_config.yml"
+        parser = InfoParser(node)
+        robot_info = parser.ParseInfoFile(info_f, "com.robotraconteur.robotics.robot.RobotInfo")
+        robot_info2 = parser.ParseInfoFile(info_f, "com.robotraconteur.robotics.robot.RobotInfo")
+
+        robot_util = RobotUtil(node, rox_robot_cache_size=1)
+        robot = robot_util.robot_info_to_rox_robot_cached(robot_info, 0)
+        assert robot_util.robot_info_to_rox_robot_cached(robot_info2, 0) is robot
+        assert robot_util.robot_info_to_rox_robots(robot_info) == [robot]
+        robot_expected = robot_util.robot_info_to_rox_robot(robot_info, 0)
+        nptest.assert_allclose(robot.H, robot_expected.H)
+        nptest.assert_allclose(robot.P, robot_expected.P)
+
+        robot_info2.joint_info[3].joint_limits.upper = 1.0
+        robot2 = robot_util.robot_info_to_rox_robot_cached(robot_info2, 0)
+        assert robot2 is not robot
+        assert robot2.joint_upper_limit[3] == 1.0
+        # Cache size is 1, so the first robot was evicted
+        assert robot_util.robot_info_to_rox_robot_cached(robot_info, 0) is not robot
+
+    finally:
+        node.Shutdown()
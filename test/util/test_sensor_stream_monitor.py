@@ -0,0 +1,150 @@
+import RobotRaconteur as RR
+import RobotRaconteurCompanion as RRC
+from RobotRaconteurCompanion.Util.TestFixtures import IntraTaskFixture
+from RobotRaconteurCompanion.Util.SensorStreamMonitor import SensorStreamMonitor
+import numpy as np
+import time
+
+_sensor_stream_robdef = """
+service experimental.testing.companion.sensor_stream
+
+stdver 0.10
+
+import com.robotraconteur.sensordata
+
+using com.robotraconteur.sensordata.SensorDataHeader
+
+struct StreamSample
+    field SensorDataHeader data_header
+    field double value
+end
+
+object SensorStream
+    wire StreamSample sample_wire [readonly]
+    pipe StreamSample sample_pipe [readonly]
+end
+"""
+
+
+def _header(node, seqno, ts_ns):
+    header = node.NewStructure("com.robotraconteur.sensordata.SensorDataHeader")
+    header.seqno = seqno
+    header.ts = np.zeros((1,), dtype=node.GetPodDType("com.robotraconteur.datetime.TimeSpec2"))
+    header.ts[0]["seconds"] = ts_ns // 1000000000
+    header.ts[0]["nanoseconds"] = ts_ns % 1000000000
+    return header
+
+
+def test_sensor_stream_monitor_seqno():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        monitor = SensorStreamMonitor(window_size=8, latency_bin_edges=[0.001, 0.01], reorder_window=4, node=node)
+        t0 = 1000000000000
+        # 3 is delayed, 5 and 6 are lost, 7 is duplicated, 1 arrives after the reorder window
+        seqnos = [1, 2, 4, 3, 7, 7, 8, 9, 10, 11, 12, 13, 14]
+        for s in seqnos[:-5]:
+            monitor.AddHeader(_header(node, s, t0 + s * 10000000), t0 + s * 10000000 + 5000000)
+        assert monitor.received_count == 8
+        assert monitor.reordered_count == 1
+        assert monitor.duplicate_count == 1
+        assert monitor.dropped_count == 2
+        for s in seqnos[-5:]:
+            monitor.AddHeader(_header(node, s, t0 + s * 10000000 - 10000000), t0 + s * 10000000 + 5000000)
+
+        counts, edges = monitor.latency_histogram
+        np.testing.assert_array_equal(counts, [0, 3, 5])
+        np.testing.assert_allclose(edges, [0.001, 0.01])
+        assert abs(monitor.LatencyPercentile(100) - 0.015) < 1e-9
+        assert abs(monitor.rate - 100.0) < 1e-6
+        assert monitor.jitter > 0
+
+        monitor.Reset()
+        assert monitor.received_count == 0
+        assert monitor.rate is None
+        assert monitor.LatencyPercentile(50) is None
+    finally:
+        node.Shutdown()
+
+
+class _SensorStreamStub:
+    def __init__(self, node):
+        self._node = node
+        self._seqno = 0
+
+    @property
+    def sample_wire(self):
+        return self._wire
+
+    @sample_wire.setter
+    def sample_wire(self, value):
+        self._wire = value
+        self._wire_broadcaster = RR.WireBroadcaster(value)
+
+    @property
+    def sample_pipe(self):
+        return self._pipe
+
+    @sample_pipe.setter
+    def sample_pipe(self, value):
+        self._pipe = value
+        self._pipe_broadcaster = RR.PipeBroadcaster(value)
+
+    def send(self, skip=False):
+        self._seqno += 1
+        if skip:
+            return
+        sample = self._node.NewStructure("experimental.testing.companion.sensor_stream.StreamSample")
+        now = self._node.NowTimeSpec()
+        sample.data_header = _header(self._node, self._seqno, now.seconds * 1000000000 + now.nanoseconds)
+        sample.value = float(self._seqno)
+        self._wire_broadcaster.OutValue = sample
+        self._pipe_broadcaster.AsyncSendPacket(sample, lambda: None)
+
+
+def _wait_for(cond, timeout=5):
+    t_end = time.time() + timeout
+    while not cond() and time.time() < t_end:
+        time.sleep(0.01)
+    assert cond()
+
+
+def test_sensor_stream_monitor_subscription():
+    with IntraTaskFixture() as fixture:
+        fixture.register_standard_service_types()
+        fixture.register_service_types_text([_sensor_stream_robdef])
+        stub = _SensorStreamStub(fixture.server_node)
+        fixture.register_service("sensor_stream", "experimental.testing.companion.sensor_stream.SensorStream", stub)
+
+        sub = fixture.client_node.SubscribeService("rr+intra:///?nodename=server_node&service=sensor_stream")
+        try:
+            wire_sub = sub.SubscribeWire("sample_wire")
+            pipe_sub = sub.SubscribePipe("sample_pipe")
+            sub.GetDefaultClientWait(5)
+            _wait_for(lambda: wire_sub.ActiveWireConnectionCount > 0 and pipe_sub.ActivePipeEndpointCount > 0)
+
+            received = []
+            with SensorStreamMonitor(node=fixture.client_node) as wire_monitor, \
+                    SensorStreamMonitor(node=fixture.client_node) as pipe_monitor:
+                wire_monitor.AttachWireSubscription(wire_sub)
+                pipe_monitor.AttachPipeSubscription(pipe_sub, received.append)
+
+                for i in range(20):
+                    stub.send(skip=(i == 10))
+                    if i != 10:
+                        _wait_for(lambda: pipe_monitor.received_count + pipe_monitor.dropped_count == stub._seqno
+                                  and wire_monitor.received_count + wire_monitor.dropped_count == stub._seqno)
+
+                assert pipe_monitor.received_count == 19
+                assert pipe_monitor.dropped_count == 1
+                assert pipe_monitor.reordered_count == 0
+                assert [p.value for p in received] == [float(s) for s in range(1, 21) if s != 11]
+                assert 0 <= pipe_monitor.LatencyPercentile(50) < 1
+
+                assert wire_monitor.received_count == 19
+                assert wire_monitor.dropped_count == 1
+                assert wire_monitor.reordered_count == 0
+                assert wire_monitor.duplicate_count == 0
+        finally:
+            sub.Close()
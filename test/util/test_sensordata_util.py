@@ -27,3 +27,39 @@ def test_identifier_util():
 
     finally:
         node.Shutdown()
+
+
+def test_sensordata_header_factory():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        sensor_data_util = SensorDataUtil(node)
+
+        identifier_type = node.GetStructureType("com.robotraconteur.identifier.Identifier")
+        device_info_type = node.GetStructureType("com.robotraconteur.device.DeviceInfo")
+        uuid_dtype = node.GetNamedArrayDType("com.robotraconteur.uuid.UUID")
+        device_info = device_info_type()
+        device_info.device = identifier_type()
+        device_info.device.name = "test_device"
+        device_info.device.uuid = np.zeros((1,), dtype=uuid_dtype)
+        device_info.device.uuid[0]["uuid_bytes"] = np.arange(16, dtype=np.uint8)
+
+        factory = sensor_data_util.CreateSensorDataHeaderFactory(device_info)
+        header1 = factory.CreateHeader()
+        header2 = factory.CreateHeader()
+        assert header1.seqno == 1
+        assert header2.seqno == 2
+        assert header1.source_info is header2.source_info
+        assert header1.source_info.source.name == "test_device"
+        assert header1.ts is not header2.ts
+        assert header1.ts[0]["clock_info"]["clock_uuid"]["uuid_bytes"][5] == 5
+
+        ts = node.NowTimeSpec()
+        header3 = factory.CreateHeader(1234, ts)
+        assert header3.seqno == 1234
+        assert header3.ts[0]["seconds"] == ts.seconds
+        assert header3.ts[0]["nanoseconds"] == ts.nanoseconds
+        assert factory.CreateHeader().seqno == 3
+    finally:
+        node.Shutdown()
@@ -0,0 +1,204 @@
+import RobotRaconteur as RR
+import RobotRaconteurCompanion as RRC
+from RobotRaconteurCompanion import InfoParser
+from RobotRaconteurCompanion.Util.TrajectoryUtil import TrajectoryUtil
+from RobotRaconteurCompanion.Util.RobotUtil import RobotUtil
+import importlib_resources
+import numpy.testing as nptest
+import numpy as np
+import pytest
+from RobotRaconteur.RobotRaconteurPythonUtil import PackMessageElement, UnpackMessageElement
+
+
+def test_trajectory_util():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        traj_util = TrajectoryUtil(node)
+
+        t = np.linspace(0, 5, 100)
+        q = np.column_stack([np.sin(t * (i + 1)) for i in range(6)])
+        qd = np.column_stack([np.cos(t * (i + 1)) * (i + 1) for i in range(6)])
+
+        template = traj_util.create_waypoint_template(position_tolerance=np.full((6,), 0.01),
+                                                      interpolation_mode="joint_cubic_spline",
+                                                      waypoint_type="path")
+        traj = traj_util.arrays_to_joint_trajectory(t, q, qd, joint_names=[f"joint_{i}" for i in range(6)],
+                                                    template=template)
+        assert len(traj.waypoints) == 100
+        assert traj.joint_names[5] == "joint_5"
+        assert traj.waypoints[10].interpolation_mode == 5
+        assert traj.waypoints[10].waypoint_type == 2
+        nptest.assert_allclose(traj.waypoints[10].joint_position, q[10])
+        nptest.assert_allclose(traj.waypoints[10].position_tolerance, np.full((6,), 0.01))
+
+        # Round trip through serialization
+        traj_type = "com.robotraconteur.robotics.trajectory.JointTrajectory"
+        m = PackMessageElement(traj, traj_type, node=node)
+        traj2 = UnpackMessageElement(m, traj_type, node=node)
+
+        t2, q2, qd2 = traj_util.joint_trajectory_to_arrays(traj2)
+        nptest.assert_allclose(t2, t)
+        nptest.assert_allclose(q2, q)
+        nptest.assert_allclose(qd2, qd)
+        nptest.assert_allclose(traj_util.joint_trajectory_position_tolerance(traj2), np.full((100, 6), 0.01))
+
+        traj3 = traj_util.arrays_to_joint_trajectory(t, q)
+        _, _, qd3 = traj_util.joint_trajectory_to_arrays(traj3)
+        assert qd3 is None
+        assert traj_util.joint_trajectory_position_tolerance(traj3) is None
+    finally:
+        node.Shutdown()
+
+
+def test_trajectory_interpolator():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        traj_util = TrajectoryUtil(node)
+
+        t = np.linspace(0, 4, 81)
+        q = np.column_stack((np.sin(t), np.cos(2 * t)))
+        qd = np.column_stack((np.cos(t), -2 * np.sin(2 * t)))
+        t_eval = np.linspace(-0.5, 4.5, 1001)
+        t_inside = np.clip(t_eval, 0, 4)
+        q_expected = np.column_stack((np.sin(t_inside), np.cos(2 * t_inside)))
+
+        template = traj_util.create_waypoint_template(interpolation_mode="joint")
+        interp = traj_util.create_interpolator(traj_util.arrays_to_joint_trajectory(t, q, template=template))
+        assert interp.duration == 4
+        q1, qd1 = interp.interpolate(t_eval)
+        nptest.assert_allclose(q1, q_expected, atol=5e-3)
+        q1_mid, qd1_mid = interp.interpolate(0.025)
+        nptest.assert_allclose(q1_mid, (q[0] + q[1]) / 2)
+        nptest.assert_allclose(qd1_mid, (q[1] - q[0]) / 0.05)
+        nptest.assert_allclose(qd1[0], 0)
+
+        template = traj_util.create_waypoint_template(interpolation_mode="joint_cubic_spline")
+        interp = traj_util.create_interpolator(traj_util.arrays_to_joint_trajectory(t, q, qd, template=template))
+        q2, qd2 = interp.interpolate(t_eval)
+        nptest.assert_allclose(q2, q_expected, atol=1e-6)
+        nptest.assert_allclose(interp.interpolate(t)[0], q, atol=1e-12)
+
+        # Natural spline velocities are continuous at the waypoints
+        interp = traj_util.create_interpolator(traj_util.arrays_to_joint_trajectory(t, q, template=template))
+        q3, _ = interp.interpolate(t_eval)
+        nptest.assert_allclose(q3, q_expected, atol=1e-3)
+        _, qd3_l = interp.interpolate(t[1:-1] - 1e-9)
+        _, qd3_r = interp.interpolate(t[1:-1] + 1e-9)
+        nptest.assert_allclose(qd3_l, qd3_r, atol=1e-6)
+
+        # Cartesian interpolation modes are rejected
+        for mode in ("linear", "cubic_spline"):
+            template = traj_util.create_waypoint_template(interpolation_mode=mode)
+            with pytest.raises(RR.InvalidArgumentException):
+                traj_util.create_interpolator(traj_util.arrays_to_joint_trajectory(t, q, qd, template=template))
+    finally:
+        node.Shutdown()
+
+
+def test_trajectory_limits():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        info_f = importlib_resources.files(__package__) / "sawyer_robot_with_electric_gripper_config.yml"
+        robot_info = InfoParser(node).ParseInfoFile(info_f, "com.robotraconteur.robotics.robot.RobotInfo")
+        traj_util = TrajectoryUtil(node)
+        lower, upper, vel, acc = RobotUtil(node).robot_info_joint_limits(robot_info, 0)
+
+        t = np.linspace(0, 20, 2001)
+        q = 0.5 * np.sin(0.2 * t)[:, None] * np.ones((1, 7))
+        traj = traj_util.arrays_to_joint_trajectory(t, q)
+        assert len(traj_util.validate_joint_trajectory(traj, robot_info, 0)) == 0
+
+        q_bad = q.copy()
+        q_bad[100, 2] = upper[2] + 0.1
+        q_bad[1500:, 4] = lower[4] - 0.2
+        violations = traj_util.check_joint_limits(t, q_bad, (lower, upper, vel, acc))
+        assert np.all(np.diff(violations["index"]) >= 0)
+        pos = violations[violations["kind"] == "position"]
+        assert len(pos) == 502
+        assert pos[0]["index"] == 100 and pos[0]["joint"] == 2
+        nptest.assert_allclose(pos[0]["limit"], upper[2])
+        vel_v = violations[violations["kind"] == "velocity"]
+        assert set(vel_v["index"]) == {100, 101, 1500}
+        assert np.any(violations["kind"] == "acceleration")
+
+        first = traj_util.check_joint_limits(t, q_bad, (lower, upper, vel, acc), stop_on_first=True)
+        assert len(first) == 1
+        assert first[0]["index"] == 100 and first[0]["kind"] == "position"
+
+        traj_bad = traj_util.arrays_to_joint_trajectory(t * 0.01, q)
+        first = traj_util.validate_joint_trajectory(traj_bad, robot_info, 0, stop_on_first=True)
+        assert len(first) == 1 and first[0]["kind"] == "velocity"
+    finally:
+        node.Shutdown()
+
+
+def test_trajectory_compress():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        traj_util = TrajectoryUtil(node)
+
+        t = np.linspace(0, 10, 5001)
+        q = np.column_stack((np.sin(t), 0.5 * np.cos(0.7 * t), 0.1 * t, np.zeros_like(t)))
+        tol = np.array([1e-3, 1e-3, 1e-3, 1e-3])
+
+        for mode in ("joint", "joint_cubic_spline"):
+            template = traj_util.create_waypoint_template(position_tolerance=tol, interpolation_mode=mode)
+            traj = traj_util.arrays_to_joint_trajectory(t, q, template=template)
+            traj2 = traj_util.compress_joint_trajectory(traj)
+            assert len(traj2.waypoints) * 20 < len(traj.waypoints)
+            assert traj2.waypoints[0] is traj.waypoints[0]
+            assert traj2.waypoints[-1] is traj.waypoints[-1]
+
+            q_interp, _ = traj_util.create_interpolator(traj2).interpolate(t)
+            assert np.all(np.abs(q_interp - q) <= tol)
+
+        kept = traj_util.compress_waypoints(t, q, 1e-6)
+        assert kept[0] == 0 and kept[-1] == len(t) - 1
+        assert np.all(np.diff(kept) > 0)
+    finally:
+        node.Shutdown()
+
+
+def test_trajectory_time_parameterize():
+    node = RR.RobotRaconteurNode()
+    node.Init()
+    try:
+        RRC.RegisterStdRobDefServiceTypes(node)
+        info_f = importlib_resources.files(__package__) / "sawyer_robot_with_electric_gripper_config.yml"
+        robot_info = InfoParser(node).ParseInfoFile(info_f, "com.robotraconteur.robotics.robot.RobotInfo")
+        traj_util = TrajectoryUtil(node)
+        joint_limits = RobotUtil(node).robot_info_joint_limits(robot_info, 0)
+
+        s = np.linspace(0, 1, 10000)
+        q = np.column_stack([0.8 * np.sin(2 * np.pi * s * (i + 1) / 3) for i in range(7)])
+        t, qd = traj_util.time_parameterize(q, joint_limits)
+        assert t[0] == 0 and np.all(np.diff(t) > 0)
+        nptest.assert_allclose(qd[0], 0)
+        nptest.assert_allclose(qd[-1], 0)
+        assert len(traj_util.check_joint_limits(t, q, joint_limits)) == 0
+
+        # The velocity or acceleration limit is reached on the path
+        h = np.diff(t)
+        qd_seg = np.diff(q, axis=0) / h[:, None]
+        qdd = np.diff(qd_seg, axis=0) / (0.5 * (h[:-1] + h[1:]))[:, None]
+        assert max(np.max(np.abs(qd_seg) / joint_limits[2]), np.max(np.abs(qdd) / joint_limits[3])) > 0.95
+
+        traj = traj_util.create_timed_joint_trajectory(q[::100], robot_info, 0, velocity_scale=0.5,
+                                                       acceleration_scale=0.5)
+        assert len(traj_util.validate_joint_trajectory(traj, robot_info, 0)) == 0
+        t2, _, qd2 = traj_util.joint_trajectory_to_arrays(traj)
+        assert t2[-1] > traj_util.time_parameterize(q[::100], joint_limits)[0][-1]
+        assert qd2 is not None
+
+        t3, _ = traj_util.time_parameterize(q[[0, -1]], joint_limits)
+        assert len(traj_util.check_joint_limits(t3, q[[0, -1]], joint_limits)) == 0
+    finally:
+        node.Shutdown()